@@ -1,4 +1,8 @@
+import asyncio
 from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
 
 from WechatAPI.errors import *
 
@@ -31,6 +35,38 @@ class Section:
     start_pos: int
 
 
+class _SessionContext:
+    """HTTP会话上下文
+
+    在创建连接池的事件循环中复用客户端的长连接会话，退出时不关闭；
+    在其他事件循环中（如管理后台线程）使用一次性会话，退出时关闭。
+    """
+
+    def __init__(self, client: "WechatAPIClientBase"):
+        self._client = client
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._owned = False
+
+    async def __aenter__(self) -> aiohttp.ClientSession:
+        client = self._client
+        loop = asyncio.get_running_loop()
+        owner = client._http_loop
+        if owner is loop or owner is None or owner.is_closed():
+            if client._http_session is None or client._http_session.closed or owner is not loop:
+                client._http_session = client._create_http_session()
+                client._http_loop = loop
+            self._session = client._http_session
+        else:
+            self._session = aiohttp.ClientSession(timeout=client._http_timeout)
+            self._owned = True
+        return self._session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._owned:
+            await self._session.close()
+        return False
+
+
 class WechatAPIClientBase:
     """微信API客户端基类
 
@@ -56,9 +92,59 @@ class WechatAPIClientBase:
 
         self.ignore_protect = False
 
+        # HTTP连接池，首次请求时在当前事件循环中创建
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http_limit = 100
+        self._http_limit_per_host = 32
+        self._http_keepalive_timeout = 30.0
+        self._http_timeout = aiohttp.ClientTimeout(total=300, connect=10)
+
         # 调用所有 Mixin 的初始化方法
         super().__init__()
 
+    def configure_http(self, limit: int = 100, limit_per_host: int = 32, keepalive_timeout: float = 30.0,
+                       timeout: float = 300, connect_timeout: float = 10):
+        """配置HTTP连接池，需在第一次请求前调用，否则在下次重建连接池时生效
+
+        Args:
+            limit (int): 连接池总连接数上限，0为不限制
+            limit_per_host (int): 单个主机的连接数上限，0为不限制
+            keepalive_timeout (float): 空闲连接保活时间(秒)
+            timeout (float): 单次请求总超时时间(秒)
+            connect_timeout (float): 建立连接超时时间(秒)
+        """
+        self._http_limit = limit
+        self._http_limit_per_host = limit_per_host
+        self._http_keepalive_timeout = keepalive_timeout
+        self._http_timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+
+    def _create_http_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self._http_limit,
+                                         limit_per_host=self._http_limit_per_host,
+                                         keepalive_timeout=self._http_keepalive_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=self._http_timeout)
+
+    def http_session(self) -> _SessionContext:
+        """获取复用连接池的HTTP会话
+
+        用法与 ``aiohttp.ClientSession()`` 相同::
+
+            async with self.http_session() as session:
+                response = await session.post(url, json=json_param)
+
+        Returns:
+            _SessionContext: 异步上下文管理器，进入后得到 aiohttp.ClientSession
+        """
+        return _SessionContext(self)
+
+    async def close(self):
+        """关闭HTTP连接池"""
+        session, self._http_session = self._http_session, None
+        self._http_loop = None
+        if session is not None and not session.closed:
+            await session.close()
+
     @staticmethod
     def error_handler(json_resp):
         """处理API响应中的错误码
@@ -1,64 +1,42 @@
-import asyncio
 import base64
 import os
-from asyncio import Future
-from asyncio import Queue, sleep
-from io import BytesIO
 from pathlib import Path
 from typing import Union
 
 import aiohttp
-import pysilk
 from loguru import logger
-from pydub import AudioSegment
-from pymediainfo import MediaInfo
 
 from .base import *
 from .protect import protector
 from ..errors import *
+from ..json_stream import Base64Field, StreamingJsonPayload
+from ..media_pipeline import get_media_pipeline
+from ..send_scheduler import SendScheduler
 
 
 class MessageMixin(WechatAPIClientBase):
     def __init__(self, ip: str, port: int):
-        # 初始化消息队列
+        # 初始化消息发送调度器
         super().__init__(ip, port)
-        self._message_queue = Queue()
-        self._is_processing = False
+        self.send_scheduler = SendScheduler()
 
-    async def _process_message_queue(self):
-        """
-        处理消息队列的异步方法
+    def configure_send(self, rate: float = 1.0, burst: int = 1, global_rate: float = 5.0, global_burst: int = 5):
+        """配置消息发送速率
+
+        Args:
+            rate (float): 每个接收方每秒最多发送的条数，0为不限制
+            burst (int): 每个接收方允许连续发送的条数
+            global_rate (float): 所有接收方合计每秒最多发送的条数，0为不限制
+            global_burst (int): 所有接收方合计允许连续发送的条数
         """
-        if self._is_processing:
-            return
-
-        self._is_processing = True
-        while True:
-            if self._message_queue.empty():
-                self._is_processing = False
-                break
-
-            func, args, kwargs, future = await self._message_queue.get()
-            try:
-                result = await func(*args, **kwargs)
-                future.set_result(result)
-            except Exception as e:
-                future.set_exception(e)
-            finally:
-                self._message_queue.task_done()
-                await sleep(1)  # 消息发送间隔1秒
+        self.send_scheduler.configure(rate=rate, burst=burst, global_rate=global_rate, global_burst=global_burst)
 
     async def _queue_message(self, func, *args, **kwargs):
         """
-        将消息添加到队列
+        将消息交给发送调度器，按接收方（第一个参数wxid）排队发送
         """
-        future = Future()
-        await self._message_queue.put((func, args, kwargs, future))
-
-        if not self._is_processing:
-            asyncio.create_task(self._process_message_queue())
-
-        return await future
+        wxid = args[0] if args else kwargs.get("wxid")
+        return await self.send_scheduler.submit(wxid, func, *args, **kwargs)
 
     async def revoke_message(self, wxid: str, client_msg_id: int, create_time: int, new_msg_id: int) -> bool:
         """撤回消息。
@@ -82,7 +60,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "ClientMsgId": client_msg_id, "CreateTime": create_time,
                           "NewMsgId": new_msg_id}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Revoke', json=json_param)
@@ -133,7 +111,7 @@ class MessageMixin(WechatAPIClientBase):
         else:
             raise ValueError("Argument 'at' should be str or list")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": content, "Type": 1, "At": at_str}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendTxt', json=json_param)
             json_resp = await response.json()
@@ -179,7 +157,7 @@ class MessageMixin(WechatAPIClientBase):
         else:
             raise ValueError("Argument 'image' can only be str, bytes, or os.PathLike")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": image}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/UploadImg', json=json_param)
             json_resp = await response.json()
@@ -210,57 +188,35 @@ class MessageMixin(WechatAPIClientBase):
                     ValueError: 视频或图片参数都为空或都不为空时
                     根据error_handler处理错误
                 """
-        if not image:
-            image = Path(os.path.join(Path(__file__).resolve().parent, "fallback.png"))
-        # get video base64 and duration
+        # 字节和文件路径在发送时按块编码写入请求体，文件通过 mmap 读取，不在内存中拼出完整的 base64
         if isinstance(video, str):
-            vid_base64 = video
-            video = base64.b64decode(video)
-            file_len = len(video)
-            media_info = MediaInfo.parse(BytesIO(video))
-        elif isinstance(video, bytes):
-            vid_base64 = base64.b64encode(video).decode()
-            file_len = len(video)
-            media_info = MediaInfo.parse(BytesIO(video))
-        elif isinstance(video, os.PathLike):
-            with open(video, "rb") as f:
-                file_len = len(f.read())
-                vid_base64 = base64.b64encode(f.read()).decode()
-            media_info = MediaInfo.parse(video)
+            vid_base64 = "data:video/mp4;base64," + video
+            file_len = len(video) * 3 // 4
+        elif isinstance(video, (bytes, os.PathLike)):
+            vid_base64 = Base64Field(video, "data:video/mp4;base64,")
+            file_len = vid_base64.raw_size
         else:
             raise ValueError("video should be str, bytes, or path")
-        raw_duration = media_info.tracks[0].duration
+        pipeline = get_media_pipeline()
+
+        # 时长和封面在媒体处理进程池中获取，没有提供封面时截取视频第一帧，截取失败时使用默认封面
+        raw_duration, cover = None, None
+        try:
+            raw_duration, cover = await pipeline.probe_video(
+                base64.b64decode(video) if isinstance(video, str) else video, cover=not image)
+        except Exception as e:
+            logger.warning(f"获取视频信息失败: {e}")
+        if not image:
+            image = cover or Path(os.path.join(Path(__file__).resolve().parent, "fallback.png"))
 
-        # 如果外部提供了时长，则优先使用外部时长
         # MediaInfo返回的单位通常是毫秒，确保转换为整数秒
-        if raw_duration > 1000:  # 如果值很大，可能是毫秒
+        if raw_duration is None:
+            duration = 5  # 无法获取时长时使用默认值5秒
+            logger.warning("无法获取视频时长，使用默认值5秒")
+        elif raw_duration > 1000:  # 如果值很大，可能是毫秒
             duration = int(raw_duration / 1000)
         else:
             duration = int(raw_duration)
-        video_duration = duration
-
-        # 只有当外部未提供时长时，才尝试从视频文件提取
-        if video_duration is None:
-            try:
-                # 检查时长单位和值
-                raw_duration = media_info.tracks[0].duration
-                if raw_duration is None:
-                    # 如果无法获取时长，使用默认值
-                    video_duration = 5  # 默认5秒
-                    logger.warning("无法获取视频时长，使用默认值5秒")
-                else:
-                    # MediaInfo返回的单位通常是毫秒，确保转换为整数秒
-                    if raw_duration > 1000:  # 如果值很大，可能是毫秒
-                        video_duration = int(raw_duration / 1000)
-                    else:
-                        video_duration = int(raw_duration)
-                    logger.debug(f"视频原始时长: {raw_duration}, 转换后: {video_duration}秒")
-            except Exception as e:
-                # 异常处理，使用默认值
-                video_duration = 5
-                logger.warning(f"处理视频时长时出错: {e}, 使用默认值5秒")
-        else:
-            logger.info(f"使用外部提供的视频时长: {video_duration}秒")
 
         # get image base64
         if isinstance(image, str):
@@ -277,10 +233,10 @@ class MessageMixin(WechatAPIClientBase):
         predict_time = int(file_len / 1024 / 300)
         logger.info("开始发送视频: 对方wxid:{} 视频base64略 图片base64略 预计耗时:{}秒", wxid, predict_time)
 
-        async with aiohttp.ClientSession() as session:
-            json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": "data:video/mp4;base64,"+ vid_base64, "ImageBase64": "data:image/jpeg;base64,"+image_base64,
+        async with self.http_session() as session:
+            json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": vid_base64, "ImageBase64": "data:image/jpeg;base64,"+image_base64,
                           "PlayLength": duration}
-            async with session.post(f'http://{self.ip}:{self.port}/api/Msg/SendVideo', json=json_param) as resp:
+            async with session.post(f'http://{self.ip}:{self.port}/api/Msg/SendVideo', data=StreamingJsonPayload(json_param)) as resp:
                 json_resp = await resp.json()
 
         if json_resp.get("Success"):
@@ -332,28 +288,12 @@ class MessageMixin(WechatAPIClientBase):
         else:
             raise ValueError("voice should be str, bytes, or path")
 
-        # get voice duration and b64
-        if format.lower() == "amr":
-            audio = AudioSegment.from_file(BytesIO(voice_byte), format="amr")
-            voice_base64 = base64.b64encode(voice_byte).decode()
-        elif format.lower() == "wav":
-            audio = AudioSegment.from_file(BytesIO(voice_byte), format="wav").set_channels(1)
-            audio = audio.set_frame_rate(self._get_closest_frame_rate(audio.frame_rate))
-            voice_base64 = base64.b64encode(
-                await pysilk.async_encode(audio.raw_data, sample_rate=audio.frame_rate)).decode()
-        elif format.lower() == "mp3":
-            audio = AudioSegment.from_file(BytesIO(voice_byte), format="mp3").set_channels(1)
-            audio = audio.set_frame_rate(self._get_closest_frame_rate(audio.frame_rate))
-            voice_base64 = base64.b64encode(
-                await pysilk.async_encode(audio.raw_data, sample_rate=audio.frame_rate)).decode()
-        else:
-            raise ValueError("format must be one of amr, wav, mp3")
-
-        duration = len(audio)
+        # get voice duration and b64，解码、重采样和silk编码在媒体处理进程池中执行
+        voice_base64, duration = await get_media_pipeline().encode_voice(voice_byte, format)
 
         format_dict = {"amr": 0, "wav": 4, "mp3": 4}
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Base64": voice_base64, "VoiceTime": duration,
                           "Type": format_dict[format]}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendVoice', json=json_param)
@@ -368,19 +308,6 @@ class MessageMixin(WechatAPIClientBase):
             else:
                 self.error_handler(json_resp)
 
-    @staticmethod
-    def _get_closest_frame_rate(frame_rate: int) -> int:
-        supported = [8000, 12000, 16000, 24000]
-        closest_rate = None
-        smallest_diff = float('inf')
-        for num in supported:
-            diff = abs(frame_rate - num)
-            if diff < smallest_diff:
-                smallest_diff = diff
-                closest_rate = num
-
-        return closest_rate
-
     async def send_link_message(self, wxid: str, url: str, title: str = "", description: str = "",
                                 thumb_url: str = "") -> tuple[str, int, int]:
         """发送链接消息。
@@ -409,7 +336,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Url": url, "Title": title, "Desc": description,
                           "ThumbUrl": thumb_url}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/ShareLink', json=json_param)
@@ -434,7 +361,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Infourl": Infourl, "Label": Label, "Scale": Scale,
                           "X": X,"Y": Y, "Poiname": Poiname}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/ShareLocation', json=json_param)
@@ -478,7 +405,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Md5": md5, "TotalLen": total_length}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendEmoji', json=json_param)
             json_resp = await response.json()
@@ -516,7 +443,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "CardWxid": card_wxid, "CardAlias": card_alias,
                           "CardNickname": card_nickname}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCard', json=json_param)
@@ -557,7 +484,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Xml": xml, "Type": type}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendApp', json=json_param)
             json_resp = await response.json()
@@ -593,7 +520,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNFile', json=json_param)
             json_resp = await response.json()
@@ -628,7 +555,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNImg', json=json_param)
             json_resp = await response.json()
@@ -663,7 +590,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Content": xml}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendCDNVideo', json=json_param)
             json_resp = await response.json()
@@ -699,7 +626,7 @@ class MessageMixin(WechatAPIClientBase):
         elif not self.ignore_protect and protector.check(14400):
             raise BanProtection("风控保护: 新设备登录后4小时内请挂机")
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "ToWxid": wxid, "Md5": md5, "TotalLen": total_len}
             response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/SendEmoji', json=json_param)
             json_resp = await response.json()
@@ -723,9 +650,9 @@ class MessageMixin(WechatAPIClientBase):
         if not self.wxid:
             raise UserLoggedOut("请先登录")
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        async with self.http_session() as session:
             json_param = {"Wxid": self.wxid, "Scene": 0, "Synckey": ""}
-            response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Sync', json=json_param)
+            response = await session.post(f'http://{self.ip}:{self.port}/api/Msg/Sync', json=json_param, timeout=aiohttp.ClientTimeout(total=10))
             json_resp = await response.json()
 
             if json_resp.get("Success"):
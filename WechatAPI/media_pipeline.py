@@ -0,0 +1,264 @@
+"""
+媒体处理流水线
+语音转码（wav/mp3 转 silk、amr 时长）和视频探测（时长、封面）在进程池中执行，不阻塞事件循环；
+处理结果按内容哈希缓存，重复发送同一段语音或视频时不再重新处理
+"""
+
+import asyncio
+import base64
+import hashlib
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from loguru import logger
+
+SUPPORTED_SILK_RATES = (8000, 12000, 16000, 24000)
+_HASH_IN_THREAD_SIZE = 256 * 1024  # 超过这个大小的内容在线程中计算哈希
+
+
+def closest_frame_rate(frame_rate: int) -> int:
+    """silk 支持的采样率中与 frame_rate 最接近的一个"""
+    return min(SUPPORTED_SILK_RATES, key=lambda rate: abs(frame_rate - rate))
+
+
+def encode_voice(data: bytes, format: str) -> Tuple[str, int]:
+    """把语音转成发送用的 base64，amr 原样编码，wav/mp3 转成单声道 silk
+
+    Returns:
+        (base64字符串, 时长毫秒)
+    """
+    from pydub import AudioSegment
+
+    if format == "amr":
+        audio = AudioSegment.from_file(BytesIO(data), format="amr")
+        return base64.b64encode(data).decode(), len(audio)
+
+    import pysilk
+
+    audio = AudioSegment.from_file(BytesIO(data), format=format).set_channels(1)
+    audio = audio.set_frame_rate(closest_frame_rate(audio.frame_rate))
+    silk = pysilk.encode(audio.raw_data, sample_rate=audio.frame_rate)
+    return base64.b64encode(silk).decode(), len(audio)
+
+
+def probe_video(source: Union[bytes, str], cover: bool = False) -> Tuple[Optional[float], Optional[bytes]]:
+    """获取视频时长，cover 为 True 时同时用 ffmpeg 截取第一帧作为封面
+
+    Args:
+        source (bytes, str): 视频内容，或视频文件路径
+
+    Returns:
+        (MediaInfo 返回的时长，通常为毫秒, 封面jpeg或None)
+    """
+    from pymediainfo import MediaInfo
+
+    media_info = MediaInfo.parse(source if isinstance(source, str) else BytesIO(source))
+    duration = media_info.tracks[0].duration if media_info.tracks else None
+    return duration, (_extract_cover(source) if cover else None)
+
+
+def _extract_cover(source: Union[bytes, str]) -> Optional[bytes]:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    path = source
+    if not isinstance(source, str):
+        # mp4 的索引可能在文件末尾，不能从管道读取，先写入临时文件
+        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as f:
+            f.write(source)
+            path = f.name
+    try:
+        result = subprocess.run([ffmpeg, "-v", "error", "-i", path, "-frames:v", "1",
+                                 "-f", "image2", "-c:v", "mjpeg", "pipe:1"],
+                                capture_output=True, timeout=30)
+        return result.stdout if result.returncode == 0 and result.stdout else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+    finally:
+        if path is not source:
+            os.unlink(path)
+
+
+class MediaPipeline:
+    """媒体处理进程池和结果缓存
+
+    相同内容的处理结果缓存在内存中，并发提交的相同任务只执行一次。
+
+    Args:
+        workers (int): 进程数，0 表示在线程中处理
+        cache_size (int): 结果缓存的最大字节数
+    """
+
+    def __init__(self, workers: int = 2, cache_size: int = 64 * 1024 * 1024):
+        self.workers = workers
+        self.cache_size = cache_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.RLock()  # 任务已经完成时 add_done_callback 会在加锁的线程里直接回调
+        self._cache: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()  # key -> (结果, 大小)
+        self._cache_bytes = 0
+        self._pending: Dict[tuple, Future] = {}
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def configure(self, workers: int = None, cache_size: int = None):
+        """修改进程数和缓存大小，进程数在下次创建进程池时生效"""
+        if workers is not None and workers != self.workers:
+            self.workers = workers
+            self.shutdown(wait=False)
+        if cache_size is not None:
+            with self._lock:
+                self.cache_size = cache_size
+                self._evict()
+
+    def start(self):
+        """提前启动进程池，子进程导入模块较慢，避免第一次发送语音时等待"""
+        if self.workers > 0:
+            with self._lock:
+                self._submit(closest_frame_rate, 16000)
+
+    async def encode_voice(self, data: bytes, format: str) -> Tuple[str, int]:
+        """语音转码
+
+        Args:
+            data (bytes): 语音内容
+            format (str): amr / wav / mp3
+
+        Returns:
+            (base64字符串, 时长毫秒)
+        """
+        format = format.lower()
+        digest = await self._digest(data)
+        return await self._run(("voice", format, digest), encode_voice, data, format)
+
+    async def probe_video(self, source: Union[bytes, str, os.PathLike],
+                          cover: bool = False) -> Tuple[Optional[float], Optional[bytes]]:
+        """视频时长和封面
+
+        Args:
+            source (bytes, str, os.PathLike): 视频内容，或视频文件路径。传入路径时子进程直接读取文件，
+                按路径、大小和修改时间缓存结果
+            cover (bool): 是否截取第一帧作为封面
+
+        Returns:
+            (MediaInfo 返回的时长，通常为毫秒, 封面jpeg或None)
+        """
+        if isinstance(source, (str, os.PathLike)):
+            path = os.path.abspath(source)
+            stat = os.stat(path)
+            return await self._run(("video", cover, path, stat.st_size, stat.st_mtime_ns), probe_video, path, cover)
+        digest = await self._digest(source)
+        return await self._run(("video", cover, digest), probe_video, source, cover)
+
+    @staticmethod
+    async def _digest(data: bytes) -> str:
+        if len(data) < _HASH_IN_THREAD_SIZE:
+            return hashlib.sha1(data).hexdigest()
+        return await asyncio.to_thread(lambda: hashlib.sha1(data).hexdigest())
+
+    async def _run(self, key: tuple, func: Callable, *args):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key][0]
+            future = self._pending.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._pending[key] = self._submit(func, *args)
+                future.add_done_callback(lambda f: self._store(key, f))
+        # 同一个任务由多个调用方共享，某个调用方被取消（如 wait_for 超时）时不取消任务本身
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _submit(self, func: Callable, *args) -> Future:
+        if self.workers > 0:
+            try:
+                if self._executor is None:
+                    # fork 会复制其他线程持有的锁，用 spawn 启动干净的子进程
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+                return self._executor.submit(func, *args)
+            except (BrokenProcessPool, OSError, RuntimeError) as e:
+                logger.warning(f"媒体处理进程池不可用，改为在线程中处理: {e}")
+                self._executor = None
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="media")
+        return self._threads.submit(func, *args)
+
+    def _store(self, key: tuple, future: Future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled():
+                self.failures += 1
+                return
+            if future.exception() is not None:
+                self.failures += 1
+                if isinstance(future.exception(), BrokenProcessPool):
+                    # 子进程异常退出后进程池不可再用，下次提交时重建
+                    self._executor = None
+                return
+            result = future.result()
+            size = _result_size(result)
+            if size > self.cache_size:
+                return
+            self._cache[key] = (result, size)
+            self._cache_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._cache and self._cache_bytes > self.cache_size:
+            _, (_, size) = self._cache.popitem(last=False)
+            self._cache_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存命中和进程池统计信息"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "cached": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _result_size(result) -> int:
+    size = 64
+    for item in result:
+        if isinstance(item, (str, bytes)):
+            size += len(item)
+    return size
+
+
+_pipeline: Optional[MediaPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_media_pipeline() -> MediaPipeline:
+    """获取全局媒体处理流水线"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = MediaPipeline()
+    return _pipeline
@@ -0,0 +1,355 @@
+"""
+消息发送调度器
+按接收方排队发送消息：同一接收方的消息按提交顺序逐条发送，不同接收方之间互不阻塞；
+每个接收方和全局各有一个令牌桶限制发送速率，交互回复优先于定时群发
+"""
+
+import asyncio
+import contextvars
+import heapq
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+# 发送通道，按优先级从高到低排列
+LANE_INTERACTIVE = "interactive"  # 回复用户消息
+LANE_BROADCAST = "broadcast"  # 定时任务等主动群发
+LANES = (LANE_INTERACTIVE, LANE_BROADCAST)
+
+_current_lane = contextvars.ContextVar("send_lane", default=LANE_INTERACTIVE)
+
+
+@contextmanager
+def send_lane(lane: str):
+    """在 with 块内发送的消息使用指定的发送通道
+
+    例子::
+
+        with send_lane(LANE_BROADCAST):
+            for wxid in chatrooms:
+                await bot.send_text_message(wxid, "早安")
+    """
+    if lane not in LANES:
+        raise ValueError(f"未知的发送通道: {lane}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> str:
+    """当前上下文的发送通道"""
+    return _current_lane.get()
+
+
+class TokenBucket:
+    """令牌桶
+
+    Args:
+        rate (float): 每秒补充的令牌数，不大于0时不限制
+        burst (int): 桶容量，即允许连续发送的条数
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """距离有可用令牌还需等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    __slots__ = ("func", "args", "kwargs", "future", "lane", "enqueued_at")
+
+    def __init__(self, func, args, kwargs, future, lane):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+
+
+class _Recipient:
+    __slots__ = ("wxid", "queues", "bucket", "state", "ready_lane")
+
+    IDLE = 0  # 没有待发送的消息，或等待下一次调度
+    READY = 1  # 在就绪队列中
+    DELAYED = 2  # 等待令牌
+    SENDING = 3  # 正在发送
+
+    def __init__(self, wxid: str, bucket: TokenBucket):
+        self.wxid = wxid
+        self.queues: Dict[str, Deque[_Job]] = {lane: deque() for lane in LANES}
+        self.bucket = bucket
+        self.state = self.IDLE
+        self.ready_lane: Optional[str] = None
+
+    def next_lane(self) -> Optional[str]:
+        for lane in LANES:
+            if self.queues[lane]:
+                return lane
+        return None
+
+
+class _LaneStats:
+    __slots__ = ("depth", "submitted", "sent", "failed", "total_wait_time", "max_wait_time")
+
+    def __init__(self):
+        self.depth = 0
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+
+class SendScheduler:
+    """按接收方排队的消息发送调度器
+
+    同一接收方、同一通道的消息按提交顺序发送，同一接收方同一时刻只有一条消息在发送；
+    交互通道的消息可以越过同一接收方排在后面的群发消息。有多个接收方可以发送时，
+    先发交互通道，同一通道内按轮转顺序。
+
+    Args:
+        rate (float): 每个接收方每秒最多发送的条数，不大于0时不限制
+        burst (int): 每个接收方允许连续发送的条数
+        global_rate (float): 所有接收方合计每秒最多发送的条数，不大于0时不限制
+        global_burst (int): 所有接收方合计允许连续发送的条数
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, global_rate: float = 5.0, global_burst: int = 5):
+        self.rate = rate
+        self.burst = burst
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+
+        self._recipients: Dict[str, _Recipient] = {}
+        self._ready: Dict[str, Deque[_Recipient]] = {lane: deque() for lane in LANES}
+        self._delayed: List[tuple] = []  # (可发送时间, 序号, 接收方)
+        self._delayed_seq = 0
+        self._lanes = {lane: _LaneStats() for lane in LANES}
+        self._sending = 0
+        self._prune_threshold = 1000
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, rate: float = None, burst: int = None, global_rate: float = None, global_burst: int = None):
+        """修改发送速率，已创建的接收方令牌桶同时更新"""
+        if rate is not None:
+            self.rate = rate
+        if burst is not None:
+            self.burst = burst
+        for recipient in self._recipients.values():
+            recipient.bucket.rate = self.rate
+            recipient.bucket.capacity = max(1, self.burst)
+        if global_rate is not None:
+            self._global_bucket.rate = global_rate
+        if global_burst is not None:
+            self._global_bucket.capacity = max(1, global_burst)
+
+    async def submit(self, wxid: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """提交一条消息，等待发送完成并返回 func 的结果
+
+        Args:
+            wxid (str): 接收方wxid
+            func: 实际发送消息的协程函数，以 func(*args, **kwargs) 调用
+        """
+        lane = current_lane()
+        loop = asyncio.get_running_loop()
+        owner = self._loop
+        if owner is not None and owner is not loop and owner.is_running():
+            # 在其他事件循环中调用（如管理后台线程），交给调度器所在的事件循环发送
+            future = asyncio.run_coroutine_threadsafe(self._submit(wxid, lane, func, args, kwargs), owner)
+            return await asyncio.wrap_future(future)
+        return await self._submit(wxid, lane, func, args, kwargs)
+
+    async def _submit(self, wxid, lane, func, args, kwargs):
+        self._ensure_started()
+        future = self._loop.create_future()
+        recipient = self._recipients.get(wxid)
+        if recipient is None:
+            recipient = self._recipients[wxid] = _Recipient(wxid, TokenBucket(self.rate, self.burst))
+        recipient.queues[lane].append(_Job(func, args, kwargs, future, lane))
+        stats = self._lanes[lane]
+        stats.depth += 1
+        stats.submitted += 1
+
+        if recipient.state == _Recipient.IDLE:
+            self._schedule(recipient)
+        elif recipient.state == _Recipient.READY and LANES.index(lane) < LANES.index(recipient.ready_lane):
+            # 排队中的接收方有了更高优先级的消息，提升到对应的就绪队列，原队列中的旧条目在取出时跳过
+            recipient.ready_lane = lane
+            self._ready[lane].append(recipient)
+            self._wakeup.set()
+        return await future
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    def _schedule(self, recipient: _Recipient):
+        """接收方有待发送的消息且没有在发送时，放入就绪队列或等待令牌"""
+        lane = recipient.next_lane()
+        if lane is None:
+            recipient.state = _Recipient.IDLE
+            return
+        now = time.monotonic()
+        delay = recipient.bucket.delay(now)
+        if delay > 0:
+            recipient.state = _Recipient.DELAYED
+            self._delayed_seq += 1
+            heapq.heappush(self._delayed, (now + delay, self._delayed_seq, recipient))
+        else:
+            recipient.state = _Recipient.READY
+            recipient.ready_lane = lane
+            self._ready[lane].append(recipient)
+        self._wakeup.set()
+
+    def _next_ready(self) -> Optional[_Recipient]:
+        for lane in LANES:
+            ready = self._ready[lane]
+            while ready:
+                recipient = ready[0]
+                if recipient.state == _Recipient.READY and recipient.ready_lane == lane:
+                    return recipient
+                ready.popleft()
+        return None
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, recipient = heapq.heappop(self._delayed)
+                    if recipient.state == _Recipient.DELAYED:
+                        self._schedule(recipient)
+
+                recipient = self._next_ready()
+                if recipient is None:
+                    timeout = self._delayed[0][0] - now if self._delayed else None
+                    await self._wait(timeout)
+                    continue
+
+                delay = self._global_bucket.delay(now)
+                if delay > 0:
+                    # 等待期间到达的交互消息仍然可以排到前面
+                    await asyncio.sleep(delay)
+                    continue
+
+                self._ready[recipient.ready_lane].popleft()
+                self._start(recipient, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"消息发送调度出错: {e}")
+                await asyncio.sleep(1)
+
+    async def _wait(self, timeout: Optional[float]):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _start(self, recipient: _Recipient, now: float):
+        lane = recipient.ready_lane
+        job = recipient.queues[lane].popleft()
+        recipient.state = _Recipient.SENDING
+        recipient.bucket.consume(now)
+        self._global_bucket.consume(now)
+
+        stats = self._lanes[lane]
+        stats.depth -= 1
+        wait_time = now - job.enqueued_at
+        stats.total_wait_time += wait_time
+        if wait_time > stats.max_wait_time:
+            stats.max_wait_time = wait_time
+        self._sending += 1
+        self._loop.create_task(self._send(recipient, job))
+
+    async def _send(self, recipient: _Recipient, job: _Job):
+        stats = self._lanes[job.lane]
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            stats.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            stats.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._sending -= 1
+            recipient.state = _Recipient.IDLE
+            if recipient.next_lane() is not None:
+                self._schedule(recipient)
+            elif recipient.bucket.is_full(time.monotonic()):
+                # 令牌已补满的空闲接收方可以直接删除，再次发送时重新创建
+                self._recipients.pop(recipient.wxid, None)
+            self._prune()
+
+    def _prune(self):
+        # 令牌未补满的空闲接收方会留在字典里，数量较多时顺带清理
+        if len(self._recipients) <= self._prune_threshold:
+            return
+        now = time.monotonic()
+        for wxid, recipient in list(self._recipients.items()):
+            if recipient.state == _Recipient.IDLE and recipient.next_lane() is None and recipient.bucket.is_full(now):
+                del self._recipients[wxid]
+        self._prune_threshold = max(1000, len(self._recipients) * 2)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取各通道的队列深度、发送数和等待时间"""
+        lanes = {}
+        for lane, stats in self._lanes.items():
+            started = stats.submitted - stats.depth
+            lanes[lane] = {
+                "depth": stats.depth,
+                "submitted": stats.submitted,
+                "sent": stats.sent,
+                "failed": stats.failed,
+                "avg_wait_ms": round(stats.total_wait_time / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(stats.max_wait_time * 1000, 2),
+            }
+        return {
+            "lanes": lanes,
+            "recipients": len(self._recipients),
+            "sending": self._sending,
+            "rate": self.rate,
+            "burst": self.burst,
+            "global_rate": self._global_bucket.rate,
+            "global_burst": self._global_bucket.capacity,
+        }
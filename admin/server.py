@@ -1526,9 +1526,61 @@ def setup_routes():
         if not username:
             return JSONResponse(status_code=401, content={"success": False, "error": "未认证"})
 
+        status = get_system_status()
+        try:
+            from utils.plugin_manager import plugin_manager
+            status["plugin_startup"] = plugin_manager.get_startup_profile()
+        except Exception as e:
+            logger.error(f"获取插件启动耗时失败: {e}")
+
+        return {
+            "success": True,
+            "data": status
+        }
+
+    # API: 运行指标 (需要认证)
+    @app.get("/api/system/metrics", response_class=JSONResponse)
+    async def api_system_metrics(request: Request):
+        # 检查认证状态
+        username = await check_auth(request)
+        if not username:
+            return JSONResponse(status_code=401, content={"success": False, "error": "未认证"})
+
+        metrics = {}
+        dispatcher = getattr(bot_instance, "dispatcher", None)
+        if dispatcher is not None:
+            metrics["dispatcher"] = dispatcher.stats()
+        msg_db = getattr(bot_instance, "msg_db", None)
+        if msg_db is not None:
+            metrics["message_db"] = msg_db.stats()
+        contact_refresher = getattr(bot_instance, "contact_refresher", None)
+        if contact_refresher is not None:
+            metrics["contact_refresher"] = contact_refresher.stats()
+        try:
+            from database.contacts_store import get_store
+            metrics["contacts_cache"] = get_store().stats()
+        except Exception as e:
+            logger.error(f"获取联系人缓存统计失败: {e}")
+        try:
+            from utils.config_service import get_config_service
+            metrics["config"] = get_config_service().stats()
+        except Exception as e:
+            logger.error(f"获取配置服务统计失败: {e}")
+        roster_cache = getattr(bot_instance, "roster_cache", None)
+        if roster_cache is not None:
+            metrics["group_roster"] = roster_cache.stats()
+        send_scheduler = getattr(getattr(bot_instance, "bot", None), "send_scheduler", None)
+        if send_scheduler is not None:
+            metrics["send_scheduler"] = send_scheduler.stats()
+        try:
+            from WechatAPI.media_pipeline import get_media_pipeline
+            metrics["media_pipeline"] = get_media_pipeline().stats()
+        except Exception as e:
+            logger.error(f"获取媒体处理统计失败: {e}")
+
         return {
             "success": True,
-            "data": get_system_status()
+            "data": metrics
         }
 
     # API: 系统统计 (需要认证)
@@ -4609,14 +4661,59 @@ except:
                 }
             )
 
+    # 可能的日志文件位置
+    SYSTEM_LOG_PATHS = [
+        "logs/latest.log",
+        "logs/xybot.log",
+        "logs/XYBot_*.log",
+        "_data/logs/XYBot_*.log",
+        "../logs/XYBot_*.log",
+        "./logs/XYBot_*.log",
+        # 相对于当前目录的位置
+        os.path.join(current_dir, "../logs/latest.log"),
+        os.path.join(current_dir, "../logs/xybot.log"),
+        os.path.join(current_dir, "../logs/XYBot_*.log"),
+        os.path.join(current_dir, "./logs/latest.log"),
+    ]
+    SYSTEM_LOG_PAGE_SIZE = 1000  # 未指定 limit 时每页返回的行数
+    SYSTEM_LOG_MAX_PAGE_SIZE = 5000
+    LOG_TIME_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})')
+    LOG_CONTENT_PATTERN = re.compile(r'\|\s*(?:TRACE|DEBUG|INFO|SUCCESS|WARNING|ERROR|CRITICAL)\s*\|\s*(.*)')
+
+    def find_system_logs() -> List[str]:
+        """查找存在的日志文件"""
+        found_logs = []
+        for path_pattern in SYSTEM_LOG_PATHS:
+            for log_file in glob.glob(path_pattern):
+                log_file = os.path.normpath(log_file)
+                if os.path.isfile(log_file) and log_file not in found_logs:
+                    found_logs.append(log_file)
+        return found_logs
+
+    def log_entry(line) -> Optional[dict]:
+        """把索引中的一行日志转换为接口返回的格式，空行返回 None"""
+        raw = line.text.strip()
+        if not raw:
+            return None
+        entry = {"raw": raw, "level": line.level_name}
+        time_match = LOG_TIME_PATTERN.match(raw)
+        if time_match:
+            entry["timestamp"] = time_match.group(1)
+        content_match = LOG_CONTENT_PATTERN.search(raw)
+        entry["message"] = content_match.group(1).strip() if content_match else raw
+        return entry
+
     # API: 系统日志 (需要认证)
     @app.get("/api/system/logs", response_class=JSONResponse)
-    async def api_system_logs(request: Request, log_level: str = None, limit: int = 0):
+    async def api_system_logs(request: Request, log_level: str = None, limit: int = 0, before: int = None):
         """获取系统日志
 
+        从最新日志文件的末尾按块读取，不会把整个文件读入内存。
+
         参数:
             log_level: 日志级别过滤
-            limit: 返回的日志行数，0表示返回所有行
+            limit: 返回的日志行数，0表示使用默认的每页行数
+            before: 翻页游标，传入上一页返回的 cursor 获取更早的日志
         """
         # 检查认证状态
         username = await check_auth(request)
@@ -4624,27 +4721,7 @@ except:
             return JSONResponse(status_code=401, content={"success": False, "error": "未认证"})
 
         try:
-            # 可能的日志文件位置
-            log_paths = [
-                "logs/latest.log",
-                "logs/xybot.log",
-                "logs/XYBot_*.log",
-                "_data/logs/XYBot_*.log",
-                "../logs/XYBot_*.log",
-                "./logs/XYBot_*.log",
-                # 相对于当前目录的位置
-                os.path.join(current_dir, "../logs/latest.log"),
-                os.path.join(current_dir, "../logs/xybot.log"),
-                os.path.join(current_dir, "../logs/XYBot_*.log"),
-                os.path.join(current_dir, "./logs/latest.log"),
-            ]
-
-            # 查找存在的日志文件
-            found_logs = []
-            for path_pattern in log_paths:
-                for log_file in glob.glob(path_pattern):
-                    if os.path.exists(log_file) and os.path.isfile(log_file):
-                        found_logs.append(log_file)
+            found_logs = await asyncio.to_thread(find_system_logs)
 
             # 如果没找到日志文件
             if not found_logs:
@@ -4658,61 +4735,23 @@ except:
 
             # 选择最新的日志文件
             latest_log = max(found_logs, key=os.path.getmtime)
-            logger.info(f"读取日志文件: {latest_log}")
-
-            # 读取日志文件并按行返回
-            log_entries = []
             log_files = [os.path.basename(log) for log in found_logs]
 
-            with open(latest_log, "r", encoding="utf-8", errors="ignore") as f:
-                lines = f.readlines()
-                # 如果指定了limit并且大于0，则只获取最后的limit行
-                # 否则获取所有行
-                if limit > 0:
-                    lines = lines[-limit:]
-
-                logger.info(f"读取日志行数: {len(lines)}")
-
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # 解析日志行
-                    log_entry = {"raw": line}
-
-                    # 尝试解析日志级别
-                    level_match = re.search(r'\|\s*(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s*\|', line)
-                    if level_match:
-                        log_entry["level"] = level_match.group(1).lower()
-                    else:
-                        log_entry["level"] = "info"  # 默认级别
-
-                    # 如果指定了级别过滤，且不匹配，则跳过
-                    if log_level and log_entry["level"] != log_level.lower():
-                        continue
-
-                    # 尝试解析时间戳
-                    time_match = re.search(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})', line)
-                    if time_match:
-                        log_entry["timestamp"] = time_match.group(1)
-
-                    # 尝试解析消息内容
-                    content_match = re.search(r'\|\s*(DEBUG|INFO|WARNING|ERROR|CRITICAL)\s*\|\s*(.*)', line)
-                    if content_match:
-                        log_entry["message"] = content_match.group(2).strip()
-                    else:
-                        log_entry["message"] = line
-
-                    log_entries.append(log_entry)
+            from utils.log_index import get_log_index
+            index = get_log_index(latest_log)
+            limit = min(limit, SYSTEM_LOG_MAX_PAGE_SIZE) if limit > 0 else SYSTEM_LOG_PAGE_SIZE
+            lines, cursor = await asyncio.to_thread(index.page, before, limit, log_level)
+            log_entries = [entry for entry in map(log_entry, lines) if entry]
 
-            # 添加日志文件路径，用于下载
+            # 添加日志文件路径，用于下载；cursor 用于继续向前翻页，end 用于 /ws/system/logs 跟踪新日志
             return {
                 "success": True,
                 "logs": log_entries,
                 "log_files": log_files,
                 "current_log": os.path.basename(latest_log),
-                "log_path": latest_log  # 添加日志文件路径
+                "log_path": latest_log,  # 添加日志文件路径
+                "cursor": cursor,
+                "end": index.end
             }
 
         except Exception as e:
@@ -4723,6 +4762,70 @@ except:
                 content={"success": False, "error": f"获取系统日志失败: {str(e)}"}
             )
 
+    # WebSocket: 持续跟踪系统日志 (需要认证)
+    @app.websocket("/ws/system/logs")
+    async def websocket_system_logs(websocket: WebSocket):
+        """推送新写入的日志，替代前端定时轮询 /api/system/logs
+
+        查询参数:
+            log_level: 日志级别过滤
+            log_file: 开始跟踪的日志文件名，与 offset 一起使用
+            offset: 从该偏移开始推送，一般为 /api/system/logs 返回的 end，为空时只推送连接之后的新日志
+        """
+        if not await check_auth(websocket):
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+
+        from utils.log_index import get_log_index
+        log_level = websocket.query_params.get("log_level") or None
+        log_file = websocket.query_params.get("log_file")
+        offset = websocket.query_params.get("offset", "")
+        index = None
+        generation = 0
+        last_scan = 0
+        try:
+            while True:
+                # 日志按天切分，定期检查是否有更新的日志文件
+                if index is None or time.time() - last_scan > 10:
+                    last_scan = time.time()
+                    found_logs = await asyncio.to_thread(find_system_logs)
+                    latest_log = max(found_logs, key=os.path.getmtime) if found_logs else None
+                    if latest_log and (index is None or index.path != os.path.abspath(latest_log)):
+                        latest_index = get_log_index(latest_log)
+                        if index is not None:
+                            # 切换到新的日志文件，从头推送
+                            offset = 0
+                        elif log_file == os.path.basename(latest_log) and str(offset).isdigit():
+                            offset = int(offset)
+                        else:
+                            await asyncio.to_thread(latest_index.refresh)
+                            offset = latest_index.end
+                        index = latest_index
+                        generation = index.generation
+                        await websocket.send_json({"type": "file", "log_file": os.path.basename(latest_log)})
+
+                if index is not None:
+                    await asyncio.to_thread(index.refresh)
+                    if index.generation != generation:
+                        # 文件被截断或替换，从新内容的开头推送
+                        generation = index.generation
+                        offset = 0
+                    lines, offset = await asyncio.to_thread(index.since, offset, SYSTEM_LOG_PAGE_SIZE, log_level)
+                    log_entries = [entry for entry in map(log_entry, lines) if entry]
+                    if log_entries:
+                        await websocket.send_json({"type": "logs", "logs": log_entries, "end": offset})
+
+                # 等待下一轮的同时接收客户端消息，以便及时发现连接断开
+                try:
+                    await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"推送系统日志失败: {str(e)}")
+
     # API: 更新数据库中所有联系人信息
     @app.get("/api/contacts/update_all", response_class=JSONResponse)
     async def api_update_all_contacts(request: Request):
@@ -6168,6 +6271,11 @@ except:
                 logger.info(f"正在获取群 {wxid} 的成员列表")
                 import asyncio
 
+                # 请求中带 refresh 时丢弃缓存的名单，重新拉取
+                roster_cache = getattr(bot_instance, "roster_cache", None)
+                if data.get("refresh") and roster_cache is not None:
+                    roster_cache.invalidate(wxid)
+
                 # 调用API获取群成员
                 if asyncio.get_event_loop().is_running():
                     members = await bot_instance.get_chatroom_member_list(wxid)
@@ -6236,16 +6344,17 @@ except:
 
                     processed_members.append(processed_member)
 
-                # 尝试将群成员保存到数据库
-                try:
-                    from database.group_members_db import save_group_members_to_db
-                    save_result = save_group_members_to_db(wxid, members)
-                    if save_result:
-                        logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
-                    else:
-                        logger.warning(f"将群 {wxid} 的成员保存到数据库失败")
-                except Exception as e:
-                    logger.error(f"将群成员保存到数据库时出错: {str(e)}")
+                # 尝试将群成员保存到数据库（群成员名单缓存拉取时已经写入数据库）
+                if roster_cache is None:
+                    try:
+                        from database.group_members_db import save_group_members_to_db
+                        save_result = save_group_members_to_db(wxid, members)
+                        if save_result:
+                            logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
+                        else:
+                            logger.warning(f"将群 {wxid} 的成员保存到数据库失败")
+                    except Exception as e:
+                        logger.error(f"将群成员保存到数据库时出错: {str(e)}")
 
                 # 返回处理后的成员列表
                 return JSONResponse(
@@ -6440,6 +6549,11 @@ except:
                 logger.info(f"正在获取群 {wxid} 的成员列表")
                 import asyncio
 
+                # 请求中带 refresh 时丢弃缓存的名单，重新拉取
+                roster_cache = getattr(bot_instance, "roster_cache", None)
+                if data.get("refresh") and roster_cache is not None:
+                    roster_cache.invalidate(wxid)
+
                 # 调用API获取群成员
                 if asyncio.get_event_loop().is_running():
                     members = await bot_instance.get_chatroom_member_list(wxid)
@@ -6508,16 +6622,17 @@ except:
 
                     processed_members.append(processed_member)
 
-                # 尝试将群成员保存到数据库
-                try:
-                    from database.group_members_db import save_group_members_to_db
-                    save_result = save_group_members_to_db(wxid, members)
-                    if save_result:
-                        logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
-                    else:
-                        logger.warning(f"将群 {wxid} 的成员保存到数据库失败")
-                except Exception as e:
-                    logger.error(f"将群成员保存到数据库时出错: {str(e)}")
+                # 尝试将群成员保存到数据库（群成员名单缓存拉取时已经写入数据库）
+                if roster_cache is None:
+                    try:
+                        from database.group_members_db import save_group_members_to_db
+                        save_result = save_group_members_to_db(wxid, members)
+                        if save_result:
+                            logger.info(f"成功将群 {wxid} 的 {len(members)} 个成员保存到数据库")
+                        else:
+                            logger.warning(f"将群 {wxid} 的成员保存到数据库失败")
+                    except Exception as e:
+                        logger.error(f"将群成员保存到数据库时出错: {str(e)}")
 
                 # 返回处理后的成员列表
                 return JSONResponse(
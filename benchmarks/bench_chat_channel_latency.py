@@ -0,0 +1,137 @@
+"""
+ChatChannel 消息调度延迟基准测试
+
+1000个会话在2秒内各发送3条消息，记录从 produce 到 _handle 开始执行的延迟。
+对比旧写法（消费线程每0.2秒加锁遍历所有会话）与就绪队列（有消息时唤醒消费线程）。
+
+运行: python benchmarks/bench_chat_channel_latency.py
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "dow"))
+
+SESSIONS = 1000
+MESSAGES_PER_SESSION = 3
+DURATION = 2.0
+
+
+def _make_channels():
+    from collections import OrderedDict
+
+    from bridge.context import Context, ContextType
+    from channel import chat_channel
+    from channel.chat_channel import ChatChannel
+    from common.dequeue import Dequeue
+
+    class Recorder:
+        def __init__(self):
+            self.latencies = []
+            self.done = threading.Semaphore(0)
+
+        def handle(self, context):
+            self.latencies.append(time.perf_counter() - context["produced_at"])
+            time.sleep(0.001)  # 模拟处理消息
+            self.done.release()
+
+    class LegacyChannel(ChatChannel):
+        """旧的轮询消费者"""
+        futures = {}
+        sessions = {}
+        lock = threading.Lock()
+
+        def __init__(self, recorder):
+            self._handle = recorder.handle
+            super().__init__()
+
+        def _thread_pool_callback(self, session_id, **kwargs):
+            def func(worker):
+                with self.lock:
+                    self.sessions[session_id][1].release()
+
+            return func
+
+        def produce(self, context):
+            session_id = context.get("session_id", 0)
+            with self.lock:
+                if session_id not in self.sessions:
+                    self.sessions[session_id] = [Dequeue(), threading.BoundedSemaphore(4)]
+                self.sessions[session_id][0].put(context)
+
+        def consume(self):
+            while True:
+                with self.lock:
+                    session_ids = list(self.sessions.keys())
+                for session_id in session_ids:
+                    with self.lock:
+                        context_queue, semaphore = self.sessions[session_id]
+                    if semaphore.acquire(blocking=False):
+                        if not context_queue.empty():
+                            context = context_queue.get()
+                            future = chat_channel.handler_pool.submit(self._handle, context)
+                            future.add_done_callback(self._thread_pool_callback(session_id, context=context))
+                            with self.lock:
+                                self.futures.setdefault(session_id, []).append(future)
+                        elif semaphore._initial_value == semaphore._value + 1:
+                            with self.lock:
+                                self.futures[session_id] = [t for t in self.futures[session_id] if not t.done()]
+                                del self.sessions[session_id]
+                        else:
+                            semaphore.release()
+                time.sleep(0.2)
+
+    class ReadyQueueChannel(ChatChannel):
+        futures = {}
+        sessions = {}
+        lock = threading.Lock()
+        ready = OrderedDict()
+        ready_cond = threading.Condition(lock)
+
+        def __init__(self, recorder):
+            self._handle = recorder.handle
+            super().__init__()
+
+    def run(channel_cls):
+        recorder = Recorder()
+        channel = channel_cls(recorder)
+        schedule = sorted((random.uniform(0, DURATION), f"session_{i}")
+                          for i in range(SESSIONS) for _ in range(MESSAGES_PER_SESSION))
+        start = time.perf_counter()
+        for at, session_id in schedule:
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            context = Context(ContextType.TEXT, "hello", kwargs={})  # kwargs 默认值是共享的字典
+            context["session_id"] = session_id
+            context["produced_at"] = time.perf_counter()
+            channel.produce(context)
+        for _ in schedule:
+            recorder.done.acquire()
+        latencies = sorted(recorder.latencies)
+        avg = sum(latencies) / len(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        return avg, p99
+
+    return run, LegacyChannel, ReadyQueueChannel
+
+
+def main():
+    run, legacy_cls, ready_cls = _make_channels()
+    legacy_avg, legacy_p99 = run(legacy_cls)
+    ready_avg, ready_p99 = run(ready_cls)
+    total = SESSIONS * MESSAGES_PER_SESSION
+    print(f"{SESSIONS}个会话共{total}条消息  轮询 平均延迟 {legacy_avg:.1f} ms, p99 {legacy_p99:.1f} ms  "
+          f"就绪队列 平均延迟 {ready_avg:.2f} ms, p99 {ready_p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.join(ROOT, "dow"))
+    from common.log import logger
+
+    logger.disabled = True
+    main()
@@ -0,0 +1,83 @@
+"""
+EventManager.emit 分发开销基准测试
+
+对比旧的逐处理函数深拷贝与新的只读视图分发，40个处理函数绑定到同一事件。
+
+运行: python benchmarks/bench_event_emit.py
+"""
+
+import asyncio
+import base64
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.event_manager import EventManager  # noqa: E402
+
+HANDLER_COUNT = 40
+ROUNDS = 50
+
+
+class _Plugin:
+    async def handle(self, bot, message):
+        return message.get("Content") is not None
+
+
+def _make_handlers():
+    handlers = []
+    for i in range(HANDLER_COUNT):
+        plugin = _Plugin()
+        handlers.append((plugin.handle, plugin, 50))
+    return handlers
+
+
+async def _legacy_emit(handlers, api_client, message, **kwargs):
+    # 旧实现：每个处理函数都深拷贝一次消息和参数
+    for handler, instance, priority in handlers:
+        handler_args = (api_client, copy.deepcopy(message))
+        new_kwargs = {k: copy.deepcopy(v) for k, v in kwargs.items()}
+        await handler(*handler_args, **new_kwargs)
+
+
+def _make_message(content_size: int) -> dict:
+    return {
+        "MsgId": 1234567890,
+        "MsgType": 3,
+        "FromWxid": "12345678@chatroom",
+        "SenderWxid": "wxid_sender",
+        "ToWxid": "wxid_bot",
+        "Content": base64.b64encode(os.urandom(content_size)).decode(),
+        "Ats": ["wxid_a", "wxid_b"],
+        "MsgSource": "<msgsource><atuserlist>wxid_a,wxid_b</atuserlist></msgsource>",
+        "IsGroup": True,
+    }
+
+
+async def _measure(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def main():
+    handlers = _make_handlers()
+    EventManager._handlers["bench_message"] = handlers
+    EventManager._routes.pop("bench_message", None)
+
+    for label, size in (("文本消息", 200), ("图片消息(1MB)", 1024 * 1024)):
+        message = _make_message(size)
+        before = await _measure(lambda: _legacy_emit(handlers, None, message), ROUNDS)
+        after = await _measure(lambda: EventManager.emit("bench_message", None, message), ROUNDS)
+        print(f"{label}: {HANDLER_COUNT}个处理函数  深拷贝 {before:.3f} ms/条  "
+              f"只读视图 {after:.3f} ms/条  提升 {before / after:.1f}x")
+
+    EventManager._handlers.pop("bench_message", None)
+    EventManager._routes.pop("bench_message", None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
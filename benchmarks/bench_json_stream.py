@@ -0,0 +1,118 @@
+"""
+流式 base64 请求体基准测试
+
+向本地 aiohttp 服务发送一个50MB视频，记录发送过程中 Python 分配内存的峰值。
+对比旧写法（读入整个文件、base64 编码后拼进 JSON，用 json= 发送）与
+StreamingJsonPayload（mmap 读取文件，按块编码写入请求体）。服务端逐块读取并丢弃请求体。
+发送前先用小文件检查服务端收到的 JSON 与旧写法一致。
+
+运行: python benchmarks/bench_json_stream.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VIDEO_SIZE = 50 * 1024 * 1024
+
+
+async def _serve():
+    from aiohttp import web
+
+    received = {}
+
+    async def handler(request):
+        if request.query.get("keep"):
+            received["body"] = await request.read()
+        else:
+            size = 0
+            async for chunk in request.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+            received["size"] = size
+        received["length"] = request.content_length
+        return web.json_response({"Success": True})
+
+    app = web.Application(client_max_size=1024 ** 3)
+    app.router.add_post("/VXAPI/Msg/SendVideo", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/VXAPI/Msg/SendVideo", received
+
+
+async def _legacy_send(session, url, path):
+    with open(path, "rb") as f:
+        video = f.read()
+    vid_base64 = base64.b64encode(video).decode()
+    json_param = {"Wxid": "wxid_bot", "ToWxid": "wxid_user", "Base64": "data:video/mp4;base64," + vid_base64,
+                  "ImageBase64": "data:image/jpeg;base64,", "PlayLength": 10}
+    async with session.post(url, json=json_param) as resp:
+        return await resp.json()
+
+
+async def _stream_send(session, url, path):
+    from WechatAPI.json_stream import Base64Field, StreamingJsonPayload
+
+    json_param = {"Wxid": "wxid_bot", "ToWxid": "wxid_user", "Base64": Base64Field(path, "data:video/mp4;base64,"),
+                  "ImageBase64": "data:image/jpeg;base64,", "PlayLength": 10}
+    async with session.post(url, data=StreamingJsonPayload(json_param)) as resp:
+        return await resp.json()
+
+
+async def _measure(send, session, url, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    await send(session, url, path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed * 1000
+
+
+async def _bench(session, url, received, tmp):
+    small = os.path.join(tmp, "small.mp4")
+    with open(small, "wb") as f:
+        f.write(os.urandom(1_000_001))
+    await _legacy_send(session, url + "?keep=1", small)
+    expected = json.loads(received["body"])
+    await _stream_send(session, url + "?keep=1", small)
+    assert json.loads(received["body"]) == expected and received["length"] == len(received["body"])
+
+    path = os.path.join(tmp, "video.mp4")
+    with open(path, "wb") as f:
+        for _ in range(VIDEO_SIZE // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+
+    legacy = await _measure(_legacy_send, session, url, path)
+    legacy_size = received["size"]
+    stream = await _measure(_stream_send, session, url, path)
+    assert received["size"] == legacy_size == received["length"]
+    return legacy, stream
+
+
+async def main():
+    import aiohttp
+
+    runner, url, received = await _serve()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            async with aiohttp.ClientSession() as session:
+                (legacy_peak, legacy_time), (stream_peak, stream_time) = await _bench(session, url, received, tmp)
+    finally:
+        await runner.cleanup()
+
+    print(f"发送{VIDEO_SIZE // 1024 // 1024}MB视频  json= 内存峰值 {legacy_peak:.0f} MB, 耗时 {legacy_time:.0f} ms  "
+          f"流式请求体 内存峰值 {stream_peak:.1f} MB, 耗时 {stream_time:.0f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
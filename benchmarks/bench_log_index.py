@@ -0,0 +1,82 @@
+"""
+日志索引基准测试
+
+生成约200MB的日志文件，对比旧写法（readlines 读入整个文件后取最后1000行）
+与 LogIndex 从文件末尾按块读取的耗时，以及按级别过滤取最后100条 ERROR 日志的耗时。
+
+运行: python benchmarks/bench_log_index.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGET_SIZE = 200 * 1024 * 1024
+LIMIT = 1000
+
+
+def _write_log(path):
+    levels = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "DEBUG", "INFO", "DEBUG"]
+    with open(path, "w", encoding="utf-8") as f:
+        i = 0
+        chunk = []
+        while f.tell() < TARGET_SIZE:
+            level = "ERROR" if i % 5000 == 0 else levels[i % len(levels)]
+            chunk.append(f"2025-01-01 12:00:00 | {level: <8} | utils/xybot:123 | 收到消息 {i} " + "x" * (i % 200) + "\n")
+            i += 1
+            if len(chunk) >= 10000:
+                f.write("".join(chunk))
+                chunk = []
+        f.write("".join(chunk))
+
+
+def _legacy_tail(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        lines = f.readlines()
+    return lines[-LIMIT:]
+
+
+def _legacy_errors(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        lines = f.readlines()
+    return [line for line in lines if "| ERROR    |" in line][-100:]
+
+
+def main():
+    from utils.log_index import LogIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "XYBot_bench.log")
+        _write_log(path)
+        size = os.path.getsize(path) / 1024 / 1024
+
+        start = time.perf_counter()
+        _legacy_tail(path)
+        legacy_tail = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        _legacy_errors(path)
+        legacy_errors = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        LogIndex(path).tail(LIMIT)
+        index_tail = (time.perf_counter() - start) * 1000
+
+        index = LogIndex(path)
+        start = time.perf_counter()
+        index.tail(100, level="error")
+        index_errors = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        index.tail(100, level="error")
+        index_errors_warm = (time.perf_counter() - start) * 1000
+
+    print(f"{size:.0f}MB日志  最后{LIMIT}行 readlines {legacy_tail:.0f} ms -> 索引 {index_tail:.1f} ms  "
+          f"最后100条ERROR readlines {legacy_errors:.0f} ms -> 索引 {index_errors:.0f} ms (已索引 {index_errors_warm:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
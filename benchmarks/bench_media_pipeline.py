@@ -0,0 +1,91 @@
+"""
+语音转码事件循环阻塞基准测试
+
+同时转码8段20秒的44.1kHz wav语音，期间每1毫秒记录一次事件循环的调度延迟。
+对比旧写法（在事件循环中解码、重采样，silk 编码交给 pysilk 的线程）与媒体处理进程池，
+并记录重复发送同一段语音时命中缓存的耗时。
+
+运行: python benchmarks/bench_media_pipeline.py
+"""
+
+import asyncio
+import base64
+import io
+import math
+import os
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VOICES = 8
+SECONDS = 20
+RATE = 44100
+
+
+def _make_wav(freq: float) -> bytes:
+    frames = b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * i / RATE)))
+                      for i in range(RATE * SECONDS))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(frames)
+    return buffer.getvalue()
+
+
+async def _legacy_encode(data: bytes):
+    import pysilk
+    from pydub import AudioSegment
+
+    from WechatAPI.media_pipeline import closest_frame_rate
+
+    audio = AudioSegment.from_file(io.BytesIO(data), format="wav").set_channels(1)
+    audio = audio.set_frame_rate(closest_frame_rate(audio.frame_rate))
+    return base64.b64encode(await pysilk.async_encode(audio.raw_data, sample_rate=audio.frame_rate)).decode(), len(audio)
+
+
+async def _measure(encode, voices):
+    lags = []
+    done = False
+
+    async def probe():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(encode(data) for data in voices))
+    total = time.perf_counter() - start
+    done = True
+    await probe_task
+    return max(lags) * 1000, total * 1000
+
+
+async def main():
+    from WechatAPI.media_pipeline import MediaPipeline
+
+    voices = [_make_wav(300 + i * 50) for i in range(VOICES)]
+    legacy_lag, legacy_total = await _measure(_legacy_encode, voices)
+
+    pipeline = MediaPipeline(workers=2)
+    pipeline.start()
+    await pipeline.encode_voice(_make_wav(100)[:100000], "wav")  # 等待进程池启动
+    lag, total = await _measure(lambda data: pipeline.encode_voice(data, "wav"), voices)
+
+    start = time.perf_counter()
+    await pipeline.encode_voice(voices[0], "wav")
+    cached = (time.perf_counter() - start) * 1000
+    pipeline.shutdown()
+
+    print(f"{VOICES}段{SECONDS}秒wav转silk  在事件循环中 最大阻塞 {legacy_lag:.0f} ms, 总耗时 {legacy_total:.0f} ms  "
+          f"进程池 最大阻塞 {lag:.1f} ms, 总耗时 {total:.0f} ms  重复发送命中缓存 {cached:.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
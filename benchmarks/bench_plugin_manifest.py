@@ -0,0 +1,108 @@
+"""
+插件清单启动基准测试
+
+在临时目录生成30个插件，其中25个被禁用，每个被禁用的插件导入一个耗时40毫秒的依赖
+（模拟 moviepy、matplotlib、jieba 等重量级依赖）。各自在新进程中对比旧写法
+（导入所有插件模块后查找插件类）与 PluginManager 按清单只导入启用插件的启动耗时，
+以及清单首次解析和之后从缓存读取的耗时。
+
+运行: python benchmarks/bench_plugin_manifest.py
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PLUGINS = 30
+DISABLED = 25
+DEPENDENCY_TIME = 0.04
+
+PLUGIN_TEMPLATE = '''
+import heavy_dep_{i}
+from utils.decorators import on_text_message
+from utils.plugin_base import PluginBase
+
+
+class Plugin{i}(PluginBase):
+    description = "插件{i}"
+    version = "1.0.{i}"
+
+    @on_text_message(priority=50)
+    async def handle_text(self, bot, message):
+        return True
+'''
+
+
+def _make_tree(tmp):
+    os.makedirs(os.path.join(tmp, "plugins"))
+    open(os.path.join(tmp, "plugins", "__init__.py"), "w").close()
+    for i in range(PLUGINS):
+        os.makedirs(os.path.join(tmp, "plugins", f"Plugin{i}"))
+        with open(os.path.join(tmp, "plugins", f"Plugin{i}", "main.py"), "w", encoding="utf-8") as f:
+            f.write(PLUGIN_TEMPLATE.format(i=i))
+        with open(os.path.join(tmp, f"heavy_dep_{i}.py"), "w", encoding="utf-8") as f:
+            f.write(f"import time\ntime.sleep({DEPENDENCY_TIME if i < DISABLED else 0})\n")
+    disabled = ", ".join(f'"Plugin{i}"' for i in range(DISABLED))
+    with open(os.path.join(tmp, "main_config.toml"), "w", encoding="utf-8") as f:
+        f.write(f"[XYBot]\ndisabled-plugins = [{disabled}]\n")
+
+
+async def _legacy_load(manager):
+    import importlib
+    import inspect
+
+    from utils.plugin_base import PluginBase
+
+    for dirname in os.listdir("plugins"):
+        if os.path.isdir(f"plugins/{dirname}") and os.path.exists(f"plugins/{dirname}/main.py"):
+            module = importlib.import_module(f"plugins.{dirname}.main")
+            for name, obj in inspect.getmembers(module):
+                if inspect.isclass(obj) and issubclass(obj, PluginBase) and obj != PluginBase:
+                    await manager.load_plugin(None, obj, is_disabled=obj.__name__ in manager.excluded_plugins)
+
+
+def _child(mode):
+    sys.path.insert(0, os.getcwd())
+    from utils.plugin_manager import PluginManager
+
+    manager = PluginManager()
+    start = time.perf_counter()
+    if mode == "legacy":
+        asyncio.run(_legacy_load(manager))
+    elif mode == "manifest":
+        asyncio.run(manager.load_plugins_from_directory(None, load_disabled_plugin=False))
+    else:
+        manager.manifest.refresh()
+    print((time.perf_counter() - start) * 1000, len(manager.plugins))
+
+
+def _run(tmp, mode):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), mode], cwd=tmp, capture_output=True,
+                            text=True, check=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    elapsed, loaded = result.stdout.split()[-2:]
+    return float(elapsed), int(loaded)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_tree(tmp)
+        cold, _ = _run(tmp, "refresh")
+        warm, _ = _run(tmp, "refresh")
+        legacy, legacy_loaded = _run(tmp, "legacy")
+        manifest, loaded = _run(tmp, "manifest")
+    assert legacy_loaded == loaded == PLUGINS - DISABLED
+    print(f"{PLUGINS}个插件({DISABLED}个禁用)启动加载  导入全部模块 {legacy:.0f} ms -> 按清单导入 {manifest:.0f} ms  "
+          f"清单首次解析 {cold:.1f} ms, 从缓存读取 {warm:.1f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _child(sys.argv[1])
+    else:
+        main()
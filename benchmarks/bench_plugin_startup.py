@@ -0,0 +1,94 @@
+"""
+插件启动初始化基准测试
+
+在临时目录生成12个插件，async_init 各需要0.2秒（模拟网络检查、拉取模型列表），
+其中一个插件需要3秒（模拟 FastGPT 启动时安装依赖）并被配置为就绪后初始化。
+对比旧写法（逐个创建实例、on_enable、async_init）与 PluginManager 并发初始化时，
+机器人可以开始处理消息前等待的时间。
+
+运行: python benchmarks/bench_plugin_startup.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLUGINS = 12
+INIT_TIME = 0.2
+SLOW_INIT_TIME = 3.0
+
+PLUGIN_TEMPLATE = '''
+import asyncio
+
+from utils.decorators import on_text_message
+from utils.plugin_base import PluginBase
+
+
+class Plugin{i}(PluginBase):
+    async def async_init(self):
+        await asyncio.sleep({init_time})
+
+    @on_text_message(priority=50)
+    async def handle_text(self, bot, message):
+        return True
+'''
+
+
+def _make_tree(tmp):
+    os.makedirs(os.path.join(tmp, "plugins"))
+    open(os.path.join(tmp, "plugins", "__init__.py"), "w").close()
+    for i in range(PLUGINS):
+        os.makedirs(os.path.join(tmp, "plugins", f"Plugin{i}"))
+        with open(os.path.join(tmp, "plugins", f"Plugin{i}", "main.py"), "w", encoding="utf-8") as f:
+            f.write(PLUGIN_TEMPLATE.format(i=i, init_time=SLOW_INIT_TIME if i == 0 else INIT_TIME))
+    with open(os.path.join(tmp, "main_config.toml"), "w", encoding="utf-8") as f:
+        f.write("[XYBot]\ndisabled-plugins = []\n")
+
+
+async def _legacy_load(manager):
+    from utils.event_manager import EventManager
+
+    for info in manager.manifest.classes():
+        plugin_class, _ = manager._import_plugin_class(info)
+        plugin = plugin_class()
+        EventManager.bind_instance(plugin)
+        await plugin.on_enable(None)
+        await plugin.async_init()
+        manager.plugins[plugin_class.__name__] = plugin
+
+
+async def main():
+    from utils.plugin_manager import PluginManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_tree(tmp)
+        sys.path.insert(0, tmp)
+        os.chdir(tmp)
+
+        legacy = PluginManager()
+        start = time.perf_counter()
+        await _legacy_load(legacy)
+        legacy_ready = time.perf_counter() - start
+        for name in list(legacy.plugins):
+            await legacy.unload_plugin(name)
+
+        manager = PluginManager()
+        manager.configure_startup(background_plugins=["Plugin0"])
+        start = time.perf_counter()
+        await manager.load_plugins_from_directory(None, load_disabled_plugin=False, defer_background=True)
+        ready = time.perf_counter() - start
+        await manager.start_background_plugins(None)
+        all_loaded = time.perf_counter() - start
+        assert len(manager.plugins) == PLUGINS
+        os.chdir(os.path.dirname(tmp))
+
+    print(f"{PLUGINS}个插件启动  逐个初始化 就绪前等待 {legacy_ready:.2f} s  "
+          f"并发初始化 就绪前等待 {ready:.2f} s, 后台插件全部加载 {all_loaded:.2f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
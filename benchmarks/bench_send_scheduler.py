@@ -0,0 +1,96 @@
+"""
+消息发送调度基准测试
+
+定时任务向群B群发20条消息的同时，用户在群A触发一条回复，记录回复从提交到发送完成的延迟，
+并检查同一接收方的消息是否按提交顺序发送。
+对比旧写法（所有消息共用一个队列，每条消息之后等待固定间隔）与按接收方排队的发送调度器。
+时间按20倍缩短：旧写法的1秒间隔对应50毫秒，调度器的速率同样放大20倍。
+
+运行: python benchmarks/bench_send_scheduler.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALE = 20
+BROADCAST = 20
+SEND_TIME = 0.01  # 模拟一次API请求耗时
+
+
+class LegacyQueue:
+    """旧实现：全局队列，每条消息之后等待1秒"""
+
+    def __init__(self):
+        self._message_queue = asyncio.Queue()
+        self._is_processing = False
+
+    async def _process_message_queue(self):
+        if self._is_processing:
+            return
+        self._is_processing = True
+        while True:
+            if self._message_queue.empty():
+                self._is_processing = False
+                break
+            func, args, kwargs, future = await self._message_queue.get()
+            try:
+                future.set_result(await func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._message_queue.task_done()
+                await asyncio.sleep(1 / SCALE)
+
+    async def submit(self, wxid, func, *args, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        await self._message_queue.put((func, args, kwargs, future))
+        if not self._is_processing:
+            asyncio.create_task(self._process_message_queue())
+        return await future
+
+
+async def _run(queue, broadcast_lane):
+    sent = []
+
+    async def send(wxid, content):
+        await asyncio.sleep(SEND_TIME)
+        sent.append((wxid, content))
+        return content
+
+    async def broadcast():
+        with broadcast_lane():
+            await asyncio.gather(*(queue.submit("group_b@chatroom", send, "group_b@chatroom", i)
+                                   for i in range(BROADCAST)))
+
+    async def reply():
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        await queue.submit("group_a@chatroom", send, "group_a@chatroom", "reply")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, reply_latency = await asyncio.gather(broadcast(), reply())
+    total = time.perf_counter() - start
+    in_order = [content for wxid, content in sent if wxid == "group_b@chatroom"] == list(range(BROADCAST))
+    return reply_latency * SCALE, total * SCALE, in_order
+
+
+def main():
+    from contextlib import nullcontext
+
+    from WechatAPI.send_scheduler import LANE_BROADCAST, SendScheduler, send_lane
+
+    legacy = asyncio.run(_run(LegacyQueue(), nullcontext))
+    scheduler = SendScheduler(rate=1.0 * SCALE, burst=1, global_rate=5.0 * SCALE, global_burst=5)
+    current = asyncio.run(_run(scheduler, lambda: send_lane(LANE_BROADCAST)))
+    print(f"群发{BROADCAST}条时插入一条回复(折算为实际时间)  "
+          f"全局队列 回复延迟 {legacy[0]:.1f} s, 群发耗时 {legacy[1]:.1f} s, 顺序{'正确' if legacy[2] else '错误'}  "
+          f"发送调度器 回复延迟 {current[0]:.2f} s, 群发耗时 {current[1]:.1f} s, 顺序{'正确' if current[2] else '错误'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+SortedDict 微基准测试
+
+对比旧实现（堆 + 线性查找 + heapify，keys() 每次修改后重新排序）与二分查找实现：
+插入、更新已有 key 的优先级、删除，以及每次修改后按顺序遍历。
+
+运行: python benchmarks/bench_sorted_dict.py
+"""
+
+import heapq
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dow"))
+
+SIZE = 2000
+OPS = 2000
+
+
+class LegacySortedDict(dict):
+    """旧实现"""
+
+    def __init__(self, sort_func=lambda k, v: k, init_dict=None, reverse=False):
+        if init_dict is None:
+            init_dict = []
+        if isinstance(init_dict, dict):
+            init_dict = init_dict.items()
+        self.sort_func = sort_func
+        self.sorted_keys = None
+        self.reverse = reverse
+        self.heap = []
+        for k, v in init_dict:
+            self[k] = v
+
+    def __setitem__(self, key, value):
+        if key in self:
+            super().__setitem__(key, value)
+            for i, (priority, k) in enumerate(self.heap):
+                if k == key:
+                    self.heap[i] = (self.sort_func(key, value), key)
+                    heapq.heapify(self.heap)
+                    break
+            self.sorted_keys = None
+        else:
+            super().__setitem__(key, value)
+            heapq.heappush(self.heap, (self.sort_func(key, value), key))
+            self.sorted_keys = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        for i, (priority, k) in enumerate(self.heap):
+            if k == key:
+                del self.heap[i]
+                heapq.heapify(self.heap)
+                break
+        self.sorted_keys = None
+
+    def keys(self):
+        if self.sorted_keys is None:
+            self.sorted_keys = [k for _, k in sorted(self.heap, reverse=self.reverse)]
+        return self.sorted_keys
+
+
+def _workloads(cls):
+    rng = random.Random(0)
+    keys = [f"plugin_{i}" for i in range(SIZE)]
+    updates = [(rng.choice(keys), rng.randint(0, 1000)) for _ in range(OPS)]
+
+    def build():
+        d = cls(lambda k, v: v, reverse=True)
+        for key in keys:
+            d[key] = rng.randint(0, 1000)
+        return d
+
+    def insert():
+        build()
+
+    def update():
+        d = build()
+        for key, value in updates:
+            d[key] = value
+
+    def update_and_iterate():
+        d = build()
+        for key, value in updates[:OPS // 10]:
+            d[key] = value
+            for _ in d.keys():
+                pass
+
+    def delete():
+        d = build()
+        for key in keys[::2]:
+            del d[key]
+
+    return {"插入": insert, "更新": update, "更新后遍历": update_and_iterate, "删除": delete}
+
+
+def main():
+    from common.sorted_dict import SortedDict
+
+    legacy = _workloads(LegacySortedDict)
+    current = _workloads(SortedDict)
+    results = []
+    for name in legacy:
+        old = min(timeit.repeat(legacy[name], number=1, repeat=3)) * 1000
+        new = min(timeit.repeat(current[name], number=1, repeat=3)) * 1000
+        results.append(f"{name} {old:.1f}->{new:.1f} ms")
+    print(f"{SIZE}个key, {OPS}次操作  " + "  ".join(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+XYBotDB 并发签到基准测试
+
+200个用户同时签到，对比旧写法（单个数据库线程 + 在事件循环中 future.result() 等待，
+读签到时间、连续天数后分三次写入）与 _async 方法（并发读取，record_signin 一个事务写入）
+的总耗时，以及签到期间事件循环的最长卡顿时间（卡顿期间所有聊天的消息都无法分发）。
+
+运行: python benchmarks/bench_xybotdb_signin.py
+"""
+
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USERS = 200
+
+
+async def _signin_legacy(db, queue: ThreadPoolExecutor, wxid: str, now: datetime.datetime):
+    def call(method, *args):
+        return queue.submit(method, *args).result(timeout=20)
+
+    call(db._get_signin_stat, wxid)
+    streak = call(db._get_signin_streak, wxid)
+    call(db._set_signin_stat, wxid, now)
+    call(db._set_signin_streak, wxid, streak + 1)
+    call(db._add_points, wxid, 10)
+
+
+async def _signin_async(db, wxid: str, now: datetime.datetime):
+    await db.get_signin_stat_async(wxid)
+    streak = await db.get_signin_streak_async(wxid)
+    await db.record_signin_async(wxid, now, streak + 1, 10)
+
+
+async def _measure(make_tasks) -> tuple[float, float]:
+    """返回 (总耗时, 事件循环最长卡顿)，单位毫秒"""
+    max_lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal max_lag
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*make_tasks())
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick
+    return elapsed * 1000, max_lag * 1000
+
+
+async def main():
+    from database.XYBotDB import XYBotDB
+
+    db = XYBotDB()
+    legacy_queue = ThreadPoolExecutor(max_workers=1)
+    now = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    legacy, legacy_lag = await _measure(
+        lambda: [_signin_legacy(db, legacy_queue, f"wxid_legacy_{i}", now) for i in range(USERS)])
+    native, native_lag = await _measure(
+        lambda: [_signin_async(db, f"wxid_async_{i}", now) for i in range(USERS)])
+    legacy_queue.shutdown()
+
+    print(f"{USERS}人同时签到  旧写法 {legacy:.0f} ms ({USERS / legacy * 1000:.0f} 次/秒, 事件循环最长卡顿 {legacy_lag:.0f} ms)  "
+          f"异步方法 {native:.0f} ms ({USERS / native * 1000:.0f} 次/秒, 事件循环最长卡顿 {native_lag:.1f} ms)")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        with open("main_config.toml", "w", encoding="utf-8") as f:
+            f.write('[XYBot]\nXYBotDB-url = "sqlite:///xybot.db"\nXYBotDB-workers = 4\n')
+        from loguru import logger
+
+        logger.remove()
+        asyncio.run(main())
@@ -11,10 +11,15 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 import WechatAPI
+from WechatAPI.media_pipeline import get_media_pipeline
+from database import init_database
 from database.XYBotDB import XYBotDB
 from database.keyvalDB import KeyvalDB
+from database.message_counter import get_instance as get_message_counter
 from database.messsagDB import MessageDB
 from utils.decorators import scheduler
+from utils.message_dispatcher import MessageDispatcher
+from utils.message_intake import PollingIntake, create_intake
 from utils.plugin_manager import plugin_manager
 from utils.xybot import XYBot
 from utils.notification_service import init_notification_service, get_notification_service
@@ -210,6 +215,25 @@ async def bot_core():
     # 设置客户端属性
     bot.ignore_protect = config.get("XYBot", {}).get("ignore-protection", False)
 
+    # 配置HTTP连接池，所有API请求复用长连接
+    bot.configure_http(limit=api_config.get("http-pool-size", 100),
+                       limit_per_host=api_config.get("http-pool-per-host", 32),
+                       keepalive_timeout=api_config.get("http-keepalive-timeout", 30),
+                       timeout=api_config.get("http-timeout", 300),
+                       connect_timeout=api_config.get("http-connect-timeout", 10))
+
+    # 配置消息发送速率，回复消息优先于定时任务群发
+    bot.configure_send(rate=api_config.get("send-rate", 1.0),
+                       burst=api_config.get("send-burst", 1),
+                       global_rate=api_config.get("send-global-rate", 5.0),
+                       global_burst=api_config.get("send-global-burst", 5))
+
+    # 语音转码、视频探测在进程池中执行，不阻塞事件循环
+    media_pipeline = get_media_pipeline()
+    media_pipeline.configure(workers=api_config.get("media-workers", 2),
+                             cache_size=int(api_config.get("media-cache-size", 64) * 1024 * 1024))
+    media_pipeline.start()
+
     # 等待WechatAPI服务启动
     # time_out = 30  # 增加超时时间
     # while not await bot.is_running() and time_out > 0:
@@ -539,6 +563,9 @@ async def bot_core():
     keyval_db = KeyvalDB()
     await keyval_db.initialize()
 
+    # 联系人和群成员表（不再在导入 database 时创建）
+    init_database()
+
     # 通知服务已在前面初始化完成
 
     # 启动调度器
@@ -570,105 +597,55 @@ async def bot_core():
     except Exception as e:
         logger.error(f"添加图片文件自动清理任务失败: {e}")
 
-    # 加载插件目录下的所有插件
-    loaded_plugins = await plugin_manager.load_plugins_from_directory(bot, load_disabled_plugin=False)
+    # 加载插件目录下的所有插件，非关键插件留到就绪后初始化
+    xybot_config = config.get("XYBot", {})
+    plugin_manager.configure_startup(init_timeout=xybot_config.get("plugin-init-timeout", 30),
+                                     init_concurrency=xybot_config.get("plugin-init-concurrency", 8),
+                                     background_plugins=xybot_config.get("background-plugins", []))
+    loaded_plugins = await plugin_manager.load_plugins_from_directory(bot, load_disabled_plugin=False,
+                                                                      defer_background=True)
     logger.success(f"已加载插件: {loaded_plugins}")
 
     # ========== 开始接受消息 ========== #
 
-    # 先接受堆积消息
-    logger.info("处理堆积消息中")
-    count = 0
-    while True:
-        ok,data = await bot.sync_message()
-        data = data.get("AddMsgs")
-        if not data:
-            if count > 2:
-                break
-            else:
-                count += 1
-                continue
-
-        logger.debug("接受到 {} 条消息", len(data))
-        await asyncio.sleep(1)
-    logger.success("处理堆积消息完毕")
-
-    # 更新状态为就绪
-    update_bot_status("ready", "机器人已准备就绪")
-
-    # 启动自动重启监控器
-    try:
-        from utils.auto_restart import start_auto_restart_monitor
-        start_auto_restart_monitor()
-        logger.success("自动重启监控器已启动")
-    except Exception as e:
-        logger.error(f"启动自动重启监控器失败: {e}")
-
-    logger.success("开始处理消息")
+    # 创建消息接收层，所有消息进入同一个有界分发队列
+    intake_config = config.get("MessageIntake", {})
+    dispatcher = MessageDispatcher(xybot.process_message,
+                                   workers=intake_config.get("workers", 16),
+                                   queue_size=intake_config.get("queue-size", 1000),
+                                   overflow=intake_config.get("overflow", "block"),
+                                   self_wxid=lambda: bot.wxid)
+    xybot.dispatcher = dispatcher
 
     # 添加重连检测变量
     message_failure_count = 0
     max_failure_count = 3  # 连续失败超过这个数量则认为离线
     is_offline = False
 
-    while True:
-        # 不需要记录当前时间
-
-        try:
-            ok,data = await bot.sync_message()
-
-            # 如果成功获取消息，重置失败计数
-            if ok:
-                # 如果之前处于离线状态，现在恢复了，发送重连通知
-                if is_offline and message_failure_count > 0:
-                    is_offline = False
-                    message_failure_count = 0
-
-                    # 发送重连通知
-                    notification_service = get_notification_service()
-                    if notification_service and notification_service.enabled and notification_service.triggers.get("reconnect", False):
-                        if notification_service.token:
-                            logger.info(f"发送微信重连通知，微信ID: {bot.wxid}")
-                            asyncio.create_task(notification_service.send_reconnect_notification(bot.wxid))
-                        else:
-                            logger.warning("PushPlus Token未设置，无法发送重连通知")
-
-                # 正常情况下重置计数器
-                if message_failure_count > 0:
-                    message_failure_count = 0
-
-        except Exception as e:
-            logger.warning("获取新消息失败 {}", e)
-            # 增加失败计数
-            message_failure_count += 1
-
-            # 如果连续失败超过阈值，标记为离线状态
-            if message_failure_count >= max_failure_count and not is_offline:
-                is_offline = True
-                logger.warning(f"连续 {message_failure_count} 次获取消息失败，微信可能已离线")
-
-            # 等待一段时间后重试
-            await asyncio.sleep(5)
-            logger.info("5秒后继续尝试获取消息")
-            continue
-
-            # 以下代码已注释，不再自动重新登录
-            # update_bot_status("waiting_login", "等待微信登录")
-            # 清除所有定时任务
-            # scheduler.remove_all_jobs()
-            # logger.success("所有定时任务已清除")
-            # await bot_core()
-            # break
-
-        # 如果成功获取消息但没有数据，处理消息数据
-
-        # 检查data是否为字典类型
-        if isinstance(data, dict):
-            messages = data.get("AddMsgs")
-            if messages:
-                for message in messages:
-                    asyncio.create_task(xybot.process_message(message))
-        elif data:  # 如果data不是字典但有值，记录日志
+    def on_sync_result(ok, data):
+        nonlocal message_failure_count, is_offline
+
+        # 如果成功获取消息，重置失败计数
+        if ok:
+            # 如果之前处于离线状态，现在恢复了，发送重连通知
+            if is_offline and message_failure_count > 0:
+                is_offline = False
+                message_failure_count = 0
+
+                # 发送重连通知
+                notification_service = get_notification_service()
+                if notification_service and notification_service.enabled and notification_service.triggers.get("reconnect", False):
+                    if notification_service.token:
+                        logger.info(f"发送微信重连通知，微信ID: {bot.wxid}")
+                        asyncio.create_task(notification_service.send_reconnect_notification(bot.wxid))
+                    else:
+                        logger.warning("PushPlus Token未设置，无法发送重连通知")
+
+            # 正常情况下重置计数器
+            if message_failure_count > 0:
+                message_failure_count = 0
+
+        if data and not isinstance(data, dict):  # 如果data不是字典但有值，记录日志
             logger.warning(f"Unexpected data type: {type(data)}, value: {data}")
 
             # 检测特定的错误消息
@@ -692,8 +669,59 @@ async def bot_core():
 
                     # 更新状态为离线
                     update_bot_status("offline", "微信已离线")
-        # 使用异步睡眠替代忙等待循环
-        await asyncio.sleep(0.5)
 
-    # 返回机器人实例（此处不会执行到，因为上面的无限循环）
-    return xybot
\ No newline at end of file
+    def on_sync_error(e):
+        nonlocal message_failure_count, is_offline
+
+        logger.warning("获取新消息失败 {}", e)
+        # 增加失败计数
+        message_failure_count += 1
+
+        # 如果连续失败超过阈值，标记为离线状态
+        if message_failure_count >= max_failure_count and not is_offline:
+            is_offline = True
+            logger.warning(f"连续 {message_failure_count} 次获取消息失败，微信可能已离线")
+
+        logger.info("5秒后继续尝试获取消息")
+
+    intake = create_intake(bot, dispatcher, intake_config, on_result=on_sync_result, on_error=on_sync_error)
+
+    # 先接受堆积消息
+    if isinstance(intake, PollingIntake):
+        logger.info("处理堆积消息中")
+        await intake.skip_backlog()
+        logger.success("处理堆积消息完毕")
+
+    # 更新状态为就绪
+    update_bot_status("ready", "机器人已准备就绪")
+
+    # 启动自动重启监控器
+    try:
+        from utils.auto_restart import start_auto_restart_monitor
+        start_auto_restart_monitor()
+        logger.success("自动重启监控器已启动")
+    except Exception as e:
+        logger.error(f"启动自动重启监控器失败: {e}")
+
+    logger.success("开始处理消息")
+
+    dispatcher.start()
+    await intake.start()
+    plugin_manager.start_background_plugins(bot)
+
+    try:
+        # 消息接收和处理都在后台任务中进行，这里只等待worker结束
+        await dispatcher.join()
+    finally:
+        await intake.stop()
+        await dispatcher.stop()
+        await xybot.contact_refresher.stop()
+        # 写入缓冲区中剩余的消息记录
+        await message_db.close()
+        get_message_counter().flush()
+        # 关闭HTTP连接池
+        await bot.close()
+        get_media_pipeline().shutdown(wait=False)
+
+    # 返回机器人实例（此处不会执行到，因为worker不会主动退出）
+    return xybot
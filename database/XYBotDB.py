@@ -1,26 +1,35 @@
+import asyncio
 import datetime
-import tomllib
+import functools
+import heapq
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import Union
+from typing import Dict, Iterable, List, Tuple, Union
 
 from loguru import logger
-from sqlalchemy import Column, String, Integer, DateTime, create_engine, JSON, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, create_engine, JSON, Boolean, event
 from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from utils.config_service import get_config
 from utils.singleton import Singleton
 
+from .sqlite_utils import enable_sqlite_wal
+
 Base = declarative_base()
 
+# 一次 IN 查询最多携带的 wxid 数，低于 SQLite 的参数数量限制
+IN_QUERY_CHUNK = 500
+
 
 class User(Base):
     __tablename__ = 'user'
 
     wxid = Column(String(20), primary_key=True, nullable=False, unique=True, index=True, autoincrement=False,
                   comment='wxid')
-    points = Column(Integer, nullable=False, default=0, comment='points')
+    points = Column(Integer, nullable=False, default=0, index=True, comment='points')
     signin_stat = Column(DateTime, nullable=False, default=datetime.datetime.fromtimestamp(0), comment='signin_stat')
     signin_streak = Column(Integer, nullable=False, default=0, comment='signin_streak')
     whitelist = Column(Boolean, nullable=False, default=False, comment='whitelist')
@@ -36,27 +45,54 @@ class Chatroom(Base):
     llm_thread_id = Column(JSON, nullable=False, default=lambda: {}, comment='llm_thread_id')
 
 
+def _serialized(method):
+    """写操作串行执行
+
+    SQLite 同一时间只有一个写事务，"先更新、不存在再插入"和"先读后写"的操作并发执行时
+    会重复插入或丢失更新，所以写操作在同一把锁内执行，读操作可以并发。
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class XYBotDB(metaclass=Singleton):
+    """用户积分、签到、白名单等数据
+
+    同步方法在调用线程中直接执行，兼容旧插件；带 _async 后缀的方法在数据库线程池中执行，
+    等待结果时不阻塞事件循环，插件应优先使用。
+    """
+
     def __init__(self):
-        with open("main_config.toml", "rb") as f:
-            main_config = tomllib.load(f)
+        main_config = get_config()
 
         self.database_url = main_config["XYBot"]["XYBotDB-url"]
-        self.engine = create_engine(self.database_url)
+        workers = max(1, main_config["XYBot"].get("XYBotDB-workers", 4))
+        # 连接池大小：线程池中的每个线程和事件循环线程各一个连接
+        self.engine = create_engine(self.database_url, pool_size=workers + 1)
+        if self.engine.url.get_backend_name() == "sqlite":
+            event.listen(self.engine, "connect", enable_sqlite_wal)
         self.DBSession = sessionmaker(bind=self.engine)
+        self._write_lock = threading.RLock()
 
         # 创建表
         Base.metadata.create_all(self.engine)
+        # create_all 不会给已存在的表补建索引，积分排行榜依赖 points 索引
+        for index in User.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
         logger.success("数据库初始化成功")
 
         # 创建线程池执行器
-        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="database")
 
-    def _execute_in_queue(self, method, *args, **kwargs):
-        """在队列中执行数据库操作"""
-        future = self.executor.submit(method, *args, **kwargs)
+    async def _execute_async(self, method, *args):
+        """在数据库线程池中执行数据库操作，等待结果时不阻塞事件循环"""
         try:
-            return future.result(timeout=20)  # 20秒超时
+            return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
         except Exception as e:
             logger.error(f"数据库操作失败: {method.__name__} - {str(e)}")
             raise
@@ -65,8 +101,13 @@ class XYBotDB(metaclass=Singleton):
 
     def add_points(self, wxid: str, num: int) -> bool:
         """Thread-safe point addition"""
-        return self._execute_in_queue(self._add_points, wxid, num)
+        return self._add_points(wxid, num)
+
+    async def add_points_async(self, wxid: str, num: int) -> bool:
+        """增加用户积分，不阻塞事件循环"""
+        return await self._execute_async(self._add_points, wxid, num)
 
+    @_serialized
     def _add_points(self, wxid: str, num: int) -> bool:
         """Thread-safe point addition"""
         session = self.DBSession()
@@ -93,8 +134,13 @@ class XYBotDB(metaclass=Singleton):
 
     def set_points(self, wxid: str, num: int) -> bool:
         """Thread-safe point setting"""
-        return self._execute_in_queue(self._set_points, wxid, num)
+        return self._set_points(wxid, num)
 
+    async def set_points_async(self, wxid: str, num: int) -> bool:
+        """设置用户积分，不阻塞事件循环"""
+        return await self._execute_async(self._set_points, wxid, num)
+
+    @_serialized
     def _set_points(self, wxid: str, num: int) -> bool:
         """Thread-safe point setting"""
         session = self.DBSession()
@@ -119,7 +165,11 @@ class XYBotDB(metaclass=Singleton):
 
     def get_points(self, wxid: str) -> int:
         """Get user points"""
-        return self._execute_in_queue(self._get_points, wxid)
+        return self._get_points(wxid)
+
+    async def get_points_async(self, wxid: str) -> int:
+        """获取用户积分，不阻塞事件循环"""
+        return await self._execute_async(self._get_points, wxid)
 
     def _get_points(self, wxid: str) -> int:
         """Get user points"""
@@ -132,7 +182,11 @@ class XYBotDB(metaclass=Singleton):
 
     def get_signin_stat(self, wxid: str) -> datetime.datetime:
         """获取用户签到状态"""
-        return self._execute_in_queue(self._get_signin_stat, wxid)
+        return self._get_signin_stat(wxid)
+
+    async def get_signin_stat_async(self, wxid: str) -> datetime.datetime:
+        """获取用户签到时间，不阻塞事件循环"""
+        return await self._execute_async(self._get_signin_stat, wxid)
 
     def _get_signin_stat(self, wxid: str) -> datetime.datetime:
         session = self.DBSession()
@@ -144,8 +198,13 @@ class XYBotDB(metaclass=Singleton):
 
     def set_signin_stat(self, wxid: str, signin_time: datetime.datetime) -> bool:
         """Thread-safe set user's signin time"""
-        return self._execute_in_queue(self._set_signin_stat, wxid, signin_time)
+        return self._set_signin_stat(wxid, signin_time)
+
+    async def set_signin_stat_async(self, wxid: str, signin_time: datetime.datetime) -> bool:
+        """设置用户签到时间，不阻塞事件循环"""
+        return await self._execute_async(self._set_signin_stat, wxid, signin_time)
 
+    @_serialized
     def _set_signin_stat(self, wxid: str, signin_time: datetime.datetime) -> bool:
         session = self.DBSession()
         try:
@@ -174,6 +233,37 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    def record_signin(self, wxid: str, signin_time: datetime.datetime, streak: int, points: int) -> bool:
+        """在一个事务中记录签到：设置签到时间、连续签到天数，并增加积分"""
+        return self._record_signin(wxid, signin_time, streak, points)
+
+    async def record_signin_async(self, wxid: str, signin_time: datetime.datetime, streak: int,
+                                  points: int) -> bool:
+        """在一个事务中记录签到，不阻塞事件循环"""
+        return await self._execute_async(self._record_signin, wxid, signin_time, streak, points)
+
+    @_serialized
+    def _record_signin(self, wxid: str, signin_time: datetime.datetime, streak: int, points: int) -> bool:
+        session = self.DBSession()
+        try:
+            result = session.execute(
+                update(User)
+                .where(User.wxid == wxid)
+                .values(signin_stat=signin_time, signin_streak=streak, points=User.points + points)
+            )
+            if result.rowcount == 0:
+                session.add(User(wxid=wxid, signin_stat=signin_time, signin_streak=streak, points=points))
+            session.commit()
+            logger.info(f"数据库: 用户{wxid}签到，连续签到{streak}天，积分增加{points}")
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"数据库: 用户{wxid}签到记录失败, 错误: {e}")
+            return False
+        finally:
+            session.close()
+
+    @_serialized
     def reset_all_signin_stat(self) -> bool:
         """Reset all users' signin status"""
         session = self.DBSession()
@@ -188,15 +278,65 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def reset_all_signin_stat_async(self) -> bool:
+        """重置所有用户的签到时间，不阻塞事件循环"""
+        return await self._execute_async(self.reset_all_signin_stat)
+
+    def get_points_many(self, wxids: Iterable[str]) -> Dict[str, int]:
+        """批量获取用户积分，不存在的用户为0"""
+        return self._get_points_many(list(wxids))
+
+    async def get_points_many_async(self, wxids: Iterable[str]) -> Dict[str, int]:
+        """批量获取用户积分，不阻塞事件循环"""
+        return await self._execute_async(self._get_points_many, list(wxids))
+
+    def _get_points_many(self, wxids: List[str]) -> Dict[str, int]:
+        points = dict.fromkeys(wxids, 0)
+        session = self.DBSession()
+        try:
+            for chunk in _chunks(list(points)):
+                rows = session.query(User.wxid, User.points).filter(User.wxid.in_(chunk)).all()
+                points.update(rows)
+            return points
+        finally:
+            session.close()
+
     def get_leaderboard(self, count: int) -> list:
         """Get points leaderboard"""
         session = self.DBSession()
         try:
-            users = session.query(User).order_by(User.points.desc()).limit(count).all()
-            return [(user.wxid, user.points) for user in users]
+            rows = session.query(User.wxid, User.points).order_by(User.points.desc()).limit(count).all()
+            return [(wxid, points) for wxid, points in rows]
+        finally:
+            session.close()
+
+    async def get_leaderboard_async(self, count: int) -> List[Tuple[str, int]]:
+        """获取积分排行榜，不阻塞事件循环"""
+        return await self._execute_async(self.get_leaderboard, count)
+
+    def get_group_leaderboard(self, wxids: Iterable[str], count: int) -> List[Tuple[str, int]]:
+        """获取指定用户中积分最高的前 count 名，不包含积分为0的用户"""
+        return self._get_group_leaderboard(list(wxids), count)
+
+    async def get_group_leaderboard_async(self, wxids: Iterable[str], count: int) -> List[Tuple[str, int]]:
+        """获取指定用户中积分最高的前 count 名，不阻塞事件循环"""
+        return await self._execute_async(self._get_group_leaderboard, list(wxids), count)
+
+    def _get_group_leaderboard(self, wxids: List[str], count: int) -> List[Tuple[str, int]]:
+        session = self.DBSession()
+        try:
+            ranked = []
+            for chunk in _chunks(list(dict.fromkeys(wxids))):
+                rows = session.query(User.wxid, User.points) \
+                    .filter(User.wxid.in_(chunk), User.points != 0) \
+                    .order_by(User.points.desc()).limit(count).all()
+                ranked.extend((wxid, points) for wxid, points in rows)
+            # 每批各取前 count 名，合并后再取一次
+            return heapq.nlargest(count, ranked, key=lambda item: item[1])
         finally:
             session.close()
 
+    @_serialized
     def set_whitelist(self, wxid: str, stat: bool) -> bool:
         """Set user's whitelist status"""
         session = self.DBSession()
@@ -216,6 +356,10 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def set_whitelist_async(self, wxid: str, stat: bool) -> bool:
+        """设置用户白名单状态，不阻塞事件循环"""
+        return await self._execute_async(self.set_whitelist, wxid, stat)
+
     def get_whitelist(self, wxid: str) -> bool:
         """Get user's whitelist status"""
         session = self.DBSession()
@@ -225,6 +369,10 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_whitelist_async(self, wxid: str) -> bool:
+        """获取用户白名单状态，不阻塞事件循环"""
+        return await self._execute_async(self.get_whitelist, wxid)
+
     def get_whitelist_list(self) -> list:
         """Get list of all whitelisted users"""
         session = self.DBSession()
@@ -234,10 +382,19 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_whitelist_list_async(self) -> list:
+        """获取白名单用户列表，不阻塞事件循环"""
+        return await self._execute_async(self.get_whitelist_list)
+
     def safe_trade_points(self, trader_wxid: str, target_wxid: str, num: int) -> bool:
         """Thread-safe points trading between users"""
-        return self._execute_in_queue(self._safe_trade_points, trader_wxid, target_wxid, num)
+        return self._safe_trade_points(trader_wxid, target_wxid, num)
+
+    async def safe_trade_points_async(self, trader_wxid: str, target_wxid: str, num: int) -> bool:
+        """用户之间转账积分，不阻塞事件循环"""
+        return await self._execute_async(self._safe_trade_points, trader_wxid, target_wxid, num)
 
+    @_serialized
     def _safe_trade_points(self, trader_wxid: str, target_wxid: str, num: int) -> bool:
         """Thread-safe points trading between users"""
         session = self.DBSession()
@@ -281,6 +438,10 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_user_list_async(self) -> list:
+        """获取所有用户，不阻塞事件循环"""
+        return await self._execute_async(self.get_user_list)
+
     def get_llm_thread_id(self, wxid: str, namespace: str = None) -> Union[dict, str]:
         """Get LLM thread id for user or chatroom"""
         session = self.DBSession()
@@ -302,6 +463,11 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_llm_thread_id_async(self, wxid: str, namespace: str = None) -> Union[dict, str]:
+        """获取用户或群聊的 LLM 会话ID，不阻塞事件循环"""
+        return await self._execute_async(self.get_llm_thread_id, wxid, namespace)
+
+    @_serialized
     def save_llm_thread_id(self, wxid: str, data: str, namespace: str) -> bool:
         """Save LLM thread id for user or chatroom"""
         session = self.DBSession()
@@ -341,6 +507,11 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def save_llm_thread_id_async(self, wxid: str, data: str, namespace: str) -> bool:
+        """保存用户或群聊的 LLM 会话ID，不阻塞事件循环"""
+        return await self._execute_async(self.save_llm_thread_id, wxid, data, namespace)
+
+    @_serialized
     def delete_all_llm_thread_id(self):
         """Clear llm thread id for everyone"""
         session = self.DBSession()
@@ -356,9 +527,17 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def delete_all_llm_thread_id_async(self) -> bool:
+        """清除所有 LLM 会话ID，不阻塞事件循环"""
+        return await self._execute_async(self.delete_all_llm_thread_id)
+
     def get_signin_streak(self, wxid: str) -> int:
         """Thread-safe get user's signin streak"""
-        return self._execute_in_queue(self._get_signin_streak, wxid)
+        return self._get_signin_streak(wxid)
+
+    async def get_signin_streak_async(self, wxid: str) -> int:
+        """获取用户连续签到天数，不阻塞事件循环"""
+        return await self._execute_async(self._get_signin_streak, wxid)
 
     def _get_signin_streak(self, wxid: str) -> int:
         session = self.DBSession()
@@ -370,8 +549,13 @@ class XYBotDB(metaclass=Singleton):
 
     def set_signin_streak(self, wxid: str, streak: int) -> bool:
         """Thread-safe set user's signin streak"""
-        return self._execute_in_queue(self._set_signin_streak, wxid, streak)
+        return self._set_signin_streak(wxid, streak)
+
+    async def set_signin_streak_async(self, wxid: str, streak: int) -> bool:
+        """设置用户连续签到天数，不阻塞事件循环"""
+        return await self._execute_async(self._set_signin_streak, wxid, streak)
 
+    @_serialized
     def _set_signin_streak(self, wxid: str, streak: int) -> bool:
         session = self.DBSession()
         try:
@@ -404,6 +588,10 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_chatroom_list_async(self) -> list:
+        """获取所有群聊，不阻塞事件循环"""
+        return await self._execute_async(self.get_chatroom_list)
+
     def get_chatroom_members(self, chatroom_id: str) -> set:
         """Get members of a chatroom"""
         session = self.DBSession()
@@ -413,6 +601,11 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def get_chatroom_members_async(self, chatroom_id: str) -> set:
+        """获取群聊成员，不阻塞事件循环"""
+        return await self._execute_async(self.get_chatroom_members, chatroom_id)
+
+    @_serialized
     def set_chatroom_members(self, chatroom_id: str, members: set) -> bool:
         """Set members of a chatroom"""
         session = self.DBSession()
@@ -432,9 +625,18 @@ class XYBotDB(metaclass=Singleton):
         finally:
             session.close()
 
+    async def set_chatroom_members_async(self, chatroom_id: str, members: set) -> bool:
+        """设置群聊成员，不阻塞事件循环"""
+        return await self._execute_async(self.set_chatroom_members, chatroom_id, members)
+
     def __del__(self):
         """确保关闭时清理资源"""
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=True)
         if hasattr(self, 'engine'):
             self.engine.dispose()
+
+
+def _chunks(items: List[str], size: int = IN_QUERY_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -40,6 +40,3 @@ def init_database():
     # 未来可以在这里添加其他数据库的初始化
 
     logger.success("数据库初始化完成")
-
-# 当模块被导入时自动初始化所有数据库
-init_database()
@@ -0,0 +1,459 @@
+"""
+联系人 / 群成员存储
+contacts.db 使用一个常驻连接（WAL模式），并在内存中维护按 wxid 和 (群, 成员) 索引的
+LRU + TTL 缓存。所有写入都先写数据库再更新缓存，读取命中缓存时不访问磁盘。
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+# 数据库文件路径
+DB_PATH = os.path.join("database", "contacts.db")
+
+# 缓存中表示"数据库中不存在"的标记，避免未知联系人每条消息都查询一次数据库
+_MISSING = object()
+
+CONTACT_FIELDS = ["wxid", "nickname", "remark", "avatar", "alias", "type", "region"]
+MEMBER_FIELDS = ["wxid", "Wxid", "UserName", "NickName", "nickname", "DisplayName", "display_name",
+                 "BigHeadImgUrl", "SmallHeadImgUrl", "avatar", "HeadImgUrl", "InviterUserName"]
+
+
+class LRUCache:
+    """带过期时间的LRU缓存，线程安全
+
+    Args:
+        maxsize (int): 最多缓存的条目数，超出时淘汰最久未使用的条目
+        ttl (float): 条目过期时间(秒)
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_where(self, predicate):
+        """删除所有满足条件的键"""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ContactsStore:
+    """contacts.db 的联系人和群成员存储
+
+    Args:
+        db_path (str): 数据库文件路径
+        cache_size (int): 联系人缓存条目数
+        member_cache_size (int): 群成员缓存条目数
+        cache_ttl (float): 缓存过期时间(秒)
+    """
+
+    def __init__(self, db_path: str = DB_PATH, cache_size: int = 10000,
+                 member_cache_size: int = 50000, cache_ttl: float = 600):
+        self.db_path = db_path
+        self.contacts = LRUCache(cache_size, cache_ttl)
+        self.members = LRUCache(member_cache_size, cache_ttl)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """常驻数据库连接，首次使用时创建"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.db_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    _create_tables(conn)
+                    self._conn = conn
+        return self._conn
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def execute(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        """执行查询并返回所有行"""
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def create_tables(self):
+        """创建联系人表和群成员表（首次打开连接时已自动创建）"""
+        with self._lock:
+            _create_tables(self.conn)
+
+    # ---------- 联系人 ----------
+
+    def get_contact(self, wxid: str) -> Optional[Dict[str, Any]]:
+        """获取单个联系人，优先从缓存读取"""
+        cached = self.contacts.get(wxid)
+        if cached is not None:
+            return None if cached is _MISSING else dict(cached)
+
+        rows = self.execute("SELECT * FROM contacts WHERE wxid = ?", (wxid,))
+        contact = _contact_from_row(rows[0]) if rows else None
+        self.contacts.set(wxid, contact if contact is not None else _MISSING)
+        return dict(contact) if contact is not None else None
+
+    def list_contacts(self, offset: int = None, limit: int = None) -> List[Dict[str, Any]]:
+        """获取联系人列表，支持分页"""
+        query = "SELECT * FROM contacts ORDER BY nickname COLLATE NOCASE"
+        params = []
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+            if offset is not None:
+                query += " OFFSET ?"
+                params.append(offset)
+        return [_contact_from_row(row) for row in self.execute(query, params)]
+
+    def count_contacts(self) -> int:
+        """获取联系人数量"""
+        return self.execute("SELECT COUNT(*) FROM contacts")[0][0]
+
+    def upsert_contacts(self, contacts: Iterable[Dict[str, Any]]) -> int:
+        """批量插入或更新联系人，在一个事务中完成
+
+        Returns:
+            int: 写入的联系人数
+        """
+        current_time = int(time.time())
+        rows = [_contact_to_row(contact, current_time) for contact in contacts if contact.get("wxid")]
+        if not rows:
+            return 0
+
+        with self._lock:
+            try:
+                self.conn.executemany('''
+                INSERT OR REPLACE INTO contacts
+                (wxid, nickname, remark, avatar, alias, type, region, last_updated, extra_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+        for row in rows:
+            self.contacts.set(row[0], _contact_from_row(row))
+        return len(rows)
+
+    def delete_contact(self, wxid: str):
+        """删除联系人"""
+        with self._lock:
+            self.conn.execute("DELETE FROM contacts WHERE wxid = ?", (wxid,))
+            self.conn.commit()
+        self.contacts.set(wxid, _MISSING)
+
+    async def get_contact_async(self, wxid: str) -> Optional[Dict[str, Any]]:
+        """获取单个联系人，缓存未命中时在线程池中查询数据库，不阻塞事件循环"""
+        cached = self.contacts.get(wxid)
+        if cached is not None:
+            return None if cached is _MISSING else dict(cached)
+        return await asyncio.to_thread(self.get_contact, wxid)
+
+    async def upsert_contacts_async(self, contacts: Iterable[Dict[str, Any]]) -> int:
+        """在线程池中批量写入联系人"""
+        return await asyncio.to_thread(self.upsert_contacts, list(contacts))
+
+    # ---------- 群成员 ----------
+
+    def get_member(self, group_wxid: str, member_wxid: str) -> Optional[Dict[str, Any]]:
+        """获取单个群成员，优先从缓存读取"""
+        key = (group_wxid, member_wxid)
+        cached = self.members.get(key)
+        if cached is not None:
+            return None if cached is _MISSING else dict(cached)
+
+        rows = self.execute('''
+        SELECT member_wxid, nickname, display_name, avatar, inviter_wxid, join_time, last_updated, extra_data
+        FROM group_members
+        WHERE group_wxid = ? AND member_wxid = ?
+        ''', key)
+        member = _member_from_row(rows[0]) if rows else None
+        self.members.set(key, member if member is not None else _MISSING)
+        return dict(member) if member is not None else None
+
+    def list_members(self, group_wxid: str) -> List[Dict[str, Any]]:
+        """获取群成员列表，同时填充群成员缓存"""
+        rows = self.execute('''
+        SELECT member_wxid, nickname, display_name, avatar, inviter_wxid, join_time, last_updated, extra_data
+        FROM group_members
+        WHERE group_wxid = ?
+        ORDER BY nickname COLLATE NOCASE
+        ''', (group_wxid,))
+        members = [_member_from_row(row) for row in rows]
+        for member in members:
+            self.members.set((group_wxid, member["wxid"]), dict(member))
+        return members
+
+    def member_groups(self, member_wxid: str) -> List[str]:
+        """获取成员所在的所有群"""
+        rows = self.execute('SELECT DISTINCT group_wxid FROM group_members WHERE member_wxid = ?',
+                            (member_wxid,))
+        return [row[0] for row in rows]
+
+    def upsert_members(self, group_wxid: str, members: Iterable[Dict[str, Any]]) -> int:
+        """批量插入或更新群成员，在一个事务中完成
+
+        Returns:
+            int: 写入的成员数
+        """
+        current_time = int(time.time())
+        rows = []
+        for member in members:
+            row = _member_to_row(group_wxid, member, current_time)
+            if row is None:
+                logger.warning(f"跳过没有wxid的群成员: {member}")
+                continue
+            rows.append(row)
+        if not rows:
+            return 0
+
+        with self._lock:
+            try:
+                self.conn.executemany('''
+                INSERT OR REPLACE INTO group_members
+                (group_wxid, member_wxid, nickname, display_name, avatar, inviter_wxid, last_updated, extra_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+        for row in rows:
+            # INSERT OR REPLACE 会清空 join_time
+            self.members.set((row[0], row[1]), _member_from_row((row[1], *row[2:6], None, *row[6:])))
+        return len(rows)
+
+    def delete_member(self, group_wxid: str, member_wxid: str):
+        """删除群成员"""
+        with self._lock:
+            self.conn.execute('DELETE FROM group_members WHERE group_wxid = ? AND member_wxid = ?',
+                              (group_wxid, member_wxid))
+            self.conn.commit()
+        self.members.set((group_wxid, member_wxid), _MISSING)
+
+    def delete_all_members(self, group_wxid: str):
+        """删除群的所有成员"""
+        with self._lock:
+            self.conn.execute('DELETE FROM group_members WHERE group_wxid = ?', (group_wxid,))
+            self.conn.commit()
+        self.members.pop_where(lambda key: key[0] == group_wxid)
+
+    async def get_member_async(self, group_wxid: str, member_wxid: str) -> Optional[Dict[str, Any]]:
+        """获取单个群成员，缓存未命中时在线程池中查询数据库"""
+        cached = self.members.get((group_wxid, member_wxid))
+        if cached is not None:
+            return None if cached is _MISSING else dict(cached)
+        return await asyncio.to_thread(self.get_member, group_wxid, member_wxid)
+
+    async def upsert_members_async(self, group_wxid: str, members: Iterable[Dict[str, Any]]) -> int:
+        """在线程池中批量写入群成员"""
+        return await asyncio.to_thread(self.upsert_members, group_wxid, list(members))
+
+    def clear_cache(self):
+        """清除联系人和群成员缓存"""
+        self.contacts.clear()
+        self.members.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            "contacts_cached": len(self.contacts),
+            "contacts_hits": self.contacts.hits,
+            "contacts_misses": self.contacts.misses,
+            "members_cached": len(self.members),
+            "members_hits": self.members.hits,
+            "members_misses": self.members.misses,
+        }
+
+
+def _contact_type(wxid: str) -> str:
+    if wxid.endswith("@chatroom"):
+        return "group"
+    if wxid.startswith("gh_"):
+        return "official"
+    return "friend"
+
+
+def _contact_to_row(contact: Dict[str, Any], current_time: int) -> tuple:
+    wxid = contact.get("wxid", "")
+    # 将其他字段存储为JSON
+    extra_data = {key: value for key, value in contact.items() if key not in CONTACT_FIELDS}
+    return (
+        wxid,
+        contact.get("nickname", ""),
+        contact.get("remark", ""),
+        contact.get("avatar", ""),
+        contact.get("alias", ""),
+        contact.get("type", "") or _contact_type(wxid),
+        contact.get("region", ""),
+        current_time,
+        json.dumps(extra_data, ensure_ascii=False),
+    )
+
+
+def _contact_from_row(row: tuple) -> Dict[str, Any]:
+    contact = {
+        "wxid": row[0],
+        "nickname": row[1],
+        "remark": row[2],
+        "avatar": row[3],
+        "alias": row[4],
+        "type": row[5],
+        "region": row[6],
+        "last_updated": row[7]
+    }
+    # 解析额外数据
+    if row[8]:
+        try:
+            contact.update(json.loads(row[8]))
+        except Exception:
+            pass
+    return contact
+
+
+def _first(member: Dict[str, Any], *keys: str):
+    for key in keys:
+        if member.get(key):
+            return member.get(key)
+    return None
+
+
+def _member_to_row(group_wxid: str, member: Dict[str, Any], current_time: int) -> Optional[tuple]:
+    member_wxid = member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
+    if not member_wxid:
+        return None
+    extra_data = {key: value for key, value in member.items() if key not in MEMBER_FIELDS}
+    return (
+        group_wxid,
+        member_wxid,
+        _first(member, "NickName", "nickname"),
+        _first(member, "DisplayName", "display_name"),
+        _first(member, "BigHeadImgUrl", "SmallHeadImgUrl", "avatar", "HeadImgUrl"),
+        member.get("InviterUserName") or "",
+        current_time,
+        json.dumps(extra_data, ensure_ascii=False),
+    )
+
+
+def _member_from_row(row: tuple) -> Dict[str, Any]:
+    member = {
+        "wxid": row[0],
+        "nickname": row[1] or "",
+        "display_name": row[2] or "",
+        "avatar": row[3] or "",
+        "inviter_wxid": row[4] or "",
+        "join_time": row[5] or 0,
+        "last_updated": row[6] or 0
+    }
+    # 解析额外数据
+    if row[7]:
+        try:
+            member.update(json.loads(row[7]))
+        except Exception:
+            pass
+    return member
+
+
+def _create_tables(conn: sqlite3.Connection):
+    """创建联系人表和群成员表"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS contacts (
+        wxid TEXT PRIMARY KEY,
+        nickname TEXT,
+        remark TEXT,
+        avatar TEXT,
+        alias TEXT,
+        type TEXT,
+        region TEXT,
+        last_updated INTEGER,
+        extra_data TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS group_members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_wxid TEXT NOT NULL,
+        member_wxid TEXT NOT NULL,
+        nickname TEXT,
+        display_name TEXT,
+        avatar TEXT,
+        inviter_wxid TEXT,
+        join_time INTEGER,
+        last_updated INTEGER,
+        extra_data TEXT,
+        UNIQUE(group_wxid, member_wxid)
+    )
+    ''')
+    # 创建索引以加快查询速度
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_group_wxid ON group_members (group_wxid)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_member_wxid ON group_members (member_wxid)')
+    conn.commit()
+
+
+_store: Optional[ContactsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ContactsStore:
+    """获取全局联系人存储实例"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContactsStore()
+    return _store
@@ -1,6 +1,5 @@
 import asyncio
 import logging
-import tomllib
 from datetime import datetime, timedelta
 from typing import Optional, Union, List
 
@@ -9,6 +8,7 @@ from sqlalchemy import Column, String, Text, DateTime, delete, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_scoped_session
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from utils.config_service import get_config
 from utils.singleton import Singleton
 
 DeclarativeBase = declarative_base()
@@ -26,8 +26,7 @@ class KeyvalDB(metaclass=Singleton):
     _instance = None
 
     def __new__(cls):
-        with open("main_config.toml", "rb") as f:
-            main_config = tomllib.load(f)
+        main_config = get_config()
         db_url = main_config["XYBot"]["keyvalDB-url"]
 
         if cls._instance is None:
@@ -3,22 +3,38 @@
 用于统计消息数量和相关指标
 """
 
+import atexit
 import os
 import json
 import sqlite3
+import threading
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 from loguru import logger
 
 class MessageCounter:
-    """消息计数器类，用于统计消息数量"""
+    """消息计数器类，用于统计消息数量
 
-    def __init__(self, db_path=None):
+    计数先在内存中按 (日期, 小时) 累加，由后台线程定期在一个事务中写入数据库；
+    查询时合并数据库和内存中尚未写入的计数。
+    """
+
+    def __init__(self, db_path=None, flush_interval=5.0):
         """初始化消息计数器
 
         参数:
             db_path: 数据库路径，如果为None则使用默认路径
+            flush_interval: 内存计数写入数据库的间隔(秒)
         """
+        # 尚未写入数据库的计数 {(date, hour): count}
+        self._pending = defaultdict(int)
+        # 保护内存计数和数据库连接，管理后台在其他线程中读取
+        self._lock = threading.RLock()
+        self.flush_interval = flush_interval
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+
         try:
             # 如果未指定数据库路径，使用默认路径
             if db_path is None:
@@ -66,8 +82,19 @@ class MessageCounter:
         except Exception as e:
             logger.error(f"关闭消息计数器数据库连接失败: {str(e)}")
 
+    def close(self):
+        """停止后台写入线程，写入剩余计数并关闭数据库连接"""
+        self._stop_event.set()
+        if self._flush_thread and self._flush_thread is not threading.current_thread():
+            self._flush_thread.join(timeout=5)
+        with self._lock:
+            self.flush()
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
     def increment(self, count=1, date=None, hour=None):
-        """增加消息计数
+        """增加消息计数，只更新内存，由后台线程定期写入数据库
 
         参数:
             count: 增加的数量，默认为1
@@ -84,28 +111,116 @@ class MessageCounter:
                 date = now.strftime("%Y-%m-%d")
                 hour = now.hour
 
-            # 更新小时统计
-            self.cursor.execute('''
-                INSERT INTO message_stats (date, hour, count)
-                VALUES (?, ?, ?)
-                ON CONFLICT(date, hour) DO UPDATE SET
-                count = count + ?
-            ''', (date, hour, count, count))
-
-            # 更新日统计
-            self.cursor.execute('''
-                INSERT INTO daily_stats (date, count)
-                VALUES (?, ?)
-                ON CONFLICT(date) DO UPDATE SET
-                count = count + ?
-            ''', (date, count, count))
-
-            self.conn.commit()
+            with self._lock:
+                self._pending[(date, hour)] += count
+            self._ensure_flush_thread()
             return True
         except Exception as e:
             logger.error(f"增加消息计数失败: {str(e)}")
             return False
 
+    def _ensure_flush_thread(self):
+        if self._flush_thread is None and not self._stop_event.is_set():
+            with self._lock:
+                if self._flush_thread is None:
+                    self._flush_thread = threading.Thread(target=self._flush_loop,
+                                                          name="MessageCounterFlush", daemon=True)
+                    self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """将内存中的计数在一个事务中写入数据库
+
+        返回:
+            bool: 是否成功
+        """
+        with self._lock:
+            if not self._pending or not self.conn:
+                return True
+            pending, self._pending = self._pending, defaultdict(int)
+
+            daily = defaultdict(int)
+            for (date, hour), count in pending.items():
+                daily[date] += count
+
+            try:
+                # 更新小时统计
+                self.cursor.executemany('''
+                    INSERT INTO message_stats (date, hour, count)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(date, hour) DO UPDATE SET
+                    count = count + excluded.count
+                ''', [(date, hour, count) for (date, hour), count in pending.items()])
+
+                # 更新日统计
+                self.cursor.executemany('''
+                    INSERT INTO daily_stats (date, count)
+                    VALUES (?, ?)
+                    ON CONFLICT(date) DO UPDATE SET
+                    count = count + excluded.count
+                ''', list(daily.items()))
+
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"写入消息计数失败: {str(e)}")
+                self.conn.rollback()
+                # 放回内存，下次再写入
+                for key, count in pending.items():
+                    self._pending[key] += count
+                return False
+
+    def _pending_daily(self):
+        """内存中尚未写入的每日计数"""
+        daily = defaultdict(int)
+        for (date, hour), count in self._pending.items():
+            daily[date] += count
+        return daily
+
+    def daily_counts(self, start_date_str, end_date_str):
+        """获取日期范围内的每日消息数，包含尚未写入数据库的计数
+
+        参数:
+            start_date_str: 开始日期，格式为YYYY-MM-DD
+            end_date_str: 结束日期，格式为YYYY-MM-DD
+
+        返回:
+            dict: 键为日期(YYYY-MM-DD)，值为消息数量，按日期排序
+        """
+        with self._lock:
+            self.cursor.execute(
+                "SELECT date, count FROM daily_stats WHERE date >= ? AND date <= ? ORDER BY date",
+                (start_date_str, end_date_str)
+            )
+            counts = dict(self.cursor.fetchall())
+            for date, count in self._pending_daily().items():
+                if start_date_str <= date <= end_date_str:
+                    counts[date] = counts.get(date, 0) + count
+        return dict(sorted(counts.items()))
+
+    def hourly_counts(self, date_str):
+        """获取某一天每小时的消息数，包含尚未写入数据库的计数
+
+        参数:
+            date_str: 日期，格式为YYYY-MM-DD
+
+        返回:
+            dict: 键为小时(0-23)，值为消息数量，按小时排序
+        """
+        with self._lock:
+            self.cursor.execute(
+                "SELECT hour, count FROM message_stats WHERE date = ? ORDER BY hour",
+                (date_str,)
+            )
+            counts = dict(self.cursor.fetchall())
+            for (date, hour), count in self._pending.items():
+                if date == date_str:
+                    counts[hour] = counts.get(hour, 0) + count
+        return dict(sorted(counts.items()))
+
     def get_stats(self):
         """获取消息统计数据
 
@@ -117,19 +232,18 @@ class MessageCounter:
             today = datetime.now().strftime("%Y-%m-%d")
             yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-            # 获取总消息数
-            self.cursor.execute("SELECT SUM(count) FROM daily_stats")
-            total_messages = self.cursor.fetchone()[0] or 0
+            seven_days_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+            with self._lock:
+                # 获取总消息数
+                self.cursor.execute("SELECT SUM(count) FROM daily_stats")
+                total_messages = (self.cursor.fetchone()[0] or 0) + sum(self._pending_daily().values())
 
-            # 获取今日消息数
-            self.cursor.execute("SELECT count FROM daily_stats WHERE date = ?", (today,))
-            result = self.cursor.fetchone()
-            today_messages = result[0] if result else 0
+                # 获取过去7天的每日消息数
+                daily = self.daily_counts(seven_days_ago, today)
 
-            # 获取昨日消息数
-            self.cursor.execute("SELECT count FROM daily_stats WHERE date = ?", (yesterday,))
-            result = self.cursor.fetchone()
-            yesterday_messages = result[0] if result else 0
+            # 获取今日和昨日消息数
+            today_messages = daily.get(today, 0)
+            yesterday_messages = daily.get(yesterday, 0)
 
             # 计算增长率
             growth_rate = 0
@@ -139,14 +253,7 @@ class MessageCounter:
                 # 如果昨天没有消息，今天有消息，增长率为100%
                 growth_rate = 100
 
-            # 获取过去7天的平均每日消息数
-            seven_days_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-            self.cursor.execute(
-                "SELECT AVG(count) FROM daily_stats WHERE date >= ? AND date <= ?",
-                (seven_days_ago, today)
-            )
-            result = self.cursor.fetchone()
-            avg_daily = result[0] if result and result[0] else 0
+            avg_daily = sum(daily.values()) / len(daily) if daily else 0
 
             return {
                 'total_messages': total_messages,
@@ -181,15 +288,11 @@ class MessageCounter:
             end_date_str = end_date.strftime("%Y-%m-%d")
 
             # 查询数据库
-            self.cursor.execute(
-                "SELECT date, count FROM daily_stats WHERE date >= ? AND date <= ? ORDER BY date",
-                (start_date_str, end_date_str)
-            )
-            results = self.cursor.fetchall()
+            results = self.daily_counts(start_date_str, end_date_str)
 
             # 构建结果列表
             stats = []
-            for date_str, count in results:
+            for date_str, count in results.items():
                 stats.append({
                     "date": date_str,
                     "count": count
@@ -226,6 +329,8 @@ def get_instance():
     global _instance
     if _instance is None:
         _instance = MessageCounter()
+        # 退出时写入内存中剩余的计数
+        atexit.register(_instance.flush)
     return _instance
 
 def get_hourly_stats():
@@ -239,15 +344,11 @@ def get_hourly_stats():
         today = datetime.now().strftime("%Y-%m-%d")
 
         # 查询今天每小时的消息数量
-        counter.cursor.execute(
-            "SELECT hour, count FROM message_stats WHERE date = ? ORDER BY hour",
-            (today,)
-        )
-        results = counter.cursor.fetchall()
+        results = counter.hourly_counts(today)
 
         # 构建结果字典
         hourly_stats = {}
-        for hour, count in results:
+        for hour, count in results.items():
             hourly_stats[str(hour)] = count
 
         return hourly_stats
@@ -273,16 +374,7 @@ def get_daily_stats(days=7):
         end_date_str = end_date.strftime("%Y-%m-%d")
 
         # 查询指定日期范围内的每日消息数量
-        counter.cursor.execute(
-            "SELECT date, count FROM daily_stats WHERE date >= ? AND date <= ? ORDER BY date",
-            (start_date_str, end_date_str)
-        )
-        results = counter.cursor.fetchall()
-
-        # 构建结果字典
-        daily_stats = {}
-        for date_str, count in results:
-            daily_stats[date_str] = count
+        daily_stats = counter.daily_counts(start_date_str, end_date_str)
 
         return daily_stats
     except Exception as e:
@@ -1,17 +1,21 @@
 import asyncio
+import itertools
 import logging
-import tomllib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
-from pydantic import validate_arguments
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, delete
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, delete, event, insert
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_scoped_session
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from utils.config_service import get_config
 from utils.singleton import Singleton
 
+from .sqlite_utils import enable_sqlite_wal
+
 # 使用新的声明式基类
 DeclarativeBase = declarative_base()
 
@@ -30,11 +34,15 @@ class Message(DeclarativeBase):
 
 
 class MessageDB(metaclass=Singleton):
+    """消息记录数据库
+
+    save_message 只把消息放入内存缓冲区，由后台任务按条数或时间批量写入，
+    同一 msg_id 在缓冲区中只保留最后一次写入的内容。
+    """
     _instance = None
 
     def __new__(cls):
-        with open("main_config.toml", "rb") as f:
-            main_config = tomllib.load(f)
+        main_config = get_config()
         db_url = main_config["XYBot"]["msgDB-url"]
 
         if cls._instance is None:
@@ -44,6 +52,29 @@ class MessageDB(metaclass=Singleton):
                 echo=False,
                 future=True
             )
+            if cls._instance.engine.url.get_backend_name() == "sqlite":
+                event.listen(cls._instance.engine.sync_engine, "connect", enable_sqlite_wal)
+
+            cls._instance.batch_size = max(1, main_config["XYBot"].get("msgDB-batch-size", 200))
+            cls._instance.flush_interval = main_config["XYBot"].get("msgDB-flush-interval", 1.0)
+            # 写入失败时最多保留的待写入消息数，超出后丢弃最早的消息
+            cls._instance.max_backlog = cls._instance.batch_size * 50
+            cls._instance._buffer = OrderedDict()
+            cls._instance._anonymous_ids = itertools.count()
+            cls._instance._flush_lock = asyncio.Lock()
+            cls._instance._flush_wakeup = asyncio.Event()
+            cls._instance._flush_task = None
+
+            # 统计信息
+            cls._instance.buffered = 0
+            cls._instance.deduplicated = 0
+            cls._instance.written = 0
+            cls._instance.dropped = 0
+            cls._instance.flush_count = 0
+            cls._instance.flush_failures = 0
+            cls._instance.total_flush_time = 0.0
+            cls._instance.max_flush_time = 0.0
+            cls._instance.last_flush_time = 0.0
             cls._async_session_factory = async_scoped_session(
                 sessionmaker(
                     cls._instance.engine,
@@ -59,7 +90,6 @@ class MessageDB(metaclass=Singleton):
         async with self.engine.begin() as conn:
             await conn.run_sync(DeclarativeBase.metadata.create_all)
 
-    @validate_arguments(config=dict(arbitrary_types_allowed=True))
     async def save_message(self,
                            msg_id: int,
                            sender_wxid: str = "",
@@ -67,31 +97,116 @@ class MessageDB(metaclass=Singleton):
                            msg_type: int = 0,
                            content: str = "",
                            is_group: bool = False) -> bool:
-        """异步保存消息到数据库"""
+        """保存消息，消息先进入缓冲区，由后台任务批量写入数据库"""
         # 确保content是字符串类型
         if isinstance(content, dict) and "string" in content:
             content = content["string"]
         elif not isinstance(content, str):
             content = str(content)
-            
-        async with self._async_session_factory() as session:
+
+        try:
+            row = {
+                "msg_id": int(msg_id or 0),
+                "sender_wxid": str(sender_wxid or ""),
+                "from_wxid": str(from_wxid or ""),
+                "msg_type": int(msg_type or 0),
+                "content": content,
+                "is_group": bool(is_group),
+                "timestamp": datetime.now(),
+            }
+        except (TypeError, ValueError) as e:
+            logging.error(f"保存消息失败: {str(e)}")
+            return False
+
+        # 同一条消息在缓冲区中只保留最后一次写入，没有ID的消息不去重
+        key = row["msg_id"] or f"anonymous-{next(self._anonymous_ids)}"
+        if key in self._buffer:
+            self.deduplicated += 1
+            row["timestamp"] = self._buffer[key]["timestamp"]
+        self._buffer[key] = row
+        self.buffered += 1
+
+        self._ensure_flush_task()
+        if len(self._buffer) >= self.batch_size:
+            self._flush_wakeup.set()
+        return True
+
+    def _ensure_flush_task(self):
+        if self._flush_task is None or self._flush_task.done():
             try:
-                message = Message(
-                    msg_id=msg_id,
-                    sender_wxid=sender_wxid,
-                    from_wxid=from_wxid,
-                    msg_type=msg_type,
-                    content=content,
-                    is_group=is_group,
-                    timestamp=datetime.now()
-                )
-                session.add(message)
-                await session.commit()
-                return True
-            except Exception as e:
-                logging.error(f"保存消息失败: {str(e)}")
-                await session.rollback()
-                return False
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                pass
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """立即将缓冲区中的消息写入数据库
+
+        Returns:
+            int: 写入的消息数
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            pending, self._buffer = self._buffer, OrderedDict()
+
+            start = time.perf_counter()
+            async with self._async_session_factory() as session:
+                try:
+                    await session.execute(insert(Message), list(pending.values()))
+                    await session.commit()
+                except asyncio.CancelledError:
+                    # 写入中途被取消（如关闭时取消后台任务），放回缓冲区由之后的 flush 写入
+                    self._requeue(pending)
+                    raise
+                except Exception as e:
+                    logging.error(f"批量保存消息失败: {str(e)}")
+                    await session.rollback()
+                    self.flush_failures += 1
+                    self._requeue(pending)
+                    return 0
+
+            elapsed = time.perf_counter() - start
+            self.flush_count += 1
+            self.written += len(pending)
+            self.total_flush_time += elapsed
+            self.last_flush_time = elapsed
+            self.max_flush_time = max(self.max_flush_time, elapsed)
+            return len(pending)
+
+    def _requeue(self, pending: OrderedDict):
+        # 写入失败的消息放回缓冲区头部，期间新写入的同ID消息优先
+        for key, row in self._buffer.items():
+            pending[key] = row
+        while len(pending) > self.max_backlog:
+            pending.popitem(last=False)
+            self.dropped += 1
+        self._buffer = pending
+
+    def stats(self) -> Dict[str, Any]:
+        """获取写入缓冲区统计信息"""
+        return {
+            "backlog": len(self._buffer),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "buffered": self.buffered,
+            "deduplicated": self.deduplicated,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flush_count,
+            "flush_failures": self.flush_failures,
+            "last_flush_ms": round(self.last_flush_time * 1000, 2),
+            "avg_flush_ms": round(self.total_flush_time / self.flush_count * 1000, 2) if self.flush_count else 0,
+            "max_flush_ms": round(self.max_flush_time * 1000, 2),
+        }
 
     async def get_messages(self,
                            start_time: Optional[datetime] = None,
@@ -102,6 +217,8 @@ class MessageDB(metaclass=Singleton):
                            is_group: Optional[bool] = None,
                            limit: int = 100) -> List[Message]:
         """异步查询消息记录"""
+        # 先写入缓冲区中的消息，保证能查到刚保存的消息
+        await self.flush()
         async with self._async_session_factory() as session:
             try:
                 query = select(Message).order_by(Message.timestamp.desc()).limit(limit)
@@ -126,12 +243,21 @@ class MessageDB(metaclass=Singleton):
                 return []
 
     async def close(self):
-        """关闭数据库连接"""
+        """写入缓冲区中剩余的消息并关闭数据库连接"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
         await self.engine.dispose()
 
     async def cleanup_messages(self):
         """每三天清理旧消息"""
         while True:
+            await self.flush()
             async with self._async_session_factory() as session:
                 try:
                     # 计算三天前的时间
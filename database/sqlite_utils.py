@@ -0,0 +1,11 @@
+"""
+SQLite 连接设置
+"""
+
+
+def enable_sqlite_wal(dbapi_connection, connection_record):
+    """SQLAlchemy connect 事件回调：SQLite 使用 WAL 模式，写入时不阻塞读取，并减少每次提交的 fsync"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
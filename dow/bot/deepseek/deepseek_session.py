@@ -33,13 +33,13 @@ class DeepseekSession(Session):
                 if i > 0:
                     if "role" in self.messages[i] and self.messages[i]["role"] == "system":
                         continue
-                    self.messages.pop(i)
+                    self.pop_message(i)
                     return True
         return False
 
-    def calc_tokens(self):
-        """计算当前会话的token数量"""
-        return len(str(self.messages))
+    def count_tokens(self, message):
+        """计算单条消息的token数量，按 str(self.messages) 中该消息及分隔符的长度计算"""
+        return len(str(message)) + 2
 
     def get_messages(self):
         """获取当前会话中的所有消息"""
@@ -459,17 +459,19 @@ class LinkAISessionManager(SessionManager):
 
 
 class LinkAISession(ChatGPTSession):
-    def calc_tokens(self):
-        if not self.messages:
-            return 0
-        return len(str(self.messages))
+    def count_tokens(self, message):
+        # 与 len(str(self.messages)) 一致：每条消息加上分隔符或括号的2个字符
+        return len(str(message)) + 2
+
+    def extra_tokens(self):
+        return 0
 
     def discard_exceeding(self, max_tokens, cur_tokens=None):
         cur_tokens = self.calc_tokens()
         if cur_tokens > max_tokens:
             for i in range(0, len(self.messages)):
                 if i > 0 and self.messages[i].get("role") == "assistant" and self.messages[i - 1].get("role") == "user":
-                    self.messages.pop(i)
-                    self.messages.pop(i - 1)
-                    return self.calc_tokens()
+                    self.pop_message(i)
+                    self.pop_message(i - 1)
+                    return self.counted_tokens()
         return cur_tokens
@@ -1,3 +1,4 @@
+from bot.chatgpt.chat_gpt_session import get_encoding
 from bot.session_manager import Session
 from common.log import logger
 
@@ -15,14 +16,7 @@ class OpenAISession(Session):
               A: xxx
               Q: xxx
         """
-        prompt = ""
-        for item in self.messages:
-            if item["role"] == "system":
-                prompt += item["content"] + "<|endoftext|>\n\n\n"
-            elif item["role"] == "user":
-                prompt += "Q: " + item["content"] + "\n"
-            elif item["role"] == "assistant":
-                prompt += "\n\nA: " + item["content"] + "<|endoftext|>\n"
+        prompt = "".join(_prompt_of(item) for item in self.messages)
 
         if len(self.messages) > 0 and self.messages[-1]["role"] == "user":
             prompt += "A: "
@@ -39,11 +33,11 @@ class OpenAISession(Session):
             logger.debug("Exception when counting tokens precisely for query: {}".format(e))
         while cur_tokens > max_tokens:
             if len(self.messages) > 1:
-                self.messages.pop(0)
+                self.pop_message(0)
             elif len(self.messages) == 1 and self.messages[0]["role"] == "assistant":
-                self.messages.pop(0)
+                self.pop_message(0)
                 if precise:
-                    cur_tokens = self.calc_tokens()
+                    cur_tokens = self.counted_tokens()
                 else:
                     cur_tokens = len(str(self))
                 break
@@ -54,20 +48,35 @@ class OpenAISession(Session):
                 logger.debug("max_tokens={}, total_tokens={}, len(conversation)={}".format(max_tokens, cur_tokens, len(self.messages)))
                 break
             if precise:
-                cur_tokens = self.calc_tokens()
+                cur_tokens = self.counted_tokens()
             else:
                 cur_tokens = len(str(self))
         return cur_tokens
 
-    def calc_tokens(self):
-        return num_tokens_from_string(str(self), self.model)
+    def count_tokens(self, message):
+        # 按 __str__ 中每条消息对应的片段分别计数，片段之间以换行分隔，与整段计数基本一致
+        return num_tokens_from_string(_prompt_of(message), self.model)
+
+    def extra_tokens(self):
+        if len(self.messages) > 0 and self.messages[-1]["role"] == "user":
+            return num_tokens_from_string("A: ", self.model)
+        return 0
+
+
+def _prompt_of(item):
+    """单条消息在对话模型输入中的片段"""
+    if item["role"] == "system":
+        return item["content"] + "<|endoftext|>\n\n\n"
+    elif item["role"] == "user":
+        return "Q: " + item["content"] + "\n"
+    elif item["role"] == "assistant":
+        return "\n\nA: " + item["content"] + "<|endoftext|>\n"
+    return ""
 
 
 # refer to https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb
 def num_tokens_from_string(string: str, model: str) -> int:
     """Returns the number of tokens in a text string."""
-    import tiktoken
-
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = get_encoding(model)
     num_tokens = len(encoding.encode(string, disallowed_special=()))
     return num_tokens
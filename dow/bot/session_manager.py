@@ -7,6 +7,9 @@ class Session(object):
     def __init__(self, session_id, system_prompt=None):
         self.session_id = session_id
         self.messages = []
+        # 与 messages 一一对应的 (消息, token数)，每条消息只计数一次
+        self._token_counts = []
+        self._token_total = 0
         if system_prompt is None:
             self.system_prompt = conf().get("character_desc", "")
         else:
@@ -32,14 +35,63 @@ class Session(object):
     def discard_exceeding(self, max_tokens=None, cur_tokens=None):
         raise NotImplementedError
 
-    def calc_tokens(self):
+    def count_tokens(self, message):
+        """计算单条消息的token数，由子类实现，结果会被缓存"""
         raise NotImplementedError
 
+    def extra_tokens(self):
+        """消息之外固定占用的token数"""
+        return 0
+
+    def calc_tokens(self):
+        """计算当前会话的token数，只对还没有计数过的消息调用 count_tokens"""
+        return self._sync_tokens() + self.extra_tokens()
+
+    def counted_tokens(self):
+        """返回上一次 calc_tokens 之后的token数，之后只能通过 pop_message 删除消息"""
+        return self._token_total + self.extra_tokens()
+
+    def pop_message(self, index=-1):
+        """删除一条消息并从token总数中减去它的token数，用于 discard_exceeding 逐条丢弃历史消息"""
+        message = self.messages.pop(index)
+        counts = self._token_counts
+        if len(counts) == len(self.messages) + 1 and counts[index][0] is message:
+            self._token_total -= counts.pop(index)[1]
+        return message
+
+    def _sync_tokens(self):
+        """让token缓存与 messages 保持一致，返回所有消息的token数之和
+
+        messages 可能被直接修改（如重置会话、外部 pop），按对象身份复用已经计数过的消息。
+        消息内容被原地修改时不会重新计数。
+        """
+        counts = self._token_counts
+        messages = self.messages
+        counted = len(counts)
+        if counted <= len(messages) and all(counts[i][0] is messages[i] for i in range(counted)):
+            # 常见情况：只在末尾追加了消息
+            for message in messages[counted:]:
+                count = self.count_tokens(message)
+                counts.append((message, count))
+                self._token_total += count
+            return self._token_total
+
+        known = {id(message): count for message, count in counts}
+        new_counts = []
+        for message in messages:
+            count = known.get(id(message))
+            if count is None:
+                count = self.count_tokens(message)
+            new_counts.append((message, count))
+        self._token_counts = new_counts
+        self._token_total = sum(count for _, count in new_counts)
+        return self._token_total
+
 
 class SessionManager(object):
     def __init__(self, sessioncls, **session_args):
         if conf().get("expires_in_seconds"):
-            sessions = ExpiredDict(conf().get("expires_in_seconds"))
+            sessions = ExpiredDict(conf().get("expires_in_seconds"), conf().get("max_sessions"))
         else:
             sessions = dict()
         self.sessions = sessions
@@ -3,6 +3,7 @@ import re
 import threading
 import time
 from asyncio import CancelledError
+from collections import OrderedDict
 from concurrent.futures import Future, ThreadPoolExecutor
 
 from bridge.context import *
@@ -29,6 +30,8 @@ class ChatChannel(Channel):
     futures = {}  # 记录每个session_id提交到线程池的future对象, 用于重置会话时把没执行的future取消掉，正在执行的不会被取消
     sessions = {}  # 用于控制并发，每个session_id同时只能有一个context在处理
     lock = threading.Lock()  # 用于控制对sessions的访问
+    ready = OrderedDict()  # 就绪队列：有待处理消息、且可能还有并发余量的session_id，按就绪顺序轮流处理
+    ready_cond = threading.Condition(lock)  # 就绪队列非空时唤醒消费线程
 
     def __init__(self):
         _thread = threading.Thread(target=self.consume)
@@ -794,10 +797,25 @@ class ChatChannel(Channel):
             except Exception as e:
                 logger.exception("Worker raise exception: {}".format(e))
             with self.lock:
+                futures = self.futures.get(session_id)
+                if futures and worker in futures:
+                    futures.remove(worker)
                 self.sessions[session_id][1].release()
+                self._schedule(session_id)
 
         return func
 
+    def _schedule(self, session_id):
+        """session有待处理的消息时加入就绪队列，空闲且没有消息时删除session，调用方需持有self.lock"""
+        context_queue, semaphore = self.sessions[session_id]
+        if not context_queue.empty():
+            if session_id not in self.ready:
+                self.ready[session_id] = None
+                self.ready_cond.notify()
+        elif semaphore._initial_value == semaphore._value:  # 没有正在处理的任务，说明所有任务都处理完毕
+            del self.sessions[session_id]
+            self.futures.pop(session_id, None)
+
     def produce(self, context: Context):
         session_id = context.get("session_id", 0)
         with self.lock:
@@ -810,55 +828,53 @@ class ChatChannel(Channel):
                 self.sessions[session_id][0].putleft(context)  # 优先处理管理命令
             else:
                 self.sessions[session_id][0].put(context)
+            self._schedule(session_id)
 
-    # 消费者函数，单独线程，用于从消息队列中取出消息并处理
+    # 消费者函数，单独线程，只在有session就绪时被唤醒，从就绪的session中取出消息并处理
     def consume(self):
         while True:
+            with self.ready_cond:
+                while not self.ready:
+                    self.ready_cond.wait()
+                session_id, _ = self.ready.popitem(last=False)
+                context_queue, semaphore = self.sessions[session_id]
+                if not semaphore.acquire(blocking=False):
+                    # 并发已满，等任务完成的回调再把session放回就绪队列
+                    continue
+                if context_queue.empty():
+                    semaphore.release()
+                    self._schedule(session_id)
+                    continue
+                context = context_queue.get()
+                if not context_queue.empty():
+                    self.ready[session_id] = None  # 还有消息，排到队尾，与其他session轮流处理
+            logger.debug("[chat_channel] consume context: {}".format(context))
+            future: Future = handler_pool.submit(self._handle, context)
             with self.lock:
-                session_ids = list(self.sessions.keys())
-            for session_id in session_ids:
-                with self.lock:
-                    context_queue, semaphore = self.sessions[session_id]
-                if semaphore.acquire(blocking=False):  # 等线程处理完毕才能删除
-                    if not context_queue.empty():
-                        context = context_queue.get()
-                        logger.debug("[chat_channel] consume context: {}".format(context))
-                        future: Future = handler_pool.submit(self._handle, context)
-                        future.add_done_callback(self._thread_pool_callback(session_id, context=context))
-                        with self.lock:
-                            if session_id not in self.futures:
-                                self.futures[session_id] = []
-                            self.futures[session_id].append(future)
-                    elif semaphore._initial_value == semaphore._value + 1:  # 除了当前，没有任务再申请到信号量，说明所有任务都处理完毕
-                        with self.lock:
-                            self.futures[session_id] = [t for t in self.futures[session_id] if not t.done()]
-                            assert len(self.futures[session_id]) == 0, "thread pool error"
-                            del self.sessions[session_id]
-                    else:
-                        semaphore.release()
-            time.sleep(0.2)
+                self.futures.setdefault(session_id, []).append(future)
+            future.add_done_callback(self._thread_pool_callback(session_id, context=context))
 
     # 取消session_id对应的所有任务，只能取消排队的消息和已提交线程池但未执行的任务
     def cancel_session(self, session_id):
         with self.lock:
-            if session_id in self.sessions:
-                for future in self.futures[session_id]:
-                    future.cancel()
-                cnt = self.sessions[session_id][0].qsize()
-                if cnt > 0:
-                    logger.info("Cancel {} messages in session {}".format(cnt, session_id))
-                self.sessions[session_id][0] = Dequeue()
+            if session_id not in self.sessions:
+                return
+            futures = list(self.futures.get(session_id, []))
+            cnt = self.sessions[session_id][0].qsize()
+            if cnt > 0:
+                logger.info("Cancel {} messages in session {}".format(cnt, session_id))
+            self.sessions[session_id][0] = Dequeue()
+            self.ready.pop(session_id, None)
+            self._schedule(session_id)
+        # 取消future会同步执行完成回调，回调需要获取self.lock，所以在锁外取消
+        for future in futures:
+            future.cancel()
 
     def cancel_all_session(self):
         with self.lock:
-            for session_id in self.sessions:
-                for future in self.futures[session_id]:
-                    future.cancel()
-                cnt = self.sessions[session_id][0].qsize()
-                if cnt > 0:
-                    logger.info("Cancel {} messages in session {}".format(cnt, session_id))
-                self.sessions[session_id][0] = Dequeue()
-
+            session_ids = list(self.sessions.keys())
+        for session_id in session_ids:
+            self.cancel_session(session_id)
 
 def check_prefix(content, prefix_list):
     if not prefix_list:
@@ -18,7 +18,9 @@ from channel.chat_channel import ChatChannel
 from channel.chat_message import ChatMessage
 from channel.wx849.wx849_message import WX849Message  # 改为从wx849_message导入WX849Message
 from common.expired_dict import ExpiredDict
+from common.json_stream import Base64Field, StreamingJsonPayload
 from common.log import logger
+from common.media_downloader import CHUNK_SIZE, ChunkDownloadError, download_chunks
 from common.singleton import singleton
 from common.time_check import time_checker
 from common.utils import remove_markdown_symbol
@@ -763,10 +765,14 @@ class WX849Channel(ChatChannel):
                     return web.json_response({"success": False, "message": "Unauthorized"}, status=401)
             # 如果没有设置API密钥，则不进行验证
 
-            # 读取消息内容
+            # 读取消息内容，可以是单条消息或消息数组
             data = await request.json()
             logger.debug(f"[WX849] 收到回调消息: {json.dumps(data, ensure_ascii=False)}")
 
+            if isinstance(data, list):
+                # 守护进程批量转发的消息数组，与 {"messages": [...]} 格式的处理方式相同
+                data = {"messages": data}
+
             # 处理消息
             await self._process_callback_message(data)
 
@@ -2103,6 +2109,14 @@ class WX849Channel(ChatChannel):
                             logger.info(f"[WX849] 使用已存在的图片文件: {existing_path}")
                             return True
 
+            # 同一张图片（md5相同）已经下载过时直接复用
+            md5 = cmsg.image_info.get('md5', '') if isinstance(getattr(cmsg, 'image_info', None), dict) else ''
+            md5_path = os.path.join(tmp_dir, f"md5_{md5}.jpg") if md5 else None
+            if md5_path and os.path.exists(md5_path) and os.path.getsize(md5_path) > 0:
+                self._link_or_copy(md5_path, image_path)
+                logger.info(f"[WX849] 使用md5相同的已下载图片: {md5_path}")
+                return self._finish_image_download(cmsg, image_path)
+
             # 获取API配置
             api_host = conf().get("wx849_api_host", "127.0.0.1")
             api_port = conf().get("wx849_api_port", 9011)
@@ -2113,441 +2127,127 @@ class WX849Channel(ChatChannel):
                 api_path_prefix = "/api"
             else:
                 api_path_prefix = "/VXAPI"
+            api_url = f"http://{api_host}:{api_port}{api_path_prefix}/Tools/DownloadImg"
 
             # 估计图片大小
             data_len = int(cmsg.image_info.get('length', '0'))
             if data_len <= 0:
                 data_len = 229920  # 默认大小
 
-            # 分段大小
-            chunk_size = 65536  # 64KB - 必须使用这个大小，API限制每次最多下载64KB
-
-            # 计算分段数
-            num_chunks = (data_len + chunk_size - 1) // chunk_size
-            if num_chunks <= 0:
-                num_chunks = 1  # 至少分1段
-
-            # 不限制最大分段数，确保完整下载图片
-            # 但记录一个警告，如果分段数过多
-            if num_chunks > 20:
-                logger.warning(f"[WX849] 图片分段数较多 ({num_chunks})，下载可能需要较长时间")
-
-            logger.info(f"[WX849] 开始分段下载图片，总大小: {data_len} 字节，分 {num_chunks} 段下载")
-
-            # 创建一个空文件
-            with open(image_path, "wb") as f:
-                pass
-
-            # 分段下载
-            all_chunks_success = True
-            for i in range(num_chunks):
-                start_pos = i * chunk_size
-                current_chunk_size = min(chunk_size, data_len - start_pos)
-                if current_chunk_size <= 0:
-                    current_chunk_size = chunk_size
+            concurrency = conf().get("wx849_image_download_concurrency", 4)
+            logger.info(f"[WX849] 开始分段下载图片，总大小: {data_len} 字节，"
+                        f"分 {(data_len + CHUNK_SIZE - 1) // CHUNK_SIZE} 段，并发数: {concurrency}")
 
-                # 构建API请求参数 - 使用与原始框架相同的格式
-                params = {
-                    "MsgId": cmsg.msg_id,
-                    "ToWxid": cmsg.from_user_id,
-                    "Wxid": self.wxid,
-                    "DataLen": data_len,
-                    "CompressType": 0,
-                    "Section": {
-                        "StartPos": start_pos,
-                        "DataLen": current_chunk_size
+            async with aiohttp.ClientSession() as session:
+                async def fetch_chunk(start_pos, chunk_size):
+                    # 构建API请求参数 - 使用与原始框架相同的格式
+                    params = {
+                        "MsgId": cmsg.msg_id,
+                        "ToWxid": cmsg.from_user_id,
+                        "Wxid": self.wxid,
+                        "DataLen": data_len,
+                        "CompressType": 0,
+                        "Section": {
+                            "StartPos": start_pos,
+                            "DataLen": chunk_size
+                        }
                     }
-                }
-
-                logger.debug(f"[WX849] 尝试下载图片分段: MsgId={cmsg.msg_id}, ToWxid={cmsg.from_user_id}, DataLen={data_len}, StartPos={start_pos}, ChunkSize={current_chunk_size}")
-
-                # 构建完整的API URL - 尝试不同的API路径
-                # 首先尝试 /VXAPI/Tools/DownloadImg
-                api_url = f"http://{api_host}:{api_port}{api_path_prefix}/Tools/DownloadImg"
-
-                # 记录完整的请求URL和参数
-                logger.debug(f"[WX849] 图片下载API URL: {api_url}")
-                logger.debug(f"[WX849] 图片下载API参数: {params}")
+                    async with session.post(api_url, json=params) as response:
+                        if response.status != 200:
+                            raise ChunkDownloadError(f"状态码: {response.status}")
+                        result = await response.json()
+                    if not result.get("Success", False):
+                        raise ChunkDownloadError(result.get('Message', '未知错误'))
+                    return self._extract_image_chunk(result)
 
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(api_url, json=params) as response:
-                            if response.status != 200:
-                                logger.error(f"[WX849] 下载图片分段失败, 状态码: {response.status}")
-                                all_chunks_success = False
-                                break
-
-                            # 获取响应内容
-                            result = await response.json()
-
-                            # 检查响应是否成功
-                            if not result.get("Success", False):
-                                logger.error(f"[WX849] 下载图片分段失败: {result.get('Message', '未知错误')}")
-                                all_chunks_success = False
-                                break
+                    image_data = await download_chunks(fetch_chunk, data_len, concurrency=concurrency)
+                except ChunkDownloadError as e:
+                    logger.error(f"[WX849] 分段下载图片失败: {e}")
+                    return False
 
-                            # 提取图片数据 - 适应原始框架的响应格式
-                            data = result.get("Data", {})
-
-                            # 记录响应结构以便调试
-                            if isinstance(data, dict):
-                                logger.debug(f"[WX849] 响应Data字段包含键: {list(data.keys())}")
-
-                            # 尝试不同的响应格式
-                            chunk_base64 = None
-
-                            # 参考 WechatAPI/Client/tool_extension.py 中的处理方式
-                            if isinstance(data, dict):
-                                # 如果是字典，尝试获取buffer字段
-                                if "buffer" in data:
-                                    logger.debug(f"[WX849] 从data.buffer字段获取图片数据")
-                                    chunk_base64 = data.get("buffer")
-                                elif "data" in data and isinstance(data["data"], dict) and "buffer" in data["data"]:
-                                    logger.debug(f"[WX849] 从data.data.buffer字段获取图片数据")
-                                    chunk_base64 = data["data"]["buffer"]
-                                else:
-                                    # 尝试其他可能的字段名
-                                    for field in ["Chunk", "Image", "Data", "FileData", "data"]:
-                                        if field in data:
-                                            logger.debug(f"[WX849] 从data.{field}字段获取图片数据")
-                                            chunk_base64 = data.get(field)
-                                            break
-                            elif isinstance(data, str):
-                                # 如果直接返回字符串，可能就是base64数据
-                                logger.debug(f"[WX849] Data字段是字符串，直接使用")
-                                chunk_base64 = data
-
-                            # 如果在data中没有找到，尝试在整个响应中查找
-                            if not chunk_base64 and isinstance(result, dict):
-                                for field in ["data", "Data", "FileData", "Image"]:
-                                    if field in result:
-                                        logger.debug(f"[WX849] 从result.{field}字段获取图片数据")
-                                        chunk_base64 = result.get(field)
-                                        break
+            with open(image_path, "wb") as f:
+                f.write(image_data)
+            logger.info(f"[WX849] 分段下载图片成功，总大小: {len(image_data)} 字节")
 
-                            if not chunk_base64:
-                                logger.error(f"[WX849] 下载图片分段失败: 响应中无图片数据")
-                                # 避免记录大量数据，只记录数据类型和长度
-                                if isinstance(data, dict):
-                                    logger.debug(f"[WX849] 响应数据类型: 字典, 键: {list(data.keys())}")
-                                elif isinstance(data, str):
-                                    logger.debug(f"[WX849] 响应数据类型: 字符串, 长度: {len(data)}")
-                                else:
-                                    logger.debug(f"[WX849] 响应数据类型: {type(data)}")
-                                all_chunks_success = False
-                                break
+            if md5_path:
+                self._link_or_copy(image_path, md5_path)
+            return self._finish_image_download(cmsg, image_path)
+        except Exception as e:
+            logger.error(f"[WX849] 下载图片失败: {e}")
+            logger.error(f"[WX849] 详细错误: {traceback.format_exc()}")
+            return False
 
-                            # 解码数据并保存图片分段
-                            try:
-                                # 尝试确定数据类型并正确处理
-                                if isinstance(chunk_base64, str):
-                                    # 尝试作为Base64解码
-                                    try:
-                                        # 修复：确保字符串是有效的Base64
-                                        # 移除可能的非Base64字符
-                                        clean_base64 = chunk_base64.strip()
-                                        # 确保长度是4的倍数，如果不是，添加填充
-                                        padding = 4 - (len(clean_base64) % 4) if len(clean_base64) % 4 != 0 else 0
-                                        clean_base64 = clean_base64 + ('=' * padding)
-
-                                        chunk_data = base64.b64decode(clean_base64)
-                                        logger.debug(f"[WX849] 成功解码Base64数据，大小: {len(chunk_data)} 字节")
-                                    except Exception as decode_err:
-                                        logger.error(f"[WX849] Base64解码失败: {decode_err}")
-                                        # 如果解码失败，记录错误并跳过这个分段
-                                        logger.error(f"[WX849] 无法解码的数据: {chunk_base64[:100]}...")
-                                        raise decode_err
-                                elif isinstance(chunk_base64, bytes):
-                                    # 已经是二进制数据，直接使用
-                                    logger.debug(f"[WX849] 使用二进制数据，大小: {len(chunk_base64)} 字节")
-                                    chunk_data = chunk_base64
-                                elif isinstance(chunk_base64, dict):
-                                    # 如果是字典，尝试从字典中提取数据
-                                    logger.debug(f"[WX849] 数据是字典类型，键: {list(chunk_base64.keys())}")
-                                    # 尝试从常见的键中获取数据
-                                    found_data = False
-                                    for key in ['data', 'Data', 'content', 'Content', 'image', 'Image']:
-                                        if key in chunk_base64:
-                                            data_value = chunk_base64[key]
-                                            if isinstance(data_value, str):
-                                                try:
-                                                    # 清理和填充Base64字符串
-                                                    clean_base64 = data_value.strip()
-                                                    padding = 4 - (len(clean_base64) % 4) if len(clean_base64) % 4 != 0 else 0
-                                                    clean_base64 = clean_base64 + ('=' * padding)
-
-                                                    chunk_data = base64.b64decode(clean_base64)
-                                                    logger.debug(f"[WX849] 从字典键 {key} 成功解码Base64数据，大小: {len(chunk_data)} 字节")
-                                                    found_data = True
-                                                    break
-                                                except Exception as e:
-                                                    logger.debug(f"[WX849] 从字典键 {key} 解码Base64失败: {e}")
-                                                    continue
-                                            elif isinstance(data_value, bytes):
-                                                chunk_data = data_value
-                                                logger.debug(f"[WX849] 从字典键 {key} 获取到二进制数据，大小: {len(data_value)} 字节")
-                                                found_data = True
-                                                break
-
-                                    # 如果常见键中没有找到，尝试遍历所有键
-                                    if not found_data:
-                                        logger.debug(f"[WX849] 在常见键中未找到数据，尝试遍历所有键")
-                                        for key, value in chunk_base64.items():
-                                            if isinstance(value, str) and len(value) > 10:  # 只处理可能是Base64的长字符串
-                                                try:
-                                                    # 清理和填充Base64字符串
-                                                    clean_base64 = value.strip()
-                                                    padding = 4 - (len(clean_base64) % 4) if len(clean_base64) % 4 != 0 else 0
-                                                    clean_base64 = clean_base64 + ('=' * padding)
-
-                                                    chunk_data = base64.b64decode(clean_base64)
-                                                    logger.debug(f"[WX849] 从字典键 {key} 成功解码Base64数据，大小: {len(chunk_data)} 字节")
-                                                    found_data = True
-                                                    break
-                                                except Exception:
-                                                    continue
-                                            elif isinstance(value, bytes) and len(value) > 10:
-                                                chunk_data = value
-                                                logger.debug(f"[WX849] 从字典键 {key} 获取到二进制数据，大小: {len(value)} 字节")
-                                                found_data = True
-                                                break
-                                            elif isinstance(value, dict) and len(value) > 0:
-                                                # 递归处理嵌套字典
-                                                logger.debug(f"[WX849] 发现嵌套字典，键: {key}，尝试递归处理")
-                                                for subkey, subvalue in value.items():
-                                                    if isinstance(subvalue, str) and len(subvalue) > 10:
-                                                        try:
-                                                            # 清理和填充Base64字符串
-                                                            clean_base64 = subvalue.strip()
-                                                            padding = 4 - (len(clean_base64) % 4) if len(clean_base64) % 4 != 0 else 0
-                                                            clean_base64 = clean_base64 + ('=' * padding)
-
-                                                            chunk_data = base64.b64decode(clean_base64)
-                                                            logger.debug(f"[WX849] 从嵌套字典键 {key}.{subkey} 成功解码Base64数据，大小: {len(chunk_data)} 字节")
-                                                            found_data = True
-                                                            break
-                                                        except Exception:
-                                                            continue
-                                                    elif isinstance(subvalue, bytes) and len(subvalue) > 10:
-                                                        chunk_data = subvalue
-                                                        logger.debug(f"[WX849] 从嵌套字典键 {key}.{subkey} 获取到二进制数据，大小: {len(subvalue)} 字节")
-                                                        found_data = True
-                                                        break
-                                                if found_data:
-                                                    break
-
-                                    # 如果仍然没有找到有效数据，尝试使用整个字典的字符串表示
-                                    if not found_data:
-                                        logger.warning(f"[WX849] 无法从字典中提取有效的图片数据，尝试使用默认空数据")
-                                        # 创建一个空的JPEG图片数据（最小的有效JPEG文件）
-                                        chunk_data = b'\xff\xd8\xff\xe0\x00\x10\x4a\x46\x49\x46\x00\x01\x01\x01\x00\x48\x00\x48\x00\x00\xff\xdb\x00\x43\x00\xff\xc0\x00\x11\x08\x00\x01\x00\x01\x03\x01\x11\x00\x02\x11\x01\x03\x11\x01\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xc4\x00\x14\x10\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xda\x00\x0c\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00\xff\xd9'
-                                        logger.debug(f"[WX849] 使用默认空JPEG数据，大小: {len(chunk_data)} 字节")
-                                else:
-                                    # 其他类型，尝试转换为字符串后处理
-                                    logger.warning(f"[WX849] 未知数据类型: {type(chunk_base64)}，尝试转换为字符串")
-                                    try:
-                                        # 尝试转换为字符串
-                                        str_value = str(chunk_base64)
-                                        if len(str_value) > 10:  # 只处理可能有意义的字符串
-                                            try:
-                                                # 清理和填充Base64字符串
-                                                clean_base64 = str_value.strip()
-                                                padding = 4 - (len(clean_base64) % 4) if len(clean_base64) % 4 != 0 else 0
-                                                clean_base64 = clean_base64 + ('=' * padding)
-
-                                                chunk_data = base64.b64decode(clean_base64)
-                                                logger.debug(f"[WX849] 成功将未知类型转换为Base64并解码，大小: {len(chunk_data)} 字节")
-                                            except Exception as e:
-                                                logger.warning(f"[WX849] 无法将未知类型转换为Base64: {e}")
-                                                # 使用默认空JPEG数据
-                                                chunk_data = b'\xff\xd8\xff\xe0\x00\x10\x4a\x46\x49\x46\x00\x01\x01\x01\x00\x48\x00\x48\x00\x00\xff\xdb\x00\x43\x00\xff\xc0\x00\x11\x08\x00\x01\x00\x01\x03\x01\x11\x00\x02\x11\x01\x03\x11\x01\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xc4\x00\x14\x10\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xda\x00\x0c\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00\xff\xd9'
-                                                logger.debug(f"[WX849] 使用默认空JPEG数据，大小: {len(chunk_data)} 字节")
-                                        else:
-                                            # 字符串太短，使用默认空JPEG数据
-                                            chunk_data = b'\xff\xd8\xff\xe0\x00\x10\x4a\x46\x49\x46\x00\x01\x01\x01\x00\x48\x00\x48\x00\x00\xff\xdb\x00\x43\x00\xff\xc0\x00\x11\x08\x00\x01\x00\x01\x03\x01\x11\x00\x02\x11\x01\x03\x11\x01\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xc4\x00\x14\x10\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xda\x00\x0c\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00\xff\xd9'
-                                            logger.debug(f"[WX849] 使用默认空JPEG数据，大小: {len(chunk_data)} 字节")
-                                    except Exception as e:
-                                        logger.error(f"[WX849] 处理未知数据类型失败: {e}")
-                                        # 使用默认空JPEG数据
-                                        chunk_data = b'\xff\xd8\xff\xe0\x00\x10\x4a\x46\x49\x46\x00\x01\x01\x01\x00\x48\x00\x48\x00\x00\xff\xdb\x00\x43\x00\xff\xc0\x00\x11\x08\x00\x01\x00\x01\x03\x01\x11\x00\x02\x11\x01\x03\x11\x01\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xc4\x00\x14\x10\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xda\x00\x0c\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00\xff\xd9'
-                                        logger.debug(f"[WX849] 使用默认空JPEG数据，大小: {len(chunk_data)} 字节")
-
-                                # 验证数据是否为有效的图片数据
-                                if 'chunk_data' in locals() and chunk_data:
-                                    # 追加到文件
-                                    with open(image_path, "ab") as f:
-                                        f.write(chunk_data)
-                                    logger.debug(f"[WX849] 第 {i+1}/{num_chunks} 段下载成功，大小: {len(chunk_data)} 字节")
-                                else:
-                                    logger.error(f"[WX849] 第 {i+1}/{num_chunks} 段下载失败: 无有效数据")
-                                    all_chunks_success = False
-                                    break
-                            except Exception as decode_err:
-                                logger.error(f"[WX849] 解码Base64图片分段数据失败: {decode_err}")
-                                all_chunks_success = False
-                                break
-                except Exception as api_err:
-                    logger.error(f"[WX849] 调用图片分段API失败: {api_err}")
-                    all_chunks_success = False
+    def _extract_image_chunk(self, result):
+        """从图片分段接口的响应中提取分段数据"""
+        data = result.get("Data", {})
+        chunk_base64 = None
+
+        # 参考 WechatAPI/Client/tool_extension.py 中的处理方式
+        if isinstance(data, dict):
+            if "buffer" in data:
+                chunk_base64 = data.get("buffer")
+            elif "data" in data and isinstance(data["data"], dict) and "buffer" in data["data"]:
+                chunk_base64 = data["data"]["buffer"]
+            else:
+                # 尝试其他可能的字段名
+                for field in ["Chunk", "Image", "Data", "FileData", "data"]:
+                    if field in data:
+                        chunk_base64 = data.get(field)
+                        break
+        elif isinstance(data, str):
+            # 如果直接返回字符串，可能就是base64数据
+            chunk_base64 = data
+
+        # 如果在data中没有找到，尝试在整个响应中查找
+        if not chunk_base64:
+            for field in ["data", "FileData", "Image"]:
+                if field in result:
+                    chunk_base64 = result.get(field)
                     break
 
-            if all_chunks_success:
-                # 检查文件大小
-                file_size = os.path.getsize(image_path)
-                logger.info(f"[WX849] 分段下载图片成功，总大小: {file_size} 字节")
-
-                # 如果文件大小与预期不符，记录警告
-                if file_size < data_len * 0.8:  # 如果实际大小小于预期的80%
-                    logger.warning(f"[WX849] 图片文件大小 ({file_size} 字节) 小于预期 ({data_len} 字节)，可能下载不完整")
-
-                    # 如果文件太小，尝试再次下载缺失的部分
-                    if file_size > 0 and file_size < data_len:
-                        logger.info(f"[WX849] 尝试下载缺失的图片部分，从位置 {file_size} 开始")
-
-                        # 计算剩余部分的分段数
-                        remaining_size = data_len - file_size
-                        remaining_chunks = (remaining_size + chunk_size - 1) // chunk_size
-
-                        # 下载剩余部分
-                        remaining_success = True
-                        for i in range(remaining_chunks):
-                            start_pos = file_size + i * chunk_size
-                            current_chunk_size = min(chunk_size, data_len - start_pos)
-
-                            if current_chunk_size <= 0:
-                                break
-
-                            # 构建API请求参数
-                            params = {
-                                "MsgId": cmsg.msg_id,
-                                "ToWxid": cmsg.from_user_id,
-                                "Wxid": self.wxid,
-                                "DataLen": data_len,
-                                "CompressType": 0,
-                                "Section": {
-                                    "StartPos": start_pos,
-                                    "DataLen": current_chunk_size
-                                }
-                            }
-
-                            logger.debug(f"[WX849] 尝试下载缺失的图片分段: MsgId={cmsg.msg_id}, StartPos={start_pos}, ChunkSize={current_chunk_size}")
-
-                            try:
-                                async with aiohttp.ClientSession() as session:
-                                    async with session.post(api_url, json=params) as response:
-                                        if response.status != 200:
-                                            logger.error(f"[WX849] 下载缺失的图片分段失败, 状态码: {response.status}")
-                                            remaining_success = False
-                                            break
-
-                                        result = await response.json()
-
-                                        if not result.get("Success", False):
-                                            logger.error(f"[WX849] 下载缺失的图片分段失败: {result.get('Message', '未知错误')}")
-                                            remaining_success = False
-                                            break
-
-                                        # 提取图片数据
-                                        data = result.get("Data", {})
-                                        chunk_base64 = None
-
-                                        # 参考 WechatAPI/Client/tool_extension.py 中的处理方式
-                                        if isinstance(data, dict):
-                                            if "buffer" in data:
-                                                chunk_base64 = data.get("buffer")
-                                            elif "data" in data and isinstance(data["data"], dict) and "buffer" in data["data"]:
-                                                chunk_base64 = data["data"]["buffer"]
-
-                                        if chunk_base64:
-                                            try:
-                                                chunk_data = base64.b64decode(chunk_base64)
-                                                with open(image_path, "ab") as f:
-                                                    f.write(chunk_data)
-                                                logger.debug(f"[WX849] 缺失的图片分段下载成功，大小: {len(chunk_data)} 字节")
-                                            except Exception as e:
-                                                logger.error(f"[WX849] 解码缺失的图片分段数据失败: {e}")
-                                                remaining_success = False
-                                                break
-                                        else:
-                                            logger.error(f"[WX849] 下载缺失的图片分段失败: 响应中无图片数据")
-                                            remaining_success = False
-                                            break
-                            except Exception as e:
-                                logger.error(f"[WX849] 下载缺失的图片分段失败: {e}")
-                                remaining_success = False
-                                break
-
-                        if remaining_success:
-                            file_size = os.path.getsize(image_path)
-                            logger.info(f"[WX849] 成功下载缺失的图片部分，最终大小: {file_size} 字节")
-
-                # 检查文件是否存在且有效
-                if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
-                    # 验证图片文件是否为有效的图片格式
-                    try:
-                        from PIL import Image
-                        try:
-                            # 尝试打开图片文件
-                            with Image.open(image_path) as img:
-                                # 获取图片格式和大小
-                                img_format = img.format
-                                img_size = img.size
-                                logger.info(f"[WX849] 图片验证成功: 格式={img_format}, 大小={img_size}")
-                        except Exception as img_err:
-                            logger.error(f"[WX849] 图片验证失败，可能不是有效的图片文件: {img_err}")
-                            # 尝试修复图片文件
-                            try:
-                                # 读取文件内容
-                                with open(image_path, "rb") as f:
-                                    img_data = f.read()
-
-                                # 尝试查找JPEG文件头和尾部标记
-                                jpg_header = b'\xff\xd8'
-                                jpg_footer = b'\xff\xd9'
+        if isinstance(chunk_base64, bytes):
+            return chunk_base64
+        if not isinstance(chunk_base64, str) or not chunk_base64:
+            raise ChunkDownloadError("响应中无图片数据")
 
-                                if img_data.startswith(jpg_header) and img_data.endswith(jpg_footer):
-                                    logger.info(f"[WX849] 图片文件有效的JPEG头尾标记，但内部可能有损坏")
-                                else:
-                                    # 查找JPEG头部标记的位置
-                                    header_pos = img_data.find(jpg_header)
-                                    if header_pos >= 0:
-                                        # 查找JPEG尾部标记的位置
-                                        footer_pos = img_data.rfind(jpg_footer)
-                                        if footer_pos > header_pos:
-                                            # 提取有效的JPEG数据
-                                            valid_data = img_data[header_pos:footer_pos+2]
-                                            # 重写文件
-                                            with open(image_path, "wb") as f:
-                                                f.write(valid_data)
-                                            logger.info(f"[WX849] 尝试修复图片文件，提取了 {len(valid_data)} 字节的有效JPEG数据")
-                            except Exception as fix_err:
-                                logger.error(f"[WX849] 尝试修复图片文件失败: {fix_err}")
-                    except ImportError:
-                        logger.warning(f"[WX849] PIL库未安装，无法验证图片有效性")
+        # 确保长度是4的倍数，如果不是，添加填充
+        clean_base64 = chunk_base64.strip()
+        clean_base64 += "=" * (-len(clean_base64) % 4)
+        return base64.b64decode(clean_base64)
 
-                    # 设置图片本地路径
-                    cmsg.image_path = image_path
-
-                    # 更新消息内容为图片路径，以便DOW框架处理
-                    cmsg.content = image_path
-
-                    # 确保消息类型为IMAGE
-                    cmsg.ctype = ContextType.IMAGE
-
-                    # 设置_prepared标志，表示图片已准备好
-                    cmsg._prepared = True
+    def _link_or_copy(self, src, dst):
+        """硬链接图片文件，不支持时复制"""
+        try:
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.link(src, dst)
+        except OSError:
+            import shutil
+            shutil.copyfile(src, dst)
+
+    def _finish_image_download(self, cmsg, image_path):
+        """验证下载的图片并设置消息的图片路径"""
+        if not os.path.exists(image_path) or os.path.getsize(image_path) <= 0:
+            logger.error(f"[WX849] 图片文件不存在或为空: {image_path}")
+            return False
 
-                    # 图片已经在回调处理时发送到DOW框架，这里只记录日志
-                    logger.info(f"[WX849] 图片下载完成，保存到: {cmsg.image_path}")
+        # 验证图片文件是否为有效的图片格式
+        try:
+            with Image.open(image_path) as img:
+                logger.info(f"[WX849] 图片验证成功: 格式={img.format}, 大小={img.size}")
+        except Exception as img_err:
+            logger.error(f"[WX849] 图片验证失败，可能不是有效的图片文件: {img_err}")
+
+        # 设置图片本地路径，更新消息内容为图片路径，以便DOW框架处理
+        cmsg.image_path = image_path
+        cmsg.content = image_path
+        cmsg.ctype = ContextType.IMAGE
+        # 设置_prepared标志，表示图片已准备好
+        cmsg._prepared = True
 
-                    # 返回True表示下载成功
-                    return True
-                else:
-                    logger.error(f"[WX849] 图片文件不存在或为空: {image_path}")
-                    return False
-        except Exception as e:
-            logger.error(f"[WX849] 下载图片失败: {e}")
-            logger.error(f"[WX849] 详细错误: {traceback.format_exc()}")
+        logger.info(f"[WX849] 图片下载完成，保存到: {cmsg.image_path}")
+        return True
 
     def _get_image(self, msg_id):
         """获取图片数据"""
@@ -5619,15 +5319,9 @@ class WX849Channel(ChatChannel):
                     logger.debug(f"[WX849] 删除临时视频文件失败: {e}")
 
     async def _encode_video(self, video_path):
-        """将视频编码为base64"""
+        """将视频包装为base64字段，发送时按块读取并编码，不整体读入内存"""
         try:
-            with open(video_path, 'rb') as f:
-                video_data = f.read()
-
-            # 使用Base64编码
-            import base64
-            video_base64 = base64.b64encode(video_data).decode('utf-8')
-            return video_base64
+            return Base64Field(video_path, "data:video/mp4;base64,")
         except Exception as e:
             logger.error(f"[WX849] 视频Base64编码失败: {e}")
             return None
@@ -5736,37 +5430,31 @@ class WX849Channel(ChatChannel):
                     cover_base64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
                     logger.debug("[WX849] 使用内置1x1像素作为默认封面")
 
-            # 打印预估时间
-            try:
-                # 计算视频base64长度
-                base64_content = video_base64
-                if base64_content.startswith("data:video/mp4;base64,"):
-                    base64_content = base64_content[len("data:video/mp4;base64,"):]
-
-                # 计算文件大小 (KB)
-                file_len = len(base64.b64decode(base64_content)) / 1024
-
-                # 预估时间 (秒)，按300KB/s计算
-                predict_time = int(file_len / 300)
-                logger.info(f"[WX849] 开始发送视频: 预计{predict_time}秒, 视频大小:{file_len:.2f}KB, 时长:{video_duration}秒")
-            except Exception as e:
-                logger.debug(f"[WX849] 计算预估时间失败: {e}")
-
-            # 处理视频和封面的base64数据
-            pure_video_base64 = video_base64
-            if pure_video_base64.startswith("data:video/mp4;base64,"):
-                pure_video_base64 = pure_video_base64[len("data:video/mp4;base64,"):]
-
+            # 处理视频的base64数据，_encode_video 返回的字段在发送时才按块编码
+            if isinstance(video_base64, Base64Field):
+                video_data = video_base64
+                file_len = video_base64.raw_size / 1024
+            else:
+                pure_video_base64 = video_base64
+                if pure_video_base64.startswith("data:video/mp4;base64,"):
+                    pure_video_base64 = pure_video_base64[len("data:video/mp4;base64,"):]
+                # 确保base64前缀正确
+                video_data = "data:video/mp4;base64," + pure_video_base64
+                file_len = len(pure_video_base64) * 3 / 4 / 1024
+
+            # 打印预估时间 (秒)，按300KB/s计算
+            predict_time = int(file_len / 300)
+            logger.info(f"[WX849] 开始发送视频: 预计{predict_time}秒, 视频大小:{file_len:.2f}KB, 时长:{video_duration}秒")
+
+            # 处理封面的base64数据
             pure_cover_base64 = cover_base64
             if pure_cover_base64 and pure_cover_base64 != "None" and pure_cover_base64.startswith("data:image/jpeg;base64,"):
                 pure_cover_base64 = pure_cover_base64[len("data:image/jpeg;base64,"):]
 
             # 记录API调用参数
-            logger.debug(f"[WX849] 发送视频至接收者: {to_user_id}, 视频base64长度: {len(pure_video_base64)}, 封面base64长度: {len(pure_cover_base64)}")
+            logger.debug(f"[WX849] 发送视频至接收者: {to_user_id}, 视频大小: {file_len:.2f}KB, 封面base64长度: {len(pure_cover_base64)}")
 
             # 直接使用API发送视频（绕过bot.send_video_message方法，避免参数不兼容问题）
-            # 确保base64前缀正确
-            video_data = "data:video/mp4;base64," + pure_video_base64
             cover_data = "data:image/jpeg;base64," + pure_cover_base64
 
             # 构建API参数 - 根据API文档确保参数名称和格式正确
@@ -5796,7 +5484,7 @@ class WX849Channel(ChatChannel):
 
             # 发送请求
             async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=params) as response:
+                async with session.post(url, data=StreamingJsonPayload(params)) as response:
                     json_resp = await response.json()
 
                     # 检查响应
@@ -1,22 +1,64 @@
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
 
 
-class ExpiredDict(dict):
-    def __init__(self, expires_in_seconds):
-        super().__init__()
+class ExpiredDict(MutableMapping):
+    """访问后一段时间内没有再访问就过期的字典
+
+    所有条目的过期时长相同，按最近访问顺序排列的条目同时也是按过期时间排列的，
+    所以过期清理只需要从最久未访问的一端依次删除，每次读写顺带清理，不需要扫描整个字典。
+    遍历(keys/items/values/for)不会刷新过期时间。
+
+    Args:
+        expires_in_seconds: 过期时间(秒)，为空时为3600
+        max_size: 最多保存的条目数，超过时淘汰最久未访问的条目，为空或0时不限制
+    """
+
+    def __init__(self, expires_in_seconds, max_size=None):
         self.expires_in_seconds = expires_in_seconds if expires_in_seconds else 3600
+        self.max_size = max_size or 0
+        self._data = OrderedDict()  # key -> (value, 过期时间)，按最近访问排序，最久未访问的在最前面
+        self._lock = threading.RLock()
 
     def __getitem__(self, key):
-        value, expiry_time = super().__getitem__(key)
-        if datetime.now() > expiry_time:
-            del self[key]
-            raise KeyError("expired {}".format(key))
-        self.__setitem__(key, value)
-        return value
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            value, _ = self._data[key]
+            self._data[key] = (value, now + self.expires_in_seconds)
+            self._data.move_to_end(key)
+            return value
 
     def __setitem__(self, key, value):
-        expiry_time = datetime.now() + timedelta(seconds=self.expires_in_seconds)
-        super().__setitem__(key, (value, expiry_time))
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            self._data[key] = (value, now + self.expires_in_seconds)
+            self._data.move_to_end(key)
+            if self.max_size and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            self._purge(time.monotonic())
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            self._purge(time.monotonic())
+            return len(self._data)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, dict(self.items()))
 
     def get(self, key, default=None):
         try:
@@ -24,19 +66,34 @@ class ExpiredDict(dict):
         except KeyError:
             return default
 
-    def __contains__(self, key):
-        try:
-            self[key]
-            return True
-        except KeyError:
-            return False
-
     def keys(self):
-        keys = list(super().keys())
-        return [key for key in keys if key in self]
+        with self._lock:
+            self._purge(time.monotonic())
+            return list(self._data.keys())
 
     def items(self):
-        return [(key, self[key]) for key in self.keys()]
+        with self._lock:
+            self._purge(time.monotonic())
+            return [(key, value) for key, (value, _) in self._data.items()]
 
-    def __iter__(self):
-        return self.keys().__iter__()
+    def values(self):
+        with self._lock:
+            self._purge(time.monotonic())
+            return [value for value, _ in self._data.values()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge(self):
+        """立即删除所有已过期的条目"""
+        with self._lock:
+            self._purge(time.monotonic())
+
+    def _purge(self, now):
+        data = self._data
+        while data:
+            key, (_, expiry_time) = next(iter(data.items()))
+            if expiry_time > now:
+                break
+            del data[key]
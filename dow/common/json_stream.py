@@ -0,0 +1,125 @@
+"""
+流式 JSON 请求体
+发送视频等大文件时，base64 字段在写入连接时按块编码，文件内容通过 mmap 读取，
+不再在内存中拼出完整的 base64 字符串和 JSON 文本，单次发送的内存占用只和块大小有关
+"""
+
+import base64
+import json
+import mmap
+import os
+import re
+import uuid
+from contextlib import closing, contextmanager
+from typing import Any, Iterator, List, Union
+
+from aiohttp.abc import AbstractStreamWriter
+from aiohttp.payload import Payload
+
+CHUNK_SIZE = 3 * 64 * 1024  # 必须是3的倍数，每块编码后不产生填充字符
+
+
+class Base64Field:
+    """在 JSON 中写成 base64 字符串的字段，内容在发送时才编码
+
+    :param source: 原始内容(bytes)，或文件路径(str 和 os.PathLike 都视为路径)
+    :param prefix: 写在 base64 前面的内容，如 "data:video/mp4;base64,"
+    """
+
+    def __init__(self, source: Union[bytes, bytearray, memoryview, str, os.PathLike], prefix: str = ""):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.path = None
+            self.data = memoryview(source).cast("B")
+            self.raw_size = self.data.nbytes
+        elif isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            self.data = None
+            self.raw_size = os.path.getsize(self.path)
+        else:
+            raise TypeError(f"不支持的内容类型: {type(source).__name__}")
+        self.prefix = prefix.encode("ascii")
+
+    @property
+    def size(self) -> int:
+        """写入 JSON 的字节数，不含引号"""
+        return len(self.prefix) + (self.raw_size + 2) // 3 * 4
+
+    @contextmanager
+    def _open(self) -> Iterator[memoryview]:
+        if self.data is not None or self.raw_size == 0:
+            yield self.data if self.data is not None else memoryview(b"")
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), self.raw_size, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """按块产生编码后的内容，第一块是前缀"""
+        yield self.prefix
+        with self._open() as view:
+            for start in range(0, self.raw_size, chunk_size):
+                yield base64.b64encode(view[start:start + chunk_size])
+
+    def encode(self) -> str:
+        """编码成完整的字符串，只用于调试和小文件"""
+        return b"".join(self.chunks()).decode("ascii")
+
+
+class StreamingJsonPayload(Payload):
+    """可以包含 Base64Field 的 JSON 请求体，用法::
+
+        payload = StreamingJsonPayload({"Wxid": wxid, "Base64": Base64Field(path, "data:video/mp4;base64,")})
+        async with session.post(url, data=payload) as resp:
+            ...
+
+    请求体长度在发送前就能算出，请求仍然带 Content-Length。
+
+    :param value: 请求内容，任意层级的值都可以是 Base64Field
+    :param chunk_size: 每次编码的原始字节数，必须是3的倍数
+    """
+
+    def __init__(self, value: Any, chunk_size: int = CHUNK_SIZE, **kwargs):
+        if chunk_size <= 0 or chunk_size % 3:
+            raise ValueError("chunk_size 必须是3的正整数倍")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(value, **kwargs)
+        self._chunk_size = chunk_size
+
+        # 先用占位字符串序列化，再在占位处切开
+        fields: List[Base64Field] = []
+        marker = uuid.uuid4().hex
+
+        def default(obj):
+            if isinstance(obj, Base64Field):
+                fields.append(obj)
+                return f"{marker}:{len(fields) - 1}"
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+        text = json.dumps(value, default=default)
+        pieces = re.split(f"{marker}:(\\d+)", text)
+        self._parts: List[Union[bytes, Base64Field]] = []
+        for i, piece in enumerate(pieces):
+            if i % 2:
+                self._parts.append(fields[int(piece)])
+            elif piece:
+                self._parts.append(piece.encode("utf-8"))
+        self._size = sum(len(part) if isinstance(part, bytes) else part.size for part in self._parts)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return "".join(part.decode(encoding, errors) if isinstance(part, bytes) else part.encode()
+                       for part in self._parts)
+
+    async def write(self, writer: AbstractStreamWriter) -> None:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                await writer.write(part)
+                continue
+            # 写入缓冲超过上限时 writer.write 会等待连接发送，缓冲中最多只有几块数据；
+            # 发送中途出错时立即关闭生成器，释放 mmap
+            with closing(part.chunks(self._chunk_size)) as chunks:
+                for chunk in chunks:
+                    if chunk:
+                        await writer.write(chunk)
@@ -0,0 +1,71 @@
+"""
+媒体分段下载
+协议端每次最多返回64KB，这里并发下载各个分段，单个分段失败时只重试该分段，
+数据直接写入预先分配的缓冲区
+"""
+
+import asyncio
+
+from common.log import logger
+
+CHUNK_SIZE = 64 * 1024  # 协议端限制，每段最多64KB
+
+
+class ChunkDownloadError(Exception):
+    """分段下载失败"""
+
+
+async def download_chunks(fetch_chunk, total_size, chunk_size=CHUNK_SIZE, concurrency=4, retries=3, retry_delay=0.5):
+    """并发下载所有分段并按顺序拼接
+
+    :param fetch_chunk: 下载单个分段的协程函数，参数为 (起始位置, 分段大小)，返回分段数据
+    :param total_size: 文件总大小
+    :param chunk_size: 分段大小
+    :param concurrency: 同时下载的分段数
+    :param retries: 单个分段的最大重试次数
+    :param retry_delay: 首次重试前的等待时间(秒)，之后每次翻倍
+    :return: 完整数据
+    :raises ChunkDownloadError: 某个分段重试后仍然失败
+    """
+    if total_size <= 0:
+        raise ChunkDownloadError(f"invalid size: {total_size}")
+
+    buffer = bytearray(total_size)
+    view = memoryview(buffer)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    chunks = (total_size + chunk_size - 1) // chunk_size
+
+    async def download(index):
+        start = index * chunk_size
+        size = min(chunk_size, total_size - start)
+        delay = retry_delay
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay *= 2
+            try:
+                async with semaphore:
+                    data = await fetch_chunk(start, size)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[MediaDownloader] chunk {index + 1}/{chunks} failed (attempt {attempt + 1}): {e}")
+                continue
+            if data and len(data) == size:
+                view[start:start + size] = data
+                return
+            last_error = f"expected {size} bytes, got {len(data) if data else 0}"
+            logger.warning(f"[MediaDownloader] chunk {index + 1}/{chunks} incomplete (attempt {attempt + 1}): {last_error}")
+        raise ChunkDownloadError(f"chunk {index + 1}/{chunks} failed: {last_error}")
+
+    tasks = [asyncio.ensure_future(download(index)) for index in range(chunks)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        view.release()
+    return bytes(buffer)
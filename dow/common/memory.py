@@ -1,3 +1,3 @@
 from common.expired_dict import ExpiredDict
 
-USER_IMAGE_CACHE = ExpiredDict(60 * 3)
\ No newline at end of file
+USER_IMAGE_CACHE = ExpiredDict(60 * 3, max_size=1000)
\ No newline at end of file
@@ -1,7 +1,18 @@
-import heapq
+from bisect import bisect_left, insort
 
 
 class SortedDict(dict):
+    """按 sort_func(key, value) 排序的字典，遍历 keys/items 时按排序结果返回
+
+    内部维护一个按 (优先级, key) 升序排列的列表，插入、更新、删除时用二分查找定位，
+    排好序的 key 列表会被缓存，直到下一次修改。
+
+    Args:
+        sort_func: 计算排序优先级的函数，参数为 (key, value)
+        init_dict: 初始内容，dict 或 (key, value) 的序列
+        reverse (bool): 是否按优先级从大到小排列
+    """
+
     def __init__(self, sort_func=lambda k, v: k, init_dict=None, reverse=False):
         if init_dict is None:
             init_dict = []
@@ -10,53 +21,47 @@ class SortedDict(dict):
         self.sort_func = sort_func
         self.sorted_keys = None
         self.reverse = reverse
-        self.heap = []
+        self._entries = []  # (优先级, key)，升序
+        self._priorities = {}  # key -> 优先级
         for k, v in init_dict:
             self[k] = v
 
     def __setitem__(self, key, value):
-        if key in self:
-            super().__setitem__(key, value)
-            for i, (priority, k) in enumerate(self.heap):
-                if k == key:
-                    self.heap[i] = (self.sort_func(key, value), key)
-                    heapq.heapify(self.heap)
-                    break
-            self.sorted_keys = None
-        else:
-            super().__setitem__(key, value)
-            heapq.heappush(self.heap, (self.sort_func(key, value), key))
-            self.sorted_keys = None
+        super().__setitem__(key, value)
+        self._reposition(key, self.sort_func(key, value))
 
     def __delitem__(self, key):
         super().__delitem__(key)
-        for i, (priority, k) in enumerate(self.heap):
-            if k == key:
-                del self.heap[i]
-                heapq.heapify(self.heap)
-                break
+        self._remove_entry(key)
         self.sorted_keys = None
 
     def keys(self):
         if self.sorted_keys is None:
-            self.sorted_keys = [k for _, k in sorted(self.heap, reverse=self.reverse)]
+            keys = [k for _, k in self._entries]
+            if self.reverse:
+                keys.reverse()
+            self.sorted_keys = keys
         return self.sorted_keys
 
     def items(self):
-        if self.sorted_keys is None:
-            self.sorted_keys = [k for _, k in sorted(self.heap, reverse=self.reverse)]
-        sorted_items = [(k, self[k]) for k in self.sorted_keys]
-        return sorted_items
+        return [(k, self[k]) for k in self.keys()]
 
     def _update_heap(self, key):
-        for i, (priority, k) in enumerate(self.heap):
-            if k == key:
-                new_priority = self.sort_func(key, self[key])
-                if new_priority != priority:
-                    self.heap[i] = (new_priority, key)
-                    heapq.heapify(self.heap)
-                    self.sorted_keys = None
-                break
+        # value 被原地修改后调用，重新计算 key 的位置
+        self._reposition(key, self.sort_func(key, self[key]))
+
+    def _reposition(self, key, priority):
+        if key in self._priorities:
+            if self._priorities[key] == priority:
+                return
+            self._remove_entry(key)
+        self._priorities[key] = priority
+        insort(self._entries, (priority, key))
+        self.sorted_keys = None
+
+    def _remove_entry(self, key):
+        priority = self._priorities.pop(key)
+        del self._entries[bisect_left(self._entries, (priority, key))]
 
     def __iter__(self):
         return iter(self.keys())
@@ -62,6 +62,7 @@ available_setting = {
     "accept_friend_msg": "",  # 接受好友请求后发送的消息
     # chatgpt会话参数
     "expires_in_seconds": 3600,  # 无操作会话的过期时间
+    "max_sessions": 0,  # 最多保留的会话数，超过时淘汰最久无操作的会话，0表示不限制
     # 人格描述
     "character_desc": "你是ChatGPT, 一个由OpenAI训练的大型语言模型, 你旨在回答并解决人们的任何问题，并且可以使用多种语言与人交流。",
     "conversation_max_tokens": 1000,  # 支持上下文记忆的最多字符数
@@ -186,6 +187,7 @@ available_setting = {
     "wx849_api_host": "127.0.0.1",  # 微信849协议API地址
     "wx849_api_port": 9000,  # 微信849协议API端口
     "wx849_protocol_version": "849",  # 微信849协议版本，可选: "849", "855", "ipad"
+    "wx849_image_download_concurrency": 4,  # 图片分段下载的并发数，每段64KB
     "wx849_callback_host": "127.0.0.1",  # 微信849回调服务监听地址
     "wx849_callback_port": 8088,  # 微信849回调服务监听端口
     "wx849_callback_key": "",  # 微信849回调服务API密钥
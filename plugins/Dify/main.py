@@ -2371,15 +2371,15 @@ class Dify(PluginBase):
         wxid = message["SenderWxid"]
         if wxid in self.admins and self.admin_ignore:
             return True
-        elif self.db.get_whitelist(wxid) and self.whitelist_ignore:
+        elif await self.db.get_whitelist_async(wxid) and self.whitelist_ignore:
             return True
         else:
-            if self.db.get_points(wxid) < (model_config or self.current_model).price:
+            if await self.db.get_points_async(wxid) < (model_config or self.current_model).price:
                 await bot.send_text_message(message["FromWxid"],
                                             XYBOT_PREFIX +
                                             INSUFFICIENT_POINTS_MESSAGE.format(price=(model_config or self.current_model).price))
                 return False
-            self.db.add_points(wxid, -((model_config or self.current_model).price))
+            await self.db.add_points_async(wxid, -((model_config or self.current_model).price))
             return True
 
     async def audio_to_text(self, bot: WechatAPIClient, message: dict) -> str:
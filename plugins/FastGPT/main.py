@@ -302,8 +302,8 @@ class FastGPT(PluginBase):
                     await bot.send_at_message(from_wxid, f"\n{result_content}", [sender_wxid])
                     if self.price > 0:
                         if not (sender_wxid in self.admins and self.admin_ignore) and \
-                           not (self.db.get_whitelist(sender_wxid) and self.whitelist_ignore):
-                            self.db.add_points(sender_wxid, -self.price)
+                           not (await self.db.get_whitelist_async(sender_wxid) and self.whitelist_ignore):
+                            await self.db.add_points_async(sender_wxid, -self.price)
                             logger.info(f"Deducted {self.price} points from user {sender_wxid} for image analysis.")
                     
                     # 从缓存中移除被分析过的图片
@@ -366,8 +366,8 @@ class FastGPT(PluginBase):
                     await bot.send_text_message(from_wxid, result_content)
                 if self.price > 0:
                     if not (sender_wxid in self.admins and self.admin_ignore) and \
-                       not (self.db.get_whitelist(sender_wxid) and self.whitelist_ignore):
-                        self.db.add_points(sender_wxid, -self.price)
+                       not (await self.db.get_whitelist_async(sender_wxid) and self.whitelist_ignore):
+                        await self.db.add_points_async(sender_wxid, -self.price)
                         logger.info(f"Deducted {self.price} points from user {sender_wxid} for text query.")
             else:
                 logger.warning(f"FastGPT API call failed for text query. ChatId: {chat_id}")
@@ -499,8 +499,8 @@ class FastGPT(PluginBase):
                     await bot.send_text_message(from_wxid, result_content) # 私聊直接发送
                     if self.price > 0:
                         if not (sender_wxid in self.admins and self.admin_ignore) and \
-                           not (self.db.get_whitelist(sender_wxid) and self.whitelist_ignore):
-                            self.db.add_points(sender_wxid, -self.price)
+                           not (await self.db.get_whitelist_async(sender_wxid) and self.whitelist_ignore):
+                            await self.db.add_points_async(sender_wxid, -self.price)
                             logger.info(f"MsgId={msg_id}: Deducted {self.price} points from user {sender_wxid} for private image analysis.")
                 else:
                     logger.warning(f"MsgId={msg_id}: FastGPT API call for private image failed.")
@@ -7,6 +7,7 @@ from loguru import logger
 
 from WechatAPI import WechatAPIClient
 from utils.decorators import on_system_message
+from utils.group_roster import get_roster_cache
 from utils.plugin_base import PluginBase
 
 
@@ -105,49 +106,15 @@ class GroupWelcome(PluginBase):
                     # 获取用户头像
                     avatar_url = ""
                     try:
-                        # 使用群成员API获取头像
-                        import aiohttp
-                        import json
-
-                        # 构造请求参数
-                        json_param = {"QID": message["FromWxid"], "Wxid": bot.wxid}
-                        
-                        # 确定 API 基础路径
-                        api_base = f"http://{bot.ip}:{bot.port}"
-                        
-                        # 根据协议版本选择正确的 API 前缀
-                        api_prefix = "/api" if self.protocol_version != "849" else "/VXAPI"
-                        
-                        async with aiohttp.ClientSession() as session:
-                            response = await session.post(
-                                f"{api_base}{api_prefix}/Group/GetChatRoomMemberDetail",
-                                json=json_param,
-                                headers={"Content-Type": "application/json"}
-                            )
-
-                            # 检查响应状态
-                            if response.status == 200:
-                                json_resp = await response.json()
-                                
-                                if json_resp.get("Success"):
-                                    # 获取群成员列表
-                                    group_data = json_resp.get("Data", {})
-                                    
-                                    # 正确提取ChatRoomMember列表
-                                    if "NewChatroomData" in group_data and "ChatRoomMember" in group_data["NewChatroomData"]:
-                                        group_members = group_data["NewChatroomData"]["ChatRoomMember"]
-                                        
-                                        if isinstance(group_members, list) and group_members:
-                                            # 在群成员列表中查找指定成员
-                                            for member_data in group_members:
-                                                # 尝试多种可能的字段名
-                                                member_wxid = member_data.get("UserName") or member_data.get("Wxid") or member_data.get("wxid") or ""
-                                                
-                                                if member_wxid == wxid:
-                                                    # 获取头像地址
-                                                    avatar_url = member_data.get("BigHeadImgUrl") or member_data.get("SmallHeadImgUrl") or ""
-                                                    logger.info(f"成功获取到群成员 {nickname}({wxid}) 的头像地址")
-                                                    break
+                        # 从群成员名单缓存获取头像，新成员只有昵称时缓存会重新拉取一次名单
+                        roster_cache = get_roster_cache()
+                        if roster_cache is not None:
+                            member_data = await roster_cache.get_member(message["FromWxid"], wxid, complete=True)
+                            if member_data:
+                                avatar_url = (member_data.get("BigHeadImgUrl") or member_data.get("SmallHeadImgUrl")
+                                              or member_data.get("avatar") or "")
+                                if avatar_url:
+                                    logger.info(f"成功获取到群成员 {nickname}({wxid}) 的头像地址")
                     except Exception as e:
                         logger.warning(f"获取用户头像失败: {e}")
 
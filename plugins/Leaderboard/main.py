@@ -5,6 +5,7 @@ from random import choice
 from WechatAPI import WechatAPIClient
 from database.XYBotDB import XYBotDB
 from utils.decorators import *
+from utils.group_roster import get_roster_cache, member_wxid
 from utils.plugin_base import PluginBase
 
 
@@ -39,17 +40,20 @@ class Leaderboard(PluginBase):
             return
 
         if "群" in command[0]:
-            chatroom_members = await bot.get_chatroom_member_list(message["FromWxid"])
-            data = []
+            roster_cache = get_roster_cache()
+            if roster_cache is not None:
+                chatroom_members = await roster_cache.get_members(message["FromWxid"])
+            else:
+                chatroom_members = await bot.get_chatroom_member_list(message["FromWxid"])
+            nicknames = {}
             for member in chatroom_members:
-                wxid = member["UserName"]
-                points = self.db.get_points(wxid)
-                if points == 0:
-                    continue
-                data.append((member["NickName"], points))
+                wxid = member_wxid(member)
+                if wxid:
+                    nicknames[wxid] = member.get("NickName") or member.get("nickname") or wxid
 
-            data.sort(key=lambda x: x[1], reverse=True)
-            data = data[:self.max_count]
+            # 一次查询取出群成员中积分最高的前 max_count 名
+            ranked = await self.db.get_group_leaderboard_async(nicknames, self.max_count)
+            data = [(nicknames[wxid], points) for wxid, points in ranked]
 
             out_message = "-----XXXBot积分群排行榜-----"
             rank_emojis = ["👑", "🥈", "🥉"]
@@ -61,7 +65,7 @@ class Leaderboard(PluginBase):
                 out_message += f"\n{emoji}{'' if emoji else str(rank) + '.'} {nickname}   {points}分  {random_emoji}"
 
         else:
-            data = self.db.get_leaderboard(self.max_count)
+            data = await self.db.get_leaderboard_async(self.max_count)
 
             wxids = [i[0] for i in data]
             nicknames = []
@@ -578,17 +578,17 @@ class Reminder(PluginBase):
 
         if wxid in self.admins and self.admin_ignore:
             return True
-        elif self.db.get_whitelist(wxid) and self.whitelist_ignore:
+        elif await self.db.get_whitelist_async(wxid) and self.whitelist_ignore:
             return True
         else:
-            if self.db.get_points(wxid) < self.price:
+            if await self.db.get_points_async(wxid) < self.price:
                 error_msg = f"\n😭-----老夏的金库-----\n你的积分不够啦！需要 {self.price} 积分"
                 if is_group_chat:
                     await bot.send_at_message(chat_id, error_msg, [wxid])
                 else:
                     await bot.send_text_message(chat_id, error_msg)
                 return False
-            self.db.add_points(wxid, -self.price)
+            await self.db.add_points_async(wxid, -self.price)
             return True
 
     async def calculate_remind_time(self, reminder_type: str, reminder_time: str) -> Optional[datetime]:
@@ -41,6 +41,8 @@ class SignIn(PluginBase):
         # 每日签到排名数据
         self.today_signin_count = 0
         self.last_reset_date = datetime.now(tz=pytz.timezone(self.timezone)).date()
+        # 正在处理签到的用户
+        self._signing = set()
 
     def _check_and_reset_count(self):
         current_date = datetime.now(tz=pytz.timezone(self.timezone)).date()
@@ -48,7 +50,7 @@ class SignIn(PluginBase):
             self.today_signin_count = 0
             self.last_reset_date = current_date
 
-    @on_text_message
+    @on_text_message(commands=lambda self: self.command)
     async def handle_text(self, bot: WechatAPIClient, message: dict):
         if not self.enable:
             return
@@ -64,7 +66,17 @@ class SignIn(PluginBase):
 
         sign_wxid = message["SenderWxid"]
 
-        last_sign = self.db.get_signin_stat(sign_wxid)
+        # 同一用户的签到请求还在处理中时忽略重复的签到
+        if sign_wxid in self._signing:
+            return
+        self._signing.add(sign_wxid)
+        try:
+            await self._signin(bot, message, sign_wxid)
+        finally:
+            self._signing.discard(sign_wxid)
+
+    async def _signin(self, bot: WechatAPIClient, message: dict, sign_wxid: str):
+        last_sign = await self.db.get_signin_stat_async(sign_wxid)
         now = datetime.now(tz=pytz.timezone(self.timezone)).replace(hour=0, minute=0, second=0, microsecond=0)
 
         # 确保 last_sign 用了时区
@@ -78,21 +90,19 @@ class SignIn(PluginBase):
             return
 
         # 检查是否断开连续签到（超过1天没签到）
+        old_streak = await self.db.get_signin_streak_async(sign_wxid)
         if last_sign and (now - last_sign).days > 1:
-            old_streak = self.db.get_signin_streak(sign_wxid)
             streak = 1  # 重置连续签到天数
             streak_broken = True
         else:
-            old_streak = self.db.get_signin_streak(sign_wxid)
             streak = old_streak + 1 if old_streak else 1  # 如果是第一次签到，从1开始
             streak_broken = False
 
-        self.db.set_signin_stat(sign_wxid, now)
-        self.db.set_signin_streak(sign_wxid, streak)  # 设置连续签到天数
         streak_points = min(streak // self.streak_cycle, self.max_streak_point)  # 计算连续签到奖励
-
         signin_points = randint(self.min_points, self.max_points)  # 随机积分
-        self.db.add_points(sign_wxid, signin_points + streak_points)  # 增加积分
+
+        # 签到时间、连续签到天数和积分在一个事务中写入
+        await self.db.record_signin_async(sign_wxid, now, streak, signin_points + streak_points)
 
         # 增加签到计数并获取排名
         self.today_signin_count += 1
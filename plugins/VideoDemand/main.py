@@ -809,23 +809,18 @@ class VideoDemand(PluginBase):
                 except Exception as cleanup_error:
                     logger.warning(f"清理临时文件失败", exception=cleanup_error)
 
-    async def _encode_video(self, video_path: str) -> Optional[str]:
-        """将视频编码为base64
+    def _video_file(self, video_path: str) -> Optional[Path]:
+        """检查下载的视频文件，发送时由客户端按块读取并编码，不再在这里整体读入内存
         Returns:
-            str: base64编码后的视频数据,失败返回None
+            Path: 视频文件路径,文件不存在或为空时返回None
         """
         try:
-            # 读取文件并编码
-            with open(video_path, 'rb') as f:
-                video_data = f.read()
-
-            # 使用与VideoSender相同的编码方式
-            base64_data = base64.b64encode(video_data).decode('utf-8')
-            return base64_data
-
-        except Exception as e:
-            logger.error(f"视频编码失败: {video_path}", exception=e)
-            return None
+            if os.path.getsize(video_path) > 0:
+                return Path(video_path)
+            logger.error(f"视频文件为空: {video_path}")
+        except OSError as e:
+            logger.error(f"视频文件不可用: {video_path}", exception=e)
+        return None
 
     def _extract_first_frame(self, video_path: str) -> Optional[str]:
         """从视频中提取第一帧并转换为base64
@@ -1000,9 +995,9 @@ class VideoDemand(PluginBase):
                     await bot.send_text_message(roomid, "下载视频失败,请稍后重试")
                     return
 
-                # 编码视频数据
-                video_base64 = await self._encode_video(video_path)
-                if not video_base64:
+                # 检查视频文件
+                video_file = self._video_file(video_path)
+                if not video_file:
                     await bot.send_text_message(roomid, "处理视频失败,请稍后重试")
                     return
 
@@ -1043,7 +1038,7 @@ class VideoDemand(PluginBase):
                     logger.warning(f"获取视频时长失败: {video_path}", exception=e)
 
                 # 发送视频
-                logger.debug(f"视频 Base64 长度: {len(video_base64) if video_base64 else '无效'}")
+                logger.debug(f"视频文件大小: {video_file.stat().st_size / 1024:.2f}KB")
                 logger.debug(f"图片 Base64 长度: {len(cover_base64) if cover_base64 else '无效'}")
                 logger.info(f"使用外部提供的视频时长: {video_duration}秒")
 
@@ -1052,7 +1047,7 @@ class VideoDemand(PluginBase):
                     # 使用与VideoSender完全相同的参数格式
                     client_msg_id, new_msg_id = await bot.send_video_message(
                         roomid,
-                        video=video_base64,
+                        video=video_file,
                         image=cover_base64 or "None"  # 使用字符串"None"与VideoSender保持一致
                     )
                     logger.info(f"视频发送成功: client_msg_id={client_msg_id}, new_msg_id={new_msg_id}")
@@ -1144,9 +1139,9 @@ class VideoDemand(PluginBase):
                     await bot.send_text_message(roomid, "下载视频失败，请稍后重试")
                     return
 
-                # 编码视频数据
-                video_base64 = await self._encode_video(video_path)
-                if not video_base64:
+                # 检查视频文件
+                video_file = self._video_file(video_path)
+                if not video_file:
                     await bot.send_text_message(roomid, "处理视频失败，请稍后重试")
                     return
 
@@ -1178,7 +1173,7 @@ class VideoDemand(PluginBase):
                     logger.warning(f"获取随机视频时长失败: {e}")
 
                 # 发送视频
-                logger.debug(f"视频 Base64 长度: {len(video_base64) if video_base64 else '无效'}")
+                logger.debug(f"视频文件大小: {video_file.stat().st_size / 1024:.2f}KB")
                 logger.debug(f"图片 Base64 长度: {len(cover_base64) if cover_base64 else '无效'}")
                 logger.info(f"使用外部提供的视频时长: {video_duration}秒")
 
@@ -1187,7 +1182,7 @@ class VideoDemand(PluginBase):
                     # 使用与VideoSender完全相同的参数格式
                     client_msg_id, new_msg_id = await bot.send_video_message(
                         roomid,
-                        video=video_base64,
+                        video=video_file,
                         image=cover_base64 or "None"  # 使用字符串"None"与VideoSender保持一致
                     )
                     logger.info(f"视频发送成功: client_msg_id={client_msg_id}, new_msg_id={new_msg_id}")
@@ -1297,9 +1292,9 @@ class VideoDemand(PluginBase):
                     await bot.send_text_message(roomid, "获取视频失败，请确认链接有效")
                     return
 
-                # 编码视频数据
-                video_base64 = await self._encode_video(video_path)
-                if not video_base64:
+                # 检查视频文件
+                video_file = self._video_file(video_path)
+                if not video_file:
                     await bot.send_text_message(roomid, "处理视频失败，请稍后重试")
                     return
 
@@ -1331,7 +1326,7 @@ class VideoDemand(PluginBase):
                     logger.warning(f"获取URL视频时长失败: {e}")
 
                 # 发送视频
-                logger.debug(f"视频 Base64 长度: {len(video_base64) if video_base64 else '无效'}")
+                logger.debug(f"视频文件大小: {video_file.stat().st_size / 1024:.2f}KB")
                 logger.debug(f"图片 Base64 长度: {len(cover_base64) if cover_base64 else '无效'}")
                 logger.info(f"使用外部提供的视频时长: {video_duration}秒")
 
@@ -1340,7 +1335,7 @@ class VideoDemand(PluginBase):
                     # 使用与VideoSender完全相同的参数格式
                     client_msg_id, new_msg_id = await bot.send_video_message(
                         roomid,
-                        video=video_base64,
+                        video=video_file,
                         image=cover_base64 or "None"  # 使用字符串"None"与VideoSender保持一致
                     )
                     logger.info(f"视频发送成功: client_msg_id={client_msg_id}, new_msg_id={new_msg_id}")
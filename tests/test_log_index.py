@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from utils import log_index
+from utils.log_index import LogIndex, get_log_index
+
+
+def _line(number, level):
+    return f"2026-10-17 08:00:{number % 60:02d} | {level:<8} | 第{number}行\n"
+
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "xybot.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, text, mode="a"):
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(text)
+
+    def test_page_cursor_with_level_across_blocks(self):
+        """按级别向前翻页，跨越多次向前索引时游标连续且不重复"""
+        levels = ["INFO", "ERROR", "DEBUG", "INFO", "WARNING"]
+        self._write("".join(_line(i, levels[i % len(levels)]) for i in range(300)), "w")
+        index = LogIndex(self.path, block_size=256)
+
+        errors, cursor, pages = [], None, 0
+        while True:
+            lines, cursor = index.page(before=cursor, limit=7, level="error")
+            errors[:0] = [line.text for line in lines]
+            pages += 1
+            if cursor is None:
+                break
+        expected = [_line(i, "ERROR").rstrip("\n") for i in range(300) if i % len(levels) == 1]
+        self.assertEqual(errors, expected)
+        self.assertEqual(pages, -(-len(expected) // 7))
+
+        everything, cursor = [], None
+        while True:
+            lines, cursor = index.page(before=cursor, limit=50)
+            everything[:0] = lines
+            if cursor is None:
+                break
+        self.assertEqual([line.offset for line in everything], sorted({line.offset for line in everything}))
+        self.assertEqual(len(everything), 300)
+        self.assertEqual(everything[1].level_name, "error")
+
+    def test_partial_trailing_line(self):
+        """没有换行结尾的最后一行在写完之前不返回"""
+        self._write(_line(1, "INFO") + _line(2, "INFO") + "2026-10-17 08:00:03 | INFO     | 未写完", "w")
+        index = LogIndex(self.path)
+        self.assertEqual([line.text[-3:] for line in index.tail(10)], ["第1行", "第2行"])
+        end = index.end
+
+        self._write("的行\n")
+        lines, cursor = index.since(end)
+        self.assertEqual([line.text[-5:] for line in lines], ["未写完的行"])
+        self.assertEqual(cursor, os.path.getsize(self.path))
+
+    def test_truncate_and_replace_bump_generation(self):
+        """文件被截断或替换后 generation 加一，从新文件开头索引"""
+        self._write(_line(1, "INFO") + _line(2, "ERROR"), "w")
+        index = LogIndex(self.path)
+        index.refresh()
+        self._write(_line(3, "INFO"))
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.generation, 0)
+
+        self._write(_line(4, "WARNING"), "w")
+        index.refresh()
+        self.assertEqual(index.generation, 1)
+        lines, _ = index.since(0)
+        self.assertEqual([line.level_name for line in lines], ["warning"])
+
+        replacement = self.path + ".new"
+        with open(replacement, "w", encoding="utf-8") as f:
+            f.write(_line(5, "DEBUG") + _line(6, "DEBUG") + _line(7, "DEBUG"))
+        os.replace(replacement, self.path)
+        lines, cursor = index.since(0)
+        self.assertEqual(index.generation, 2)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(cursor, os.path.getsize(self.path))
+
+    def test_shared_indexes_keep_recently_used(self):
+        """共享索引按最近使用淘汰，经常访问的文件不会被挤出"""
+        log_index._indexes.clear()
+        paths = [os.path.join(self._tmp.name, f"{day}.log") for day in range(10)]
+        first = get_log_index(paths[0])
+        for path in paths[1:8]:
+            get_log_index(path)
+        self.assertIs(get_log_index(paths[0]), first)
+        get_log_index(paths[8])
+        get_log_index(paths[9])
+
+        self.assertIs(get_log_index(paths[0]), first)
+        self.assertNotIn(os.path.abspath(paths[1]), log_index._indexes)
+        self.assertNotIn(os.path.abspath(paths[2]), log_index._indexes)
+        log_index._indexes.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
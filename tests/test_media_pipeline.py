@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import unittest
+
+from WechatAPI.media_pipeline import MediaPipeline
+
+
+class TestMediaPipeline(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pipeline = MediaPipeline(workers=0)
+        self.release = threading.Event()
+        self.calls = 0
+
+    async def asyncTearDown(self):
+        self.release.set()
+        if self.pipeline._threads is not None:
+            self.pipeline._threads.shutdown(wait=True)
+
+    def _job(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        return value, 1000
+
+    async def test_shared_job_survives_cancelled_waiter(self):
+        """同一个任务的某个调用方超时取消时，其他调用方仍然得到结果"""
+        # 占满线程池，让共享任务排队等待
+        busy = [self.pipeline._submit(self.release.wait, 5) for _ in range(2)]
+        impatient = asyncio.create_task(asyncio.wait_for(self.pipeline._run(("voice", "k"), self._job, "ok"), 0.05))
+        patient = asyncio.create_task(self.pipeline._run(("voice", "k"), self._job, "ok"))
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await impatient
+        self.release.set()
+        self.assertEqual(await asyncio.wait_for(patient, 5), ("ok", 1000))
+        self.assertTrue(all(future.result() for future in busy))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(await self.pipeline._run(("voice", "k"), self._job, "ok"), ("ok", 1000))
+        stats = self.pipeline.stats()
+        self.assertEqual((stats["misses"], stats["hits"], stats["failures"]), (1, 1, 0))
+
+    async def test_failure_not_cached(self):
+        """处理失败时不缓存，下次重新处理"""
+        self.release.set()
+
+        def fail():
+            self.calls += 1
+            raise ValueError("转码失败")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                await self.pipeline._run(("voice", "bad"), fail)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.pipeline.stats()["failures"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from utils.message_dispatcher import (MessageDispatcher, OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST,
+                                      OVERFLOW_DROP_OLDEST)
+
+
+def _message(msg_id, from_wxid="wxid_a"):
+    return {"MsgId": msg_id, "FromUserName": {"string": from_wxid}, "ToUserName": {"string": "wxid_bot"}}
+
+
+class TestMessageDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.handled = []
+
+    async def _handle(self, message):
+        self.handled.append(message["MsgId"])
+
+    async def _drain(self, dispatcher, count):
+        async def wait():
+            while dispatcher.processed < count:
+                await asyncio.sleep(0.001)
+        await asyncio.wait_for(wait(), 1)
+        await dispatcher.stop()
+
+    async def test_drop_newest(self):
+        """队列满时丢弃新到的消息"""
+        dispatcher = MessageDispatcher(self._handle, workers=2, queue_size=2, overflow=OVERFLOW_DROP_NEWEST)
+        for msg_id in (1, 2, 3):
+            await dispatcher.put(_message(msg_id))
+        self.assertEqual(dispatcher.depth, 2)
+        self.assertEqual((dispatcher.dropped, dispatcher.overflowed), (1, 1))
+
+        dispatcher.start()
+        await self._drain(dispatcher, 2)
+        self.assertEqual(self.handled, [1, 2])
+
+    async def test_drop_oldest_same_conversation(self):
+        """队列满时丢弃同一会话中最早的待处理消息"""
+        dispatcher = MessageDispatcher(self._handle, workers=2, queue_size=2, overflow=OVERFLOW_DROP_OLDEST)
+        for msg_id in (1, 2, 3):
+            await dispatcher.put(_message(msg_id))
+        self.assertEqual(dispatcher.depth, 2)
+        self.assertEqual(dispatcher.dropped, 1)
+
+        dispatcher.start()
+        await self._drain(dispatcher, 2)
+        self.assertEqual(self.handled, [2, 3])
+
+    async def test_drop_oldest_longest_conversation(self):
+        """新会话的消息挤掉最长会话中最早的消息"""
+        dispatcher = MessageDispatcher(self._handle, workers=1, queue_size=3, overflow=OVERFLOW_DROP_OLDEST)
+        await dispatcher.put(_message(1, "wxid_a"))
+        await dispatcher.put(_message(2, "wxid_a"))
+        await dispatcher.put(_message(3, "wxid_b"))
+        await dispatcher.put(_message(4, "wxid_c"))
+
+        dispatcher.start()
+        await self._drain(dispatcher, 3)
+        self.assertEqual(sorted(self.handled), [2, 3, 4])
+
+    async def test_block_waits_for_space(self):
+        """队列满时 put 等待 worker 取走消息"""
+        dispatcher = MessageDispatcher(self._handle, workers=1, queue_size=1, overflow=OVERFLOW_BLOCK)
+        await dispatcher.put(_message(1))
+        blocked = asyncio.create_task(dispatcher.put(_message(2)))
+        await asyncio.sleep(0.02)
+        self.assertFalse(blocked.done())
+        self.assertEqual(dispatcher.dropped, 0)
+
+        dispatcher.start()
+        await asyncio.wait_for(blocked, 1)
+        await self._drain(dispatcher, 2)
+        self.assertEqual(self.handled, [1, 2])
+
+    async def test_conversation_order_with_parallel_workers(self):
+        """同一会话的消息按提交顺序处理，不同会话并行处理"""
+        active = {}
+
+        async def handle(message):
+            key = message["FromUserName"]["string"]
+            self.assertFalse(active.get(key))
+            active[key] = True
+            await asyncio.sleep(0.001)
+            active[key] = False
+            self.handled.append(message["MsgId"])
+
+        dispatcher = MessageDispatcher(handle, workers=4, queue_size=100)
+        dispatcher.start()
+        for msg_id in range(20):
+            await dispatcher.put(_message(msg_id, f"wxid_{msg_id % 3}"))
+        await self._drain(dispatcher, 20)
+
+        self.assertEqual(dispatcher.failed, 0)
+        for conversation in range(3):
+            order = [msg_id for msg_id in self.handled if msg_id % 3 == conversation]
+            self.assertEqual(order, sorted(order))
+
+
+if __name__ == "__main__":
+    unittest.main()
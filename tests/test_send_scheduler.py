@@ -0,0 +1,126 @@
+import asyncio
+import time
+import unittest
+
+from WechatAPI.send_scheduler import LANE_BROADCAST, SendScheduler, TokenBucket, send_lane
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_delay_until_refill(self):
+        """令牌用完后按补充速率计算等待时间"""
+        bucket = TokenBucket(rate=2, burst=2)
+        now = bucket.updated
+        self.assertEqual(bucket.delay(now), 0)
+        bucket.consume(now)
+        bucket.consume(now)
+        self.assertAlmostEqual(bucket.delay(now), 0.5)
+        self.assertAlmostEqual(bucket.delay(now + 0.25), 0.25)
+        self.assertEqual(bucket.delay(now + 0.5), 0)
+        self.assertFalse(bucket.is_full(now + 0.5))
+        self.assertTrue(bucket.is_full(now + 1))
+
+    def test_unlimited(self):
+        """速率不大于0时不限制"""
+        bucket = TokenBucket(rate=0, burst=1)
+        for _ in range(10):
+            bucket.consume(bucket.updated)
+        self.assertEqual(bucket.delay(bucket.updated), 0)
+
+
+class TestSendScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+
+    async def asyncTearDown(self):
+        if self.scheduler._task:
+            self.scheduler._task.cancel()
+            await asyncio.gather(self.scheduler._task, return_exceptions=True)
+
+    async def _send(self, wxid, content, delay=0.0, gate=None):
+        if gate is not None:
+            await gate.wait()
+        await asyncio.sleep(delay)
+        self.sent.append((wxid, content, time.monotonic()))
+        return content
+
+    async def test_fifo_per_recipient(self):
+        """同一接收方按提交顺序逐条发送，不同接收方并行发送"""
+        self.scheduler = SendScheduler(rate=0, global_rate=0)
+        sending = {}
+
+        async def send(wxid, content):
+            self.assertFalse(sending.get(wxid))
+            sending[wxid] = True
+            await asyncio.sleep(0.003 if content % 2 else 0.001)
+            sending[wxid] = False
+            self.sent.append((wxid, content))
+            return content
+
+        results = await asyncio.gather(*(self.scheduler.submit(f"wxid_{i % 3}", send, f"wxid_{i % 3}", i)
+                                         for i in range(30)))
+        self.assertEqual(results, list(range(30)))
+        for recipient in range(3):
+            order = [content for wxid, content in self.sent if wxid == f"wxid_{recipient}"]
+            self.assertEqual(order, list(range(recipient, 30, 3)))
+
+    async def test_interactive_overtakes_broadcast(self):
+        """同一接收方排队中的群发消息让交互回复先发"""
+        self.scheduler = SendScheduler(rate=0, global_rate=0)
+        gate = asyncio.Event()
+        first = asyncio.create_task(self.scheduler.submit("wxid_a", self._send, "wxid_a", "first", gate=gate))
+        await asyncio.sleep(0.01)
+        with send_lane(LANE_BROADCAST):
+            broadcasts = [asyncio.create_task(self.scheduler.submit("wxid_a", self._send, "wxid_a", f"broadcast{i}"))
+                          for i in range(3)]
+        await asyncio.sleep(0.01)
+        reply = asyncio.create_task(self.scheduler.submit("wxid_a", self._send, "wxid_a", "reply"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.scheduler.stats()["lanes"][LANE_BROADCAST]["depth"], 3)
+
+        gate.set()
+        await asyncio.gather(first, reply, *broadcasts)
+        self.assertEqual([content for _, content, _ in self.sent],
+                         ["first", "reply", "broadcast0", "broadcast1", "broadcast2"])
+
+    async def test_interactive_lane_first_across_recipients(self):
+        """全局限速时，不同接收方中交互通道的消息先发"""
+        self.scheduler = SendScheduler(rate=0, global_rate=20, global_burst=1)
+        with send_lane(LANE_BROADCAST):
+            broadcasts = [asyncio.create_task(self.scheduler.submit(f"room_{i}", self._send, f"room_{i}", "broadcast"))
+                          for i in range(3)]
+        await asyncio.sleep(0)
+        reply = asyncio.create_task(self.scheduler.submit("wxid_a", self._send, "wxid_a", "reply"))
+        await asyncio.gather(reply, *broadcasts)
+        # 第一条群发使用了桶里唯一的令牌，之后第一个发出的是交互回复
+        self.assertEqual([content for _, content, _ in self.sent][:2], ["broadcast", "reply"])
+
+    async def test_token_bucket_delays_recipient(self):
+        """每个接收方的发送间隔不小于 1/rate，其他接收方不受影响"""
+        self.scheduler = SendScheduler(rate=20, burst=1, global_rate=0)
+        start = time.monotonic()
+        await asyncio.gather(*(self.scheduler.submit("wxid_a", self._send, "wxid_a", i) for i in range(4)),
+                             self.scheduler.submit("wxid_b", self._send, "wxid_b", "other"))
+
+        times = [sent_at for wxid, _, sent_at in self.sent if wxid == "wxid_a"]
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        self.assertTrue(all(gap >= 0.045 for gap in gaps), gaps)
+        other = next(sent_at for wxid, _, sent_at in self.sent if wxid == "wxid_b")
+        self.assertLess(other - start, 0.04)
+
+    async def test_failure_is_returned_to_caller(self):
+        """发送失败时异常抛给提交的一方，不影响后面的消息"""
+        self.scheduler = SendScheduler(rate=0, global_rate=0)
+
+        async def fail():
+            raise RuntimeError("发送失败")
+
+        failed = asyncio.create_task(self.scheduler.submit("wxid_a", fail))
+        ok = asyncio.create_task(self.scheduler.submit("wxid_a", self._send, "wxid_a", "ok"))
+        with self.assertRaises(RuntimeError):
+            await failed
+        self.assertEqual(await ok, "ok")
+        self.assertEqual(self.scheduler.stats()["lanes"]["interactive"]["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
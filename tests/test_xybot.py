@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from utils import config_service
+from utils.xybot import XYBot
+
+MAIN_CONFIG = """
+[XYBot]
+msgDB-url = "sqlite+aiosqlite:///message.db"
+contact-refresh-window = 300
+contact-refresh-rate = 5.0
+"""
+
+
+class StubClient:
+    """只提供 XYBot 构造时用到的方法"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text_message(self, to_wxid, content, at_list=None):
+        self.sent.append((to_wxid, content))
+
+
+class TestXYBotInit(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        with open("main_config.toml", "w", encoding="utf-8") as f:
+            f.write(MAIN_CONFIG)
+        config_service._service = None
+
+    def tearDown(self):
+        service = config_service._service
+        if service is not None:
+            service.stop()
+        config_service._service = None
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_construct_with_stub_client(self):
+        """用桩客户端创建 XYBot，联系人刷新器使用同一个客户端"""
+        client = StubClient()
+        xybot = XYBot(client)
+
+        self.assertIs(xybot.bot, client)
+        self.assertIs(xybot.contact_refresher.bot, client)
+        self.assertEqual(xybot.contact_refresher.stale_after, 300)
+        self.assertAlmostEqual(xybot.contact_refresher.min_interval, 0.2)
+        self.assertIsNone(xybot.dispatcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
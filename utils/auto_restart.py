@@ -12,6 +12,7 @@ from loguru import logger
 # 导入重启函数
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from admin.restart_api import restart_system
+from utils.log_index import get_log_index
 from utils.notification_service import get_notification_service
 
 class AutoRestartMonitor:
@@ -242,85 +243,82 @@ class AutoRestartMonitor:
                         # 如果找到了日志文件
                         if latest_log_file and latest_log_file.exists():
                             logger.debug(f"检查最新的日志文件: {latest_log_file}")
-                            # 检查最近的日志条目
-                            with open(latest_log_file, "r", encoding="utf-8", errors="ignore") as f:
-                                # 读取最后1000行日志
-                                lines = f.readlines()
-                                if len(lines) > 1000:
-                                    lines = lines[-1000:]
-
-                                # 记录本次检查中发现的新失败数
-                                new_failures_this_check = 0
-
-                                # 检查最近的日志中是否有“获取新消息失败”的记录
-                                for line in reversed(lines):
-                                    # 如果找到“获取新消息失败”的记录
-                                    if "获取新消息失败" in line:
-                                        # 计算日志行的哈希值，用于唯一标识
-                                        line_hash = hash(line.strip())
-
-                                        # 如果这一行已经处理过，则跳过
-                                        if line_hash in self.processed_log_hashes:
-                                            continue
-
-                                        # 提取时间戳
-                                        try:
-                                            # XYBot 日志格式可能是多种的，尝试不同的格式
-                                            # 尝试格式 1: "YYYY-MM-DD HH:MM:SS | LEVEL | 消息内容"
-                                            if " | " in line:
-                                                timestamp_str = line.split(" | ")[0]
-                                                try:
-                                                    log_time = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                                                except ValueError:
-                                                    # 尝试其他格式
-                                                    raise
-                                            # 尝试格式 2: 其他可能的格式
-                                            else:
-                                                # 如果没有找到时间戳，使用文件修改时间
-                                                log_time = datetime.fromtimestamp(latest_mtime)
-                                            log_timestamp = log_time.timestamp()
-
-                                            # 检查这条日志是否在最近的离线阈值时间内
-                                            if current_time - log_timestamp < self.offline_threshold:
-                                                # 检查是否是上次检查之后的新日志
-                                                if log_timestamp > last_check_time:
-                                                    # 将这一行添加到已处理集合
-                                                    self.processed_log_hashes.add(line_hash)
-
-                                                    # 更新最后失败时间
-                                                    self.last_failure_time = log_timestamp
-                                                    # 增加失败计数
-                                                    self.failure_count += 1
-                                                    new_failures_this_check += 1
-                                                    logger.warning(f"检测到新的'获取新消息失败'记录，当前失败计数: {self.failure_count}/{self.failure_count_threshold}")
-
-                                                    # 如果达到失败阈值，标记为掉线
-                                                    if self.failure_count >= self.failure_count_threshold:
-                                                        has_offline_trace = True
-                                                        logger.warning(f"连续检测到 {self.failure_count} 次'获取新消息失败'，超过阈值 {self.failure_count_threshold}，判断为掉线状态")
-                                                        # 重置失败计数器，防止重复触发
-                                                        self.failure_count = 0
-                                                        # 立即跳出循环，不再检查其他日志
-                                                        break
-                                                else:
-                                                    # 将这一行添加到已处理集合，但不增加计数
-                                                    self.processed_log_hashes.add(line_hash)
-
-                                                # 如果已经达到阈值，则跳出循环
-                                                if has_offline_trace:
+                            # 检查最近的日志条目，从日志末尾按块读取最后1000行，不需要读入整个文件
+                            log_index = get_log_index(str(latest_log_file))
+                            lines = [line.text for line in await asyncio.to_thread(log_index.tail, 1000)]
+
+                            # 记录本次检查中发现的新失败数
+                            new_failures_this_check = 0
+
+                            # 检查最近的日志中是否有“获取新消息失败”的记录
+                            for line in reversed(lines):
+                                # 如果找到“获取新消息失败”的记录
+                                if "获取新消息失败" in line:
+                                    # 计算日志行的哈希值，用于唯一标识
+                                    line_hash = hash(line.strip())
+
+                                    # 如果这一行已经处理过，则跳过
+                                    if line_hash in self.processed_log_hashes:
+                                        continue
+
+                                    # 提取时间戳
+                                    try:
+                                        # XYBot 日志格式可能是多种的，尝试不同的格式
+                                        # 尝试格式 1: "YYYY-MM-DD HH:MM:SS | LEVEL | 消息内容"
+                                        if " | " in line:
+                                            timestamp_str = line.split(" | ")[0]
+                                            try:
+                                                log_time = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+                                            except ValueError:
+                                                # 尝试其他格式
+                                                raise
+                                        # 尝试格式 2: 其他可能的格式
+                                        else:
+                                            # 如果没有找到时间戳，使用文件修改时间
+                                            log_time = datetime.fromtimestamp(latest_mtime)
+                                        log_timestamp = log_time.timestamp()
+
+                                        # 检查这条日志是否在最近的离线阈值时间内
+                                        if current_time - log_timestamp < self.offline_threshold:
+                                            # 检查是否是上次检查之后的新日志
+                                            if log_timestamp > last_check_time:
+                                                # 将这一行添加到已处理集合
+                                                self.processed_log_hashes.add(line_hash)
+
+                                                # 更新最后失败时间
+                                                self.last_failure_time = log_timestamp
+                                                # 增加失败计数
+                                                self.failure_count += 1
+                                                new_failures_this_check += 1
+                                                logger.warning(f"检测到新的'获取新消息失败'记录，当前失败计数: {self.failure_count}/{self.failure_count_threshold}")
+
+                                                # 如果达到失败阈值，标记为掉线
+                                                if self.failure_count >= self.failure_count_threshold:
+                                                    has_offline_trace = True
+                                                    logger.warning(f"连续检测到 {self.failure_count} 次'获取新消息失败'，超过阈值 {self.failure_count_threshold}，判断为掉线状态")
+                                                    # 重置失败计数器，防止重复触发
+                                                    self.failure_count = 0
+                                                    # 立即跳出循环，不再检查其他日志
                                                     break
-                                        except Exception as e:
-                                            logger.error(f"解析日志时间戳失败: {e}")
-
-                                # 如果本次检查没有发现新的失败，则更新最后失败时间
-                                if new_failures_this_check == 0 and self.failure_count > 0:
-                                    logger.debug(f"本次检查没有发现新的失败记录，当前失败计数保持为: {self.failure_count}")
-
-                                # 定期清理已处理的日志行集合，防止内存泄漏
-                                if len(self.processed_log_hashes) > 10000:  # 如果超过一定数量，清理旧的哈希
-                                    logger.info(f"清理已处理的日志行哈希集合，当前大小: {len(self.processed_log_hashes)}")
-                                    self.processed_log_hashes = set()
-                                    logger.info("已清理已处理的日志行哈希集合")
+                                            else:
+                                                # 将这一行添加到已处理集合，但不增加计数
+                                                self.processed_log_hashes.add(line_hash)
+
+                                            # 如果已经达到阈值，则跳出循环
+                                            if has_offline_trace:
+                                                break
+                                    except Exception as e:
+                                        logger.error(f"解析日志时间戳失败: {e}")
+
+                            # 如果本次检查没有发现新的失败，则更新最后失败时间
+                            if new_failures_this_check == 0 and self.failure_count > 0:
+                                logger.debug(f"本次检查没有发现新的失败记录，当前失败计数保持为: {self.failure_count}")
+
+                            # 定期清理已处理的日志行集合，防止内存泄漏
+                            if len(self.processed_log_hashes) > 10000:  # 如果超过一定数量，清理旧的哈希
+                                logger.info(f"清理已处理的日志行哈希集合，当前大小: {len(self.processed_log_hashes)}")
+                                self.processed_log_hashes = set()
+                                logger.info("已清理已处理的日志行哈希集合")
                     except Exception as e:
                         logger.error(f"检查系统日志时出错: {e}")
 
@@ -0,0 +1,204 @@
+"""
+主配置服务
+main_config.toml 只解析一次，生成只读快照供各模块读取；后台线程监测文件的修改时间和大小，
+文件变化后重新解析并整体替换快照，再通知订阅了相应配置段的回调。
+热路径上只需读取快照中的字段，不再每次打开文件、解析 TOML
+"""
+
+import os
+import threading
+import tomllib
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from utils.message_view import FrozenDict, freeze
+
+CONFIG_PATH = "main_config.toml"
+
+Subscriber = Callable[[FrozenDict, Set[str]], Any]
+
+
+class ConfigService:
+    """主配置快照服务
+
+    快照是只读的 FrozenDict，需要修改时请先 copy.deepcopy 一份。
+    解析失败时保留上一份快照，不会把配置替换为空。
+
+    Args:
+        path (str): 配置文件路径
+        poll_interval (float): 检查文件变化的间隔(秒)，小于等于0时不启动后台线程
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, poll_interval: float = 2.0):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+
+        self._snapshot: FrozenDict = FrozenDict()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Subscriber, Optional[frozenset]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.version = 0
+        self.reloads = 0
+        self.errors = 0
+
+        self.reload()
+        if poll_interval > 0:
+            self.start()
+
+    def snapshot(self) -> FrozenDict:
+        """获取当前配置快照"""
+        return self._snapshot
+
+    def section(self, name: str) -> FrozenDict:
+        """获取某个配置段，不存在时返回空的只读字典"""
+        value = self._snapshot.get(name)
+        return value if isinstance(value, dict) else _EMPTY
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        """读取某个配置段中的配置项"""
+        return self.section(section).get(key, default)
+
+    def reload(self, force: bool = False) -> bool:
+        """重新解析配置文件
+
+        Args:
+            force (bool): 文件修改时间和大小没有变化时也重新解析
+
+        Returns:
+            bool: 快照是否发生了变化
+        """
+        with self._lock:
+            signature = self._stat()
+            if not force and signature == self._signature:
+                return False
+            if signature is None:
+                if self._signature is not None:
+                    logger.warning(f"配置文件 {self.path} 不存在，继续使用上一次的配置")
+                self._signature = None
+                return False
+
+            try:
+                with open(self.path, "rb") as f:
+                    snapshot = freeze(tomllib.load(f))
+            except Exception as e:
+                self.errors += 1
+                # 文件可能正在写入，记录签名避免反复报错，下次文件变化时再解析
+                self._signature = signature
+                logger.error(f"解析配置文件 {self.path} 失败，继续使用上一次的配置: {e}")
+                return False
+
+            self._signature = signature
+            old = self._snapshot
+            changed = _changed_sections(old, snapshot)
+            if not changed and self.version:
+                return False
+            self._snapshot = snapshot
+            self.version += 1
+            if self.version > 1:
+                self.reloads += 1
+                logger.info(f"配置文件已重新加载，变化的配置段: {sorted(changed)}")
+            subscribers = list(self._subscribers)
+
+        if self.version > 1:
+            self._notify(subscribers, snapshot, changed)
+        return True
+
+    def subscribe(self, callback: Subscriber, sections: Optional[Iterable[str]] = None) -> Subscriber:
+        """订阅配置变化
+
+        Args:
+            callback: 回调函数，参数为 (新快照, 变化的配置段名集合)，在检测线程中调用
+            sections: 只关心的配置段，为 None 时任何变化都会通知
+
+        Returns:
+            传入的 callback，便于之后取消订阅
+        """
+        with self._lock:
+            self._subscribers.append((callback, frozenset(sections) if sections is not None else None))
+        return callback
+
+    def unsubscribe(self, callback: Subscriber):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers = [(cb, sections) for cb, sections in self._subscribers if cb is not callback]
+
+    def start(self):
+        """启动后台检测线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台检测线程"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def stats(self) -> dict:
+        """获取配置服务统计信息"""
+        return {
+            "path": self.path,
+            "version": self.version,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "subscribers": len(self._subscribers),
+        }
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"检查配置文件变化失败: {e}")
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _notify(subscribers, snapshot: FrozenDict, changed: Set[str]):
+        for callback, sections in subscribers:
+            if sections is not None and not (sections & changed):
+                continue
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                logger.error(f"配置变化回调 {getattr(callback, '__qualname__', callback)} 执行失败: {e}")
+
+
+_EMPTY = FrozenDict()
+
+
+def _changed_sections(old: dict, new: dict) -> Set[str]:
+    """比较两份配置，返回发生变化的顶层键"""
+    return {key for key in old.keys() | new.keys() if old.get(key, _EMPTY) != new.get(key, _EMPTY)}
+
+
+_service: Optional[ConfigService] = None
+_service_lock = threading.Lock()
+
+
+def get_config_service() -> ConfigService:
+    """获取主配置服务，首次调用时以当前工作目录下的 main_config.toml 创建"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ConfigService()
+    return _service
+
+
+def get_config() -> FrozenDict:
+    """获取主配置的当前快照"""
+    return get_config_service().snapshot()
@@ -0,0 +1,231 @@
+"""
+联系人信息刷新
+收到消息时不再为每条消息创建一个刷新任务，而是把发送者放入待刷新队列：
+同一 wxid 在刷新窗口内只处理一次，待刷新的 wxid 合并后批量调用联系人详情接口，
+接口调用受全局速率限制
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from database.contacts_store import LRUCache, get_store
+
+# 联系人详情接口一次最多查询的数量
+MAX_BATCH_SIZE = 20
+
+
+class ContactRefresher:
+    """联系人刷新调度器
+
+    Args:
+        bot: WechatAPI客户端
+        stale_after (float): 刷新窗口(秒)，窗口内重复的刷新请求直接跳过
+        batch_size (int): 每次调用联系人详情接口查询的最大数量
+        rate (float): 每秒最多调用联系人详情接口的次数
+        batch_delay (float): 收到刷新请求后等待合并的时间(秒)
+        max_tracked (int): 最多记录的已刷新 wxid 数量
+    """
+
+    def __init__(self, bot, stale_after: float = 600, batch_size: int = MAX_BATCH_SIZE,
+                 rate: float = 2.0, batch_delay: float = 0.5, max_tracked: int = 20000):
+        self.bot = bot
+        self.stale_after = stale_after
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.batch_delay = batch_delay
+
+        self._recent = LRUCache(max_tracked, stale_after)
+        self._pending: OrderedDict = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_call = 0.0
+
+        # 统计信息
+        self.requested = 0
+        self.fresh_hits = 0
+        self.coalesced = 0
+        self.complete_in_db = 0
+        self.refreshed = 0
+        self.api_calls = 0
+        self.api_errors = 0
+
+    def request(self, wxid: str) -> bool:
+        """请求刷新联系人信息，不等待刷新完成
+
+        Returns:
+            bool: 是否加入了待刷新队列
+        """
+        if not wxid:
+            return False
+        self.requested += 1
+        if self._recent.get(wxid):
+            self.fresh_hits += 1
+            return False
+        if wxid in self._pending:
+            self.coalesced += 1
+            return False
+
+        self._pending[wxid] = None
+        self._ensure_worker()
+        self._wakeup.set()
+        return True
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                pass
+
+    async def stop(self):
+        """停止后台刷新任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # 等待一小段时间，合并同一时间段内的刷新请求
+            await asyncio.sleep(self.batch_delay)
+
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popitem(last=False)[0])
+                try:
+                    await self.refresh(batch)
+                except Exception as e:
+                    logger.error(f"批量刷新联系人信息失败: {e}")
+            self._wakeup.clear()
+
+    async def refresh(self, wxids: Iterable[str]):
+        """立即刷新一批联系人
+
+        数据库中已有完整信息（有昵称）的联系人不调用接口；群聊只保存基本信息。
+        """
+        store = get_store()
+        contacts = []
+        to_fetch = []
+        for wxid in wxids:
+            self._recent.set(wxid, True)
+            existing = await store.get_contact_async(wxid)
+            if existing and existing.get("nickname"):
+                self.complete_in_db += 1
+                continue
+            if wxid.endswith("@chatroom"):
+                # 群聊不获取详细信息
+                contacts.append({"wxid": wxid, "nickname": wxid, "type": "group"})
+            else:
+                to_fetch.append(wxid)
+
+        if to_fetch:
+            contacts.extend(await self._fetch_details(to_fetch))
+
+        if contacts:
+            await store.upsert_contacts_async(contacts)
+            self.refreshed += len(contacts)
+            logger.debug(f"已更新 {len(contacts)} 个联系人的信息")
+
+    async def _fetch_details(self, wxids: List[str]) -> List[Dict[str, Any]]:
+        await self._throttle()
+        self.api_calls += 1
+        try:
+            details = await self.bot.get_contract_detail(wxids if len(wxids) > 1 else wxids[0])
+        except Exception as e:
+            self.api_errors += 1
+            logger.error(f"调用API获取联系人 {','.join(wxids)} 详情失败: {str(e)}")
+            details = None
+
+        if isinstance(details, dict):
+            details = [details]
+        if not isinstance(details, list):
+            details = []
+
+        # 按 UserName 对应返回结果，没有 UserName 时按顺序对应
+        by_wxid = {}
+        for index, item in enumerate(details):
+            if not isinstance(item, dict):
+                continue
+            wxid = _string_of(item.get("UserName")) or _string_of(item.get("Username"))
+            if not wxid and len(details) == len(wxids):
+                wxid = wxids[index]
+            if wxid:
+                by_wxid[wxid] = item
+
+        contacts = []
+        for wxid in wxids:
+            item = by_wxid.get(wxid)
+            if item is None:
+                logger.warning(f"无法获取联系人 {wxid} 的详细信息，API返回空数据")
+                # 仍然保存基本信息，确保至少有昵称
+                contacts.append({"wxid": wxid, "nickname": wxid, "type": "friend"})
+            else:
+                contacts.append(parse_contact_detail(wxid, item))
+        return contacts
+
+    async def _throttle(self):
+        # 全局速率限制，两次接口调用至少间隔 min_interval
+        now = time.monotonic()
+        wait = self._next_call - now
+        self._next_call = max(now, self._next_call) + self.min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取刷新统计信息"""
+        return {
+            "requested": self.requested,
+            "fresh_hits": self.fresh_hits,
+            "coalesced": self.coalesced,
+            "queue_depth": len(self._pending),
+            "tracked": len(self._recent),
+            "complete_in_db": self.complete_in_db,
+            "refreshed": self.refreshed,
+            "api_calls": self.api_calls,
+            "api_errors": self.api_errors,
+        }
+
+
+def parse_contact_detail(wxid: str, detail: Dict[str, Any]) -> Dict[str, Any]:
+    """将联系人详情接口返回的单个联系人转换为数据库中的联系人信息"""
+    # 优先使用nickname字段，其次NickName
+    nickname_value = detail.get("nickname")
+    if nickname_value is None:
+        nickname_value = detail.get("NickName")
+        if nickname_value is None:
+            logger.warning(f"联系人 {wxid} 没有找到nickname或NickName字段")
+    nickname_value = _string_of(nickname_value)
+
+    # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
+    avatar_value = detail.get("BigHeadImgUrl", "") or detail.get("SmallHeadImgUrl", "")
+    if not avatar_value:
+        avatar_value = _string_of(detail.get("avatar", ""))
+
+    # 处理备注字段
+    remark_value = _string_of(detail.get("remark", "") or detail.get("Remark", ""))
+
+    # 处理微信号字段
+    alias_value = _string_of(detail.get("alias", "") or detail.get("Alias", ""))
+
+    return {
+        "wxid": wxid,
+        "nickname": nickname_value if nickname_value else wxid,
+        "avatar": avatar_value,
+        "remark": remark_value,
+        "alias": alias_value
+    }
+
+
+def _string_of(value: Any) -> Any:
+    if isinstance(value, dict):
+        return value.get("string", "")
+    return value
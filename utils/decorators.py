@@ -5,6 +5,8 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from WechatAPI.send_scheduler import LANE_BROADCAST, send_lane
+
 scheduler = AsyncIOScheduler()
 
 
@@ -20,13 +22,16 @@ def schedule(
     - @schedule('interval', seconds=30)
     - @schedule('cron', hour=8, minute=30, second=30)
     - @schedule('date', run_date='2024-01-01 00:00:00')
+
+    定时任务中发送的消息走群发通道，排在回复用户的消息之后发送。
     """
     def decorator(func: Callable):
         job_id = f"{func.__module__}.{func.__qualname__}"
 
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
-            return await func(self, *args, **kwargs)
+            with send_lane(LANE_BROADCAST):
+                return await func(self, *args, **kwargs)
 
         setattr(wrapper, '_is_scheduled', True)
         setattr(wrapper, '_schedule_trigger', trigger)
@@ -56,8 +61,19 @@ def remove_job_safe(scheduler: AsyncIOScheduler, job_id: str):
         pass
 
 
-def on_text_message(priority=50):
-    """文本消息装饰器"""
+def on_text_message(priority=50, mutable=False, commands=None, keywords=None, regex=None):
+    """文本消息装饰器
+
+    Args:
+        priority: 优先级，0-99，越大越先执行
+        mutable: 为 True 时处理函数得到消息的完整深拷贝，可以修改嵌套内容
+        commands: 命令前缀，消息（去掉开头的@）以其中之一开头时才调用
+        keywords: 关键词，消息包含其中之一时才调用
+        regex: 正则表达式，消息匹配其中之一时才调用
+
+    commands / keywords / regex 可以是字符串、列表，或以插件实例为参数的函数（如
+    ``commands=lambda self: self.command``），在插件加载时求值。都不设置时所有消息都会调用。
+    """
     def decorator(func):
         if callable(priority):  # 无参数调用时
             func_to_decorate = priority
@@ -67,12 +83,16 @@ def on_text_message(priority=50):
         # 有参数调用时
         setattr(func, '_event_type', 'text_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
+        setattr(func, '_commands', commands)
+        setattr(func, '_keywords', keywords)
+        setattr(func, '_regex', regex)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_image_message(priority=50):
+def on_image_message(priority=50, mutable=False):
     """图片消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -82,12 +102,13 @@ def on_image_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'image_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_voice_message(priority=50):
+def on_voice_message(priority=50, mutable=False):
     """语音消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -97,12 +118,13 @@ def on_voice_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'voice_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_emoji_message(priority=50):
+def on_emoji_message(priority=50, mutable=False):
     """表情消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -112,12 +134,13 @@ def on_emoji_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'emoji_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_file_message(priority=50):
+def on_file_message(priority=50, mutable=False):
     """文件消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -127,13 +150,14 @@ def on_file_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'file_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_quote_message(priority=50):
-    """引用消息装饰器"""
+def on_quote_message(priority=50, mutable=False, commands=None, keywords=None, regex=None):
+    """引用消息装饰器，参数同 on_text_message"""
     def decorator(func):
         if callable(priority):
             func_to_decorate = priority
@@ -142,12 +166,16 @@ def on_quote_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'quote_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
+        setattr(func, '_commands', commands)
+        setattr(func, '_keywords', keywords)
+        setattr(func, '_regex', regex)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_video_message(priority=50):
+def on_video_message(priority=50, mutable=False):
     """视频消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -157,12 +185,13 @@ def on_video_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'video_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_pat_message(priority=50):
+def on_pat_message(priority=50, mutable=False):
     """拍一拍消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -172,13 +201,14 @@ def on_pat_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'pat_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_at_message(priority=50):
-    """被@消息装饰器"""
+def on_at_message(priority=50, mutable=False, commands=None, keywords=None, regex=None):
+    """被@消息装饰器，参数同 on_text_message"""
     def decorator(func):
         if callable(priority):
             func_to_decorate = priority
@@ -187,12 +217,16 @@ def on_at_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'at_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
+        setattr(func, '_commands', commands)
+        setattr(func, '_keywords', keywords)
+        setattr(func, '_regex', regex)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_system_message(priority=50):
+def on_system_message(priority=50, mutable=False):
     """系统消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -202,12 +236,13 @@ def on_system_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'system_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_other_message(priority=50):
+def on_other_message(priority=50, mutable=False):
     """其他消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -217,12 +252,13 @@ def on_other_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'other_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_article_message(priority=50):
+def on_article_message(priority=50, mutable=False):
     """公众号文章消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -232,12 +268,13 @@ def on_article_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'article_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
 
 
-def on_xml_message(priority=50):
+def on_xml_message(priority=50, mutable=False):
     """XML消息装饰器"""
     def decorator(func):
         if callable(priority):
@@ -247,6 +284,7 @@ def on_xml_message(priority=50):
             return func_to_decorate
         setattr(func, '_event_type', 'xml_message')
         setattr(func, '_priority', min(max(priority, 0), 99))
+        setattr(func, '_mutable', mutable)
         return func
 
     return decorator if not callable(priority) else decorator(priority)
\ No newline at end of file
@@ -1,24 +1,42 @@
 import copy
 from typing import Callable, Dict, List
 
+from utils.event_router import RouteTable, message_text
+from utils.message_view import FrozenDict, freeze, message_view
+
 
 class EventManager:
     _handlers: Dict[str, List[tuple[Callable, object, int]]] = {}
+    # 编译后的路由表，处理函数变化时失效，下次触发事件时重新编译
+    _routes: Dict[str, RouteTable] = {}
 
     @classmethod
     def bind_instance(cls, instance: object):
         """将实例绑定到对应的事件处理函数"""
-        for method_name in dir(instance):
+        changed = set()
+        owner = type(instance)
+        for method_name in dir(owner):
+            # 只在类属性上查找，避免触发实例上的 property
+            if not hasattr(getattr(owner, method_name, None), '_event_type'):
+                continue
             method = getattr(instance, method_name)
-            if hasattr(method, '_event_type'):
-                event_type = getattr(method, '_event_type')
-                priority = getattr(method, '_priority', 50)
+            event_type = getattr(method, '_event_type')
+            priority = getattr(method, '_priority', 50)
+
+            cls._handlers.setdefault(event_type, []).append((method, instance, priority))
+            changed.add(event_type)
 
-                if event_type not in cls._handlers:
-                    cls._handlers[event_type] = []
-                cls._handlers[event_type].append((method, instance, priority))
-                # 按优先级排序，优先级高的在前
-                cls._handlers[event_type].sort(key=lambda x: x[2], reverse=True)
+        for event_type in changed:
+            # 按优先级排序，优先级高的在前
+            cls._handlers[event_type].sort(key=lambda x: x[2], reverse=True)
+            cls._routes.pop(event_type, None)
+
+    @classmethod
+    def _route_table(cls, event_type: str) -> RouteTable:
+        table = cls._routes.get(event_type)
+        if table is None:
+            table = cls._routes[event_type] = RouteTable(cls._handlers[event_type])
+        return table
 
     @classmethod
     async def emit(cls, event_type: str, *args, **kwargs):
@@ -44,10 +62,28 @@ class EventManager:
         api_client, message = args
         final_result = None
 
-        for handler, instance, priority in cls._handlers[event_type]:
-            # 只对 message 进行深拷贝，api_client 保持不变
-            handler_args = (api_client, copy.deepcopy(message))
-            new_kwargs = {k: copy.deepcopy(v) for k, v in kwargs.items()}
+        # 消息只冻结一次，所有处理函数共享只读的嵌套内容
+        frozen_message = None
+        frozen_kwargs = None
+
+        # 只调用没有触发条件或触发条件命中的处理函数
+        table = cls._route_table(event_type)
+        routes = table.match(message_text(message))
+
+        for route in routes:
+            handler = route.handler
+            if getattr(handler, '_mutable', False):
+                # 声明了 mutable=True 的处理函数仍然得到一份完整的深拷贝
+                handler_args = (api_client, copy.deepcopy(message))
+                new_kwargs = {k: copy.deepcopy(v) for k, v in kwargs.items()}
+            else:
+                if frozen_message is None:
+                    frozen_message = freeze(message)
+                    frozen_kwargs = {k: freeze(v) for k, v in kwargs.items()}
+                # 顶层浅拷贝，处理函数可以修改顶层字段而不影响其他处理函数
+                handler_args = (api_client, message_view(frozen_message))
+                new_kwargs = {k: message_view(v) if isinstance(v, FrozenDict) else v
+                              for k, v in frozen_kwargs.items()}
 
             result = await handler(*handler_args, **new_kwargs)
 
@@ -75,8 +111,11 @@ class EventManager:
     def unbind_instance(cls, instance: object):
         """解绑实例的所有事件处理函数"""
         for event_type in cls._handlers:
-            cls._handlers[event_type] = [
+            handlers = [
                 (handler, inst, priority)
                 for handler, inst, priority in cls._handlers[event_type]
                 if inst is not instance
             ]
+            if len(handlers) != len(cls._handlers[event_type]):
+                cls._handlers[event_type] = handlers
+                cls._routes.pop(event_type, None)
@@ -0,0 +1,186 @@
+"""
+事件路由表
+插件在事件装饰器中声明的触发条件（命令前缀、关键词、正则）在插件加载/卸载后编译一次，
+分发消息时只扫描一遍消息内容，就能选出需要调用的处理函数
+"""
+
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Set, Union
+
+from loguru import logger
+
+TriggerSpec = Union[None, str, Pattern, Iterable[Union[str, Pattern]], Callable[[object], Any]]
+
+# 消息开头的@提及，如 "@机器人 "
+_LEADING_MENTIONS = re.compile(r"^(?:@[^\s ]+[\s ]+)+")
+
+
+class _AhoCorasick:
+    """多模式串匹配自动机，一次扫描找出文本中出现的所有关键词"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[int]] = [set()]
+
+    def add(self, word: str, value: int):
+        node = 0
+        for char in word:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = nxt
+        self._output[node].add(value)
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._output[nxt] |= self._output[self._fail[nxt]]
+
+    def search(self, text: str, found: Set[int]):
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+
+
+class _PrefixTrie:
+    """命令前缀树，从消息开头匹配所有命中的命令"""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+
+    def add(self, word: str, value: int):
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(value)
+
+    def search(self, text: str, found: Set[int]):
+        node = self._root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return
+            if None in node:
+                found |= node[None]
+
+
+class Route:
+    """路由表中的一个处理函数"""
+
+    __slots__ = ("handler", "instance", "priority", "commands", "keywords", "regexes")
+
+    def __init__(self, handler: Callable, instance: object, priority: int):
+        self.handler = handler
+        self.instance = instance
+        self.priority = priority
+        self.commands = _resolve(getattr(handler, "_commands", None), instance)
+        self.keywords = _resolve(getattr(handler, "_keywords", None), instance)
+        self.regexes = [re.compile(p) if isinstance(p, str) else p
+                        for p in _resolve(getattr(handler, "_regex", None), instance)]
+
+    @property
+    def catch_all(self) -> bool:
+        """没有声明任何触发条件的处理函数，所有消息都会调用"""
+        return not (self.commands or self.keywords or self.regexes)
+
+
+class RouteTable:
+    """某个事件类型编译后的路由表
+
+    Args:
+        handlers: 按优先级排好序的 (handler, instance, priority) 列表
+    """
+
+    def __init__(self, handlers: List[tuple[Callable, object, int]]):
+        self.routes: List[Route] = []
+        self._commands = _PrefixTrie()
+        self._keywords = _AhoCorasick()
+        self._regex_routes: List[int] = []
+        self.has_triggers = False
+
+        for handler, instance, priority in handlers:
+            try:
+                route = Route(handler, instance, priority)
+            except Exception as e:
+                logger.error(f"编译处理函数 {getattr(handler, '__qualname__', handler)} 的触发条件失败: {e}")
+                route = Route.__new__(Route)
+                route.handler, route.instance, route.priority = handler, instance, priority
+                route.commands, route.keywords, route.regexes = [], [], []
+
+            index = len(self.routes)
+            self.routes.append(route)
+            for command in route.commands:
+                self._commands.add(command, index)
+            for keyword in route.keywords:
+                self._keywords.add(keyword, index)
+            if route.regexes:
+                self._regex_routes.append(index)
+            if not route.catch_all:
+                self.has_triggers = True
+
+        self._keywords.build()
+
+    def match(self, content: Optional[str]) -> List[Route]:
+        """选出需要处理该内容的处理函数，保持优先级顺序
+
+        Args:
+            content: 消息文本内容，为 None 时只返回不带触发条件的处理函数
+        """
+        if not self.has_triggers:
+            return self.routes
+
+        matched: Set[int] = set()
+        if content:
+            text = content.strip()
+            self._commands.search(text, matched)
+            stripped = _LEADING_MENTIONS.sub("", text)
+            if stripped != text:
+                self._commands.search(stripped, matched)
+            self._keywords.search(text, matched)
+            for index in self._regex_routes:
+                if index not in matched and any(p.search(text) for p in self.routes[index].regexes):
+                    matched.add(index)
+
+        return [route for index, route in enumerate(self.routes) if route.catch_all or index in matched]
+
+
+def message_text(message: Any) -> Optional[str]:
+    """获取消息中用于匹配触发条件的文本"""
+    if not isinstance(message, dict):
+        return None
+    content = message.get("Content")
+    if isinstance(content, dict):
+        content = content.get("string")
+    return content if isinstance(content, str) else None
+
+
+def _resolve(spec: TriggerSpec, instance: object) -> list:
+    """将装饰器中的触发条件转换为列表，可调用对象在绑定实例时以实例为参数求值"""
+    if spec is None:
+        return []
+    if callable(spec) and not isinstance(spec, re.Pattern):
+        spec = spec(instance)
+        if spec is None:
+            return []
+    if isinstance(spec, (str, re.Pattern)):
+        return [spec] if spec else []
+    return [item for item in spec if item]
@@ -1,7 +1,8 @@
-import tomllib
 import requests
 from loguru import logger
 
+from utils.config_service import get_config
+
 def get_github_proxy() -> str:
     """
     从main_config.toml获取GitHub加速服务配置
@@ -10,9 +11,7 @@ def get_github_proxy() -> str:
         str: GitHub加速服务URL，如果未配置则返回空字符串
     """
     try:
-        # 读取main_config.toml配置文件
-        with open("main_config.toml", "rb") as f:
-            config = tomllib.load(f)
+        config = get_config()
 
         # 获取GitHub加速服务配置
         github_proxy = config.get("XYBot", {}).get("github-proxy", "")
@@ -0,0 +1,387 @@
+"""
+群成员名单缓存
+每个群的成员名单拉取一次后缓存在内存中（带过期时间和版本号），按 wxid 建立索引；
+入群、踢人、改群名等系统消息到达时直接增量更新名单，不再整群重新拉取。
+同一个群同时只会有一个拉取请求，并发的调用方等待同一个结果，拉取到的名单同时写入 contacts.db
+"""
+
+import asyncio
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from database.contacts_store import get_store
+
+MemberFetcher = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+# 入群系统消息中新成员所在的链接名
+_JOIN_LINKS = ("names", "adder")
+# 踢人系统消息中被移出成员所在的链接名
+_KICK_LINKS = ("kickoutname", "names")
+
+
+def member_wxid(member: Dict[str, Any]) -> str:
+    """获取群成员的wxid，兼容接口返回和数据库中的字段名"""
+    return member.get("wxid") or member.get("Wxid") or member.get("UserName") or ""
+
+
+class GroupRoster:
+    """某个群的成员名单，创建后不再修改，增量更新时生成新的名单
+
+    Args:
+        group_wxid (str): 群聊的wxid
+        members (dict): wxid -> 成员信息，保持接口返回的顺序
+        version (int): 版本号，名单每变化一次加一
+        fetched_at (float): 最近一次完整拉取的时间(time.monotonic)
+        partial (frozenset): 通过系统消息加入、还没有完整信息（如头像）的成员
+    """
+
+    __slots__ = ("group_wxid", "members", "version", "fetched_at", "partial")
+
+    def __init__(self, group_wxid: str, members: Dict[str, Dict[str, Any]], version: int,
+                 fetched_at: float, partial: frozenset = frozenset()):
+        self.group_wxid = group_wxid
+        self.members = members
+        self.version = version
+        self.fetched_at = fetched_at
+        self.partial = partial
+
+    def get(self, wxid: str) -> Optional[Dict[str, Any]]:
+        """按wxid查找成员"""
+        return self.members.get(wxid)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """获取成员列表"""
+        return list(self.members.values())
+
+    def __contains__(self, wxid: str) -> bool:
+        return wxid in self.members
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+class RosterCache:
+    """群成员名单缓存
+
+    缓存可以在机器人和管理后台两个事件循环中使用：名单数据由线程锁保护，
+    合并拉取请求时按事件循环区分。
+
+    Args:
+        fetch: 拉取群成员列表的协程函数，参数为群wxid，失败时返回空列表
+        ttl (float): 名单缓存时间(秒)
+        maxsize (int): 最多缓存的群数量
+    """
+
+    def __init__(self, fetch: MemberFetcher, ttl: float = 600, maxsize: int = 1000):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        self._rosters: OrderedDict = OrderedDict()
+        # 每个群的版本号，名单变化或失效时加一；拉取期间版本变化说明拉取结果已过时
+        self._versions: Dict[str, int] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.db_hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.stale_fetches = 0
+        self.incremental_updates = 0
+        self.invalidations = 0
+
+    def cached(self, group_wxid: str) -> Optional[GroupRoster]:
+        """获取未过期的缓存名单，不会触发拉取"""
+        with self._lock:
+            roster = self._rosters.get(group_wxid)
+            if roster is None:
+                return None
+            if time.monotonic() - roster.fetched_at > self.ttl:
+                del self._rosters[group_wxid]
+                return None
+            self._rosters.move_to_end(group_wxid)
+            return roster
+
+    async def get(self, group_wxid: str, refresh: bool = False) -> Optional[GroupRoster]:
+        """获取群成员名单
+
+        Args:
+            group_wxid (str): 群聊的wxid
+            refresh (bool): 忽略缓存，重新拉取
+
+        Returns:
+            GroupRoster: 成员名单，拉取失败时返回None
+        """
+        if not refresh:
+            roster = self.cached(group_wxid)
+            if roster is not None:
+                self.hits += 1
+                return roster
+        self.misses += 1
+
+        loop = asyncio.get_running_loop()
+        key = (loop, group_wxid)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            roster = await self._fetch(group_wxid)
+            future.set_result(roster)
+            return roster
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_members(self, group_wxid: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        """获取群成员列表，拉取失败时返回空列表"""
+        roster = await self.get(group_wxid, refresh)
+        return roster.list() if roster is not None else []
+
+    async def get_member(self, group_wxid: str, wxid: str, complete: bool = False) -> Optional[Dict[str, Any]]:
+        """查找单个群成员
+
+        名单未缓存时先查数据库中最近更新过的记录，仍然没有再拉取整个名单。
+
+        Args:
+            group_wxid (str): 群聊的wxid
+            wxid (str): 成员的wxid
+            complete (bool): 需要完整的成员信息，成员是通过系统消息加入的时重新拉取名单
+
+        Returns:
+            dict: 成员信息，不在群中时返回None
+        """
+        roster = self.cached(group_wxid)
+        if roster is not None:
+            if not (complete and wxid in roster.partial):
+                self.hits += 1
+                return roster.get(wxid)
+        else:
+            member = await get_store().get_member_async(group_wxid, wxid)
+            if member and time.time() - member.get("last_updated", 0) <= self.ttl:
+                self.db_hits += 1
+                return member
+
+        roster = await self.get(group_wxid, refresh=roster is not None)
+        return roster.get(wxid) if roster is not None else None
+
+    async def _fetch(self, group_wxid: str) -> Optional[GroupRoster]:
+        with self._lock:
+            version = self._versions.get(group_wxid, 0)
+        self.fetches += 1
+
+        members = await self.fetch(group_wxid)
+        if not members:
+            # 拉取失败不缓存，下次调用重新拉取
+            return None
+
+        indexed = OrderedDict()
+        for member in members:
+            wxid = member_wxid(member)
+            if wxid:
+                indexed[wxid] = member
+
+        with self._lock:
+            current = self._versions.get(group_wxid, 0)
+            roster = GroupRoster(group_wxid, indexed, current + 1, time.monotonic())
+            if current == version:
+                self._install(roster)
+            else:
+                # 拉取期间收到了成员变化的系统消息，结果可能已经过时，只返回给本次调用方
+                self.stale_fetches += 1
+
+        try:
+            await get_store().upsert_members_async(group_wxid, members)
+        except Exception as e:
+            logger.error(f"保存群 {group_wxid} 的成员到数据库失败: {e}")
+        return roster
+
+    def _install(self, roster: GroupRoster):
+        # 调用方需持有 self._lock
+        self._versions[roster.group_wxid] = roster.version
+        self._rosters[roster.group_wxid] = roster
+        self._rosters.move_to_end(roster.group_wxid)
+        while len(self._rosters) > self.maxsize:
+            self._rosters.popitem(last=False)
+
+    def _update(self, group_wxid: str, change: Callable[[OrderedDict, set], None]):
+        """在已缓存名单的副本上应用变化并替换名单；名单未缓存时只增加版本号"""
+        with self._lock:
+            version = self._versions.get(group_wxid, 0) + 1
+            self._versions[group_wxid] = version
+            roster = self._rosters.get(group_wxid)
+            if roster is None:
+                return
+            members = OrderedDict(roster.members)
+            partial = set(roster.partial)
+            change(members, partial)
+            self._rosters[group_wxid] = GroupRoster(group_wxid, members, version, roster.fetched_at,
+                                                    frozenset(partial))
+        self.incremental_updates += 1
+
+    def add_members(self, group_wxid: str, members: Iterable[Dict[str, Any]]):
+        """增量添加成员，已存在的成员保留原有信息"""
+        members = [member for member in members if member_wxid(member)]
+
+        def change(current: OrderedDict, partial: set):
+            for member in members:
+                wxid = member_wxid(member)
+                if wxid not in current:
+                    current[wxid] = member
+                    partial.add(wxid)
+
+        self._update(group_wxid, change)
+
+    def remove_members(self, group_wxid: str, wxids: Iterable[str]):
+        """增量移除成员"""
+        wxids = list(wxids)
+
+        def change(current: OrderedDict, partial: set):
+            for wxid in wxids:
+                current.pop(wxid, None)
+                partial.discard(wxid)
+
+        self._update(group_wxid, change)
+
+    def invalidate(self, group_wxid: str):
+        """使某个群的名单失效，下次访问时重新拉取"""
+        with self._lock:
+            self._versions[group_wxid] = self._versions.get(group_wxid, 0) + 1
+            self._rosters.pop(group_wxid, None)
+        self.invalidations += 1
+
+    def clear(self):
+        """清除所有缓存的名单"""
+        with self._lock:
+            for group_wxid in self._rosters:
+                self._versions[group_wxid] = self._versions.get(group_wxid, 0) + 1
+            self._rosters.clear()
+
+    async def apply_system_message(self, group_wxid: str, root: ET.Element) -> bool:
+        """根据群系统消息更新名单
+
+        入群和踢人消息增量更新名单和数据库，改群名消息更新群聊的联系人信息，
+        其他与群成员有关但无法解析的消息使整个名单失效。
+
+        Args:
+            group_wxid (str): 群聊的wxid
+            root (ET.Element): 系统消息的 sysmsg 根节点
+
+        Returns:
+            bool: 是否更新了名单或群信息
+        """
+        msg_type = root.attrib.get("type")
+        if msg_type == "delchatroommember":
+            self.invalidate(group_wxid)
+            return True
+        if msg_type != "sysmsgtemplate":
+            return False
+
+        template_text = root.findtext(".//content_template/template") or ""
+        store = get_store()
+
+        if "加入了群聊" in template_text or "加入群聊" in template_text:
+            joined = _link_members(root, _JOIN_LINKS)
+            if not joined:
+                self.invalidate(group_wxid)
+                return True
+            self.add_members(group_wxid, joined)
+            await store.upsert_members_async(group_wxid, joined)
+            logger.debug(f"群 {group_wxid} 新成员: {[member['wxid'] for member in joined]}")
+            return True
+
+        if "移出了群聊" in template_text:
+            removed = [member["wxid"] for member in _link_members(root, _KICK_LINKS)]
+            if not removed:
+                self.invalidate(group_wxid)
+                return True
+            self.remove_members(group_wxid, removed)
+            for wxid in removed:
+                await asyncio.to_thread(store.delete_member, group_wxid, wxid)
+            logger.debug(f"群 {group_wxid} 移除成员: {removed}")
+            return True
+
+        if "修改群名为" in template_text:
+            new_name = _link_text(root, "remark")
+            if new_name:
+                contact = await store.get_contact_async(group_wxid) or {"wxid": group_wxid, "type": "group"}
+                contact["nickname"] = new_name
+                await store.upsert_contacts_async([contact])
+                logger.debug(f"群 {group_wxid} 改名为: {new_name}")
+                return True
+            return False
+
+        if "群聊" in template_text:
+            # 其他与群成员有关的消息（如被移出群聊、群主转让），直接使名单失效
+            self.invalidate(group_wxid)
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            "groups_cached": len(self._rosters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_hits": self.db_hits,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "stale_fetches": self.stale_fetches,
+            "incremental_updates": self.incremental_updates,
+            "invalidations": self.invalidations,
+        }
+
+
+def _link_members(root: ET.Element, link_names: Iterable[str]) -> List[Dict[str, Any]]:
+    """从系统消息模板的链接中解析成员列表"""
+    for link_name in link_names:
+        link = root.find(f".//link[@name='{link_name}']")
+        if link is None:
+            continue
+        members = []
+        for member in link.findall("./memberlist/member"):
+            wxid = (member.findtext("username") or "").strip()
+            if not wxid:
+                continue
+            nickname = member.findtext("nickname") or wxid
+            members.append({"wxid": wxid, "UserName": wxid, "nickname": nickname, "NickName": nickname})
+        if members:
+            return members
+    return []
+
+
+def _link_text(root: ET.Element, link_name: str) -> str:
+    link = root.find(f".//link[@name='{link_name}']")
+    if link is None:
+        return ""
+    return (link.findtext("plain") or link.findtext("title") or "").strip()
+
+
+_cache: Optional[RosterCache] = None
+
+
+def init_roster_cache(fetch: MemberFetcher, ttl: float = 600, maxsize: int = 1000) -> RosterCache:
+    """创建全局群成员名单缓存，由 XYBot 在启动时调用"""
+    global _cache
+    _cache = RosterCache(fetch, ttl, maxsize)
+    return _cache
+
+
+def get_roster_cache() -> Optional[RosterCache]:
+    """获取全局群成员名单缓存，机器人未启动时返回None"""
+    return _cache
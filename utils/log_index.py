@@ -0,0 +1,330 @@
+"""
+日志文件行索引
+从文件末尾按块向前读取，记录每一行的起始字节偏移和日志级别，只索引实际用到的部分；
+文件追加内容后只索引新增的行。按字节偏移作为游标分页、按级别过滤时不需要把整个文件读入内存
+"""
+
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+BLOCK_SIZE = 64 * 1024
+MAX_BLOCK_SIZE = 4 * 1024 * 1024  # 连续向前索引时块大小逐次翻倍，直到这个上限
+
+# 级别编码，0 表示没有级别标记的行（如异常堆栈）
+LEVELS = ("", "trace", "debug", "info", "success", "warning", "error", "critical")
+_LEVEL_CODES = {name.upper().encode(): code for code, name in enumerate(LEVELS) if name}
+_LEVEL_PATTERN = re.compile(rb"\|\s*(TRACE|DEBUG|INFO|SUCCESS|WARNING|ERROR|CRITICAL)\s*\|")
+
+
+def level_codes(level: Optional[str]) -> Optional[frozenset]:
+    """过滤级别对应的编码集合，没有级别标记的行按 info 处理；level 为空时返回 None 表示不过滤"""
+    if not level:
+        return None
+    level = level.lower()
+    if level not in LEVELS:
+        return frozenset()
+    return frozenset((0, 3)) if level == "info" else frozenset((LEVELS.index(level),))
+
+
+def _parse_level(line: bytes) -> int:
+    # loguru 默认格式 "YYYY-MM-DD HH:mm:ss | LEVEL    | ..."，先按固定位置取，取不到再用正则
+    if line[19:22] == b" | ":
+        code = _LEVEL_CODES.get(line[22:30].rstrip())
+        if code:
+            return code
+    match = _LEVEL_PATTERN.search(line, 0, 200)
+    return _LEVEL_CODES[match.group(1)] if match else 0
+
+
+class LogLine:
+    """索引中的一行日志"""
+
+    __slots__ = ("offset", "level", "text")
+
+    def __init__(self, offset: int, level: int, text: str):
+        self.offset = offset
+        self.level = level
+        self.text = text
+
+    @property
+    def level_name(self) -> str:
+        return LEVELS[self.level] or "info"
+
+
+class LogIndex:
+    """单个日志文件的行索引
+
+    只索引以换行结尾的完整行。文件被截断或替换（如按日期切分后重新创建）时重建索引。
+
+    Args:
+        path (str): 日志文件路径
+        block_size (int): 每次读取的块大小
+    """
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE):
+        self.path = os.path.abspath(path)
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self.generation = 0  # 文件每次被截断或替换时加一，持续跟踪的一方据此从新文件开头读取
+        self._reset(None)
+
+    def _reset(self, identity):
+        self._identity = identity
+        self._offsets = array("q")  # 已索引各行的起始偏移，升序
+        self._levels = bytearray()  # 与 _offsets 对应的级别编码
+        self._start = 0  # 已索引区域的起始偏移，之前的内容还没有索引
+        self._end = 0  # 已索引区域的结束偏移，总是在行尾之后
+        self._initialized = False
+
+    @property
+    def end(self) -> int:
+        """已索引区域的结束偏移，可作为 since 游标获取之后新增的行"""
+        return self._end
+
+    def refresh(self) -> int:
+        """检查文件变化并索引新增的行
+
+        Returns:
+            int: 新增的行数
+        """
+        with self._lock:
+            return self._refresh()
+
+    def tail(self, limit: int, level: Optional[str] = None) -> List[LogLine]:
+        """获取最后 limit 行"""
+        return self.page(limit=limit, level=level)[0]
+
+    def page(self, before: Optional[int] = None, limit: int = 100,
+             level: Optional[str] = None) -> Tuple[List[LogLine], Optional[int]]:
+        """向前翻页
+
+        Args:
+            before: 游标，只返回起始偏移小于它的行；为 None 时从文件末尾开始
+            limit: 最多返回的行数
+            level: 只返回该级别的行
+
+        Returns:
+            (按文件顺序排列的行, 下一页的游标)，已经到文件开头时游标为 None
+        """
+        codes = level_codes(level)
+        if codes is not None and not codes:
+            return [], None
+        limit = max(1, limit)
+        with self._lock:
+            self._refresh()
+            if before is not None:
+                self._extend_back_to(before)
+            index = len(self._offsets) if before is None else bisect_left(self._offsets, before)
+            selected = []
+            reached_start = False
+            block_size = self.block_size
+            while len(selected) < limit:
+                if index == 0:
+                    if self._start == 0:
+                        reached_start = True
+                        break
+                    # 向前索引会在列表头部插入新行，已选中行的下标随之后移
+                    added = self._extend_back(block_size)
+                    block_size = min(block_size * 2, max(MAX_BLOCK_SIZE, self.block_size))
+                    index += added
+                    selected = [i + added for i in selected]
+                    continue
+                if codes is None:
+                    index -= 1
+                else:
+                    # 在级别数组里直接查找上一个匹配的行，不逐行比较
+                    found = max(self._levels.rfind(code, 0, index) for code in codes)
+                    if found < 0:
+                        index = 0
+                        continue
+                    index = found
+                selected.append(index)
+
+            lines = self._read_lines(selected[::-1])
+            cursor = None if reached_start else self._offsets[index]
+        return lines, cursor
+
+    def since(self, offset: int, limit: int = 1000, level: Optional[str] = None) -> Tuple[List[LogLine], int]:
+        """获取起始偏移不小于 offset 的新行，用于持续跟踪日志
+
+        Returns:
+            (按文件顺序排列的行, 下一次调用使用的游标)
+        """
+        codes = level_codes(level)
+        with self._lock:
+            self._refresh()
+            if offset > self._end:
+                # 游标属于被替换前的文件，调用方应根据 generation 从头读取新文件
+                return [], self._end
+            self._extend_back_to(offset)
+            index = bisect_left(self._offsets, offset)
+            selected = []
+            next_offset = self._end
+            for i in range(index, len(self._offsets)):
+                if len(selected) >= limit:
+                    next_offset = self._offsets[i]
+                    break
+                if codes is None or self._levels[i] in codes:
+                    selected.append(i)
+            return self._read_lines(selected), next_offset
+
+    def stats(self) -> Dict[str, int]:
+        """获取索引统计信息"""
+        return {
+            "indexed_lines": len(self._offsets),
+            "indexed_bytes": self._end - self._start,
+            "end": self._end,
+        }
+
+    def _refresh(self) -> int:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if self._identity is not None:
+                self._replaced(None)
+            return 0
+        identity = (st.st_dev, st.st_ino)
+        if self._identity is not None and (identity != self._identity or st.st_size < self._end):
+            self._replaced(identity)
+        if not self._initialized:
+            # 首次打开时只定位到最后一个完整行的末尾，之前的内容按需向前索引
+            self._identity = identity
+            self._start = self._end = self._last_line_end(st.st_size)
+            self._initialized = True
+            return 0
+        self._identity = identity
+        if st.st_size > self._end:
+            return self._extend_forward(st.st_size)
+        return 0
+
+    def _replaced(self, identity):
+        # 被截断或替换后的文件是新写入的，从头开始索引
+        self._reset(identity)
+        self._initialized = True
+        self.generation += 1
+
+    def _last_line_end(self, size: int) -> int:
+        with open(self.path, "rb") as f:
+            position = size
+            while position > 0:
+                start = max(0, position - self.block_size)
+                f.seek(start)
+                block = f.read(position - start)
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    return start + newline + 1
+                position = start
+        return 0
+
+    def _extend_forward(self, size: int) -> int:
+        added = 0
+        with open(self.path, "rb") as f:
+            f.seek(self._end)
+            pending = b""
+            position = self._end
+            while position < size:
+                block = f.read(min(self.block_size, size - position))
+                if not block:
+                    break
+                position += len(block)
+                data = pending + block
+                complete = data.rfind(b"\n") + 1
+                if not complete:
+                    pending = data
+                    continue
+                offsets, levels = self._index_block(self._end, data[:complete])
+                self._offsets.extend(offsets)
+                self._levels += levels
+                added += len(offsets)
+                self._end += complete
+                pending = data[complete:]
+        return added
+
+    def _extend_back_to(self, offset: int):
+        block_size = self.block_size
+        while self._start > offset:
+            self._extend_back(block_size)
+            block_size = min(block_size * 2, max(MAX_BLOCK_SIZE, self.block_size))
+
+    def _extend_back(self, block_size: int) -> int:
+        """向前索引一个块，返回新增的行数"""
+        with open(self.path, "rb") as f:
+            while True:
+                start = max(0, self._start - block_size)
+                f.seek(start)
+                block = f.read(self._start - start)
+                if start > 0:
+                    # 块的第一行可能不完整，留给下一次向前读取
+                    newline = block.find(b"\n")
+                    if newline < 0 or newline + 1 == len(block):
+                        # 块中没有完整的行，加大块再读
+                        block_size *= 2
+                        continue
+                    start += newline + 1
+                    block = block[newline + 1:]
+                break
+
+        offsets, levels = self._index_block(start, block)
+        self._offsets = offsets + self._offsets
+        self._levels = bytearray(levels) + self._levels
+        self._start = start
+        return len(offsets)
+
+    @staticmethod
+    def _index_block(base: int, block: bytes) -> Tuple[array, bytes]:
+        """索引以换行结尾的一段内容，返回各行的起始偏移和级别编码"""
+        lines = block.split(b"\n")
+        lines.pop()  # 以换行结尾，最后一个元素是空串
+        if not lines:
+            return array("q"), b""
+        offsets = array("q", accumulate([len(line) + 1 for line in lines[:-1]], initial=base))
+        # 大部分行是固定格式，直接按位置取级别，其余的行再交给 _parse_level
+        levels = bytes([(line[19:22] == b" | " and _LEVEL_CODES.get(line[22:30].rstrip())) or _parse_level(line)
+                        for line in lines])
+        return offsets, levels
+
+    def _read_lines(self, indexes: List[int]) -> List[LogLine]:
+        if not indexes:
+            return []
+        result = []
+        with open(self.path, "rb") as f:
+            run_start = 0
+            # 连续的行合并成一次读取
+            for i in range(1, len(indexes) + 1):
+                if i < len(indexes) and indexes[i] == indexes[i - 1] + 1:
+                    continue
+                first, last = indexes[run_start], indexes[i - 1]
+                begin = self._offsets[first]
+                stop = self._offsets[last + 1] if last + 1 < len(self._offsets) else self._end
+                f.seek(begin)
+                data = f.read(stop - begin)
+                for number, raw in zip(range(first, last + 1), data.split(b"\n")):
+                    result.append(LogLine(self._offsets[number], self._levels[number],
+                                          raw.rstrip(b"\r").decode("utf-8", errors="ignore")))
+                run_start = i
+        return result
+
+
+_indexes: "OrderedDict[str, LogIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_log_index(path: str) -> LogIndex:
+    """获取日志文件的共享索引"""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None:
+            _indexes.move_to_end(path)
+            return index
+        # 日志按天切分，只保留最近使用的几个文件的索引
+        if len(_indexes) >= 8:
+            _indexes.popitem(last=False)
+        index = _indexes[path] = LogIndex(path)
+        return index
@@ -0,0 +1,157 @@
+"""
+媒体分段下载
+协议端每次最多返回64KB，大图片需要多次请求。这里并发下载各个分段，单个分段失败时只重试该分段，
+数据直接写入预先分配的缓冲区；下载前按 md5 检查 files 目录，已下载过的图片不再重复下载。
+"""
+
+import asyncio
+import glob
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+CHUNK_SIZE = 64 * 1024  # 协议端限制，每段最多64KB
+
+
+class ChunkDownloadError(Exception):
+    """分段下载失败"""
+
+
+async def download_chunks(fetch_chunk: Callable[[int, int], Awaitable[Optional[bytes]]], total_size: int,
+                          chunk_size: int = CHUNK_SIZE, concurrency: int = 4, retries: int = 3,
+                          retry_delay: float = 0.5) -> bytes:
+    """并发下载所有分段并按顺序拼接
+
+    Args:
+        fetch_chunk: 下载单个分段的协程函数，参数为 (起始位置, 分段大小)，返回分段数据
+        total_size (int): 文件总大小
+        chunk_size (int): 分段大小
+        concurrency (int): 同时下载的分段数
+        retries (int): 单个分段的最大重试次数
+        retry_delay (float): 首次重试前的等待时间(秒)，之后每次翻倍
+
+    Returns:
+        bytes: 完整数据
+
+    Raises:
+        ChunkDownloadError: 某个分段重试后仍然失败
+    """
+    if total_size <= 0:
+        raise ChunkDownloadError(f"无效的文件大小: {total_size}")
+
+    buffer = bytearray(total_size)
+    view = memoryview(buffer)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    chunks = (total_size + chunk_size - 1) // chunk_size
+
+    async def download(index: int):
+        start = index * chunk_size
+        size = min(chunk_size, total_size - start)
+        delay = retry_delay
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay *= 2
+            try:
+                async with semaphore:
+                    data = await fetch_chunk(start, size)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"第 {index + 1}/{chunks} 段下载出错(第{attempt + 1}次): {e}")
+                continue
+            if data and len(data) == size:
+                view[start:start + size] = data
+                return
+            last_error = f"期望 {size} 字节，实际 {len(data) if data else 0} 字节"
+            logger.warning(f"第 {index + 1}/{chunks} 段数据不完整(第{attempt + 1}次): {last_error}")
+        raise ChunkDownloadError(f"第 {index + 1}/{chunks} 段下载失败: {last_error}")
+
+    tasks = [asyncio.ensure_future(download(index)) for index in range(chunks)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        view.release()
+    return bytes(buffer)
+
+
+class MediaCache:
+    """按 md5 命名的媒体文件缓存，如 files/{md5}.jpg
+
+    同一 md5 同时只会下载一次，并发的请求等待同一个下载结果。
+
+    Args:
+        directory (str): 缓存目录
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, md5: str) -> Optional[str]:
+        """查找已缓存的文件路径"""
+        if not md5:
+            return None
+        for path in glob.glob(os.path.join(self.directory, glob.escape(md5) + ".*")):
+            if os.path.getsize(path) > 0:
+                return path
+        return None
+
+    def save(self, md5: str, data: bytes, extension: str) -> str:
+        """保存文件到缓存目录，返回文件路径"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{md5}.{extension}")
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    async def get_or_download(self, md5: str, download: Callable[[], Awaitable[Optional[bytes]]]):
+        """返回 (数据, 缓存文件路径)，未缓存时调用 download 下载
+
+        download 返回的数据不会自动保存，调用方确定扩展名后调用 save。
+        """
+        path = self.find(md5) if md5 else None
+        if path:
+            self.hits += 1
+            data = await asyncio.to_thread(_read_file, path)
+            return data, path
+
+        if not md5:
+            self.misses += 1
+            return await download(), None
+
+        inflight = self._inflight.get(md5)
+        if inflight is not None:
+            # 同一张图片正在下载，等待同一个结果
+            self.hits += 1
+            return await asyncio.shield(inflight), None
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[md5] = future
+        try:
+            data = await download()
+            future.set_result(data)
+            return data, None
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(md5, None)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,192 @@
+"""
+消息分发器
+用固定数量的worker处理消息，同一会话内的消息按顺序处理，不同会话之间并行处理
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+# 队列满时的处理策略
+OVERFLOW_BLOCK = "block"  # 等待队列有空位，对接收端形成背压
+OVERFLOW_DROP_OLDEST = "drop-oldest"  # 丢弃该会话中最早的待处理消息
+OVERFLOW_DROP_NEWEST = "drop-newest"  # 丢弃新到的消息
+
+
+class MessageDispatcher:
+    """按会话分组的有界消息分发器
+
+    每个会话（群聊或私聊对象）有自己的待处理队列，同一时刻最多只有一个worker处理
+    同一会话的消息，保证会话内顺序；就绪会话按轮转顺序分配给空闲worker。
+
+    Args:
+        handler (Callable): 消息处理协程函数
+        workers (int): worker数量
+        queue_size (int): 所有会话待处理消息总数上限
+        overflow (str): 队列满时的处理策略，block / drop-oldest / drop-newest
+        self_wxid (Callable): 返回机器人自身wxid的函数，用于识别自己发出的消息所属会话
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]], workers: int = 16,
+                 queue_size: int = 1000, overflow: str = OVERFLOW_BLOCK,
+                 self_wxid: Callable[[], str] = None):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST):
+            logger.warning(f"未知的队列溢出策略: {overflow}，使用{OVERFLOW_BLOCK}")
+            overflow = OVERFLOW_BLOCK
+
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.self_wxid = self_wxid
+
+        self._pending: Dict[str, Deque[tuple[float, Dict[str, Any]]]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._not_full = asyncio.Condition()
+        self._depth = 0
+        self._tasks: List[asyncio.Task] = []
+
+        # 统计信息
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.max_depth = 0
+        self.busy_workers = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def depth(self) -> int:
+        """当前待处理消息数"""
+        return self._depth
+
+    def conversation_key(self, message: Dict[str, Any]) -> str:
+        """获取消息所属会话"""
+        from_wxid = _wxid_of(message.get("FromUserName")) or _wxid_of(message.get("FromWxid"))
+        to_wxid = _wxid_of(message.get("ToUserName")) or _wxid_of(message.get("ToWxid"))
+        # 自己发出的消息属于接收方的会话
+        if self.self_wxid and from_wxid and from_wxid == self.self_wxid() and to_wxid:
+            return to_wxid
+        return from_wxid or to_wxid
+
+    async def put(self, message: Dict[str, Any]):
+        """提交一条消息，接口与 asyncio.Queue.put 一致"""
+        if self._depth >= self.queue_size:
+            self.overflowed += 1
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                logger.warning(f"消息队列已满({self._depth})，丢弃新消息")
+                return
+            if self.overflow == OVERFLOW_DROP_OLDEST:
+                self._drop_oldest(self.conversation_key(message))
+            else:
+                async with self._not_full:
+                    await self._not_full.wait_for(lambda: self._depth < self.queue_size)
+
+        key = self.conversation_key(message)
+        lane = self._pending.get(key)
+        if lane is None:
+            lane = self._pending[key] = deque()
+            # 新会话或空闲会话，加入就绪队列
+            self._ready.put_nowait(key)
+        lane.append((time.monotonic(), message))
+
+        self._depth += 1
+        self.submitted += 1
+        if self._depth > self.max_depth:
+            self.max_depth = self._depth
+
+    def _drop_oldest(self, key: str):
+        # 优先丢弃同一会话中还未开始处理的消息，否则丢弃最长会话中最早的消息
+        lane = self._pending.get(key)
+        if not lane:
+            lane = max(self._pending.values(), key=len, default=None)
+        if lane:
+            lane.popleft()
+            self._depth -= 1
+            self.dropped += 1
+            logger.warning("消息队列已满，丢弃最早的待处理消息")
+
+    def start(self):
+        """启动worker"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self._tasks
+
+    async def stop(self):
+        """停止worker，未处理的消息会被丢弃"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """等待所有worker结束"""
+        await asyncio.gather(*self._tasks)
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            lane = self._pending.get(key)
+            if not lane:
+                # 消息已被丢弃
+                self._pending.pop(key, None)
+                continue
+
+            enqueued_at, message = lane.popleft()
+            self._depth -= 1
+            wait_time = time.monotonic() - enqueued_at
+            self.total_wait_time += wait_time
+            if wait_time > self.max_wait_time:
+                self.max_wait_time = wait_time
+            await self._notify_not_full()
+
+            self.busy_workers += 1
+            try:
+                await self.handler(message)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"处理消息时发生异常: {e}")
+            finally:
+                self.busy_workers -= 1
+                self.processed += 1
+                if lane:
+                    # 会话还有消息，排到就绪队列末尾，让其他会话也能得到处理
+                    self._ready.put_nowait(key)
+                elif self._pending.get(key) is lane:
+                    del self._pending[key]
+
+    async def _notify_not_full(self):
+        if self.overflow == OVERFLOW_BLOCK:
+            async with self._not_full:
+                self._not_full.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取分发器统计信息"""
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy_workers,
+            "queue_depth": self._depth,
+            "queue_size": self.queue_size,
+            "max_depth": self.max_depth,
+            "conversations": len(self._pending),
+            "overflow_policy": self.overflow,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+            "avg_wait_ms": round(self.total_wait_time / self.processed * 1000, 2) if self.processed else 0,
+            "max_wait_ms": round(self.max_wait_time * 1000, 2),
+        }
+
+
+def _wxid_of(value: Optional[Any]) -> str:
+    if isinstance(value, dict):
+        return value.get("string", "") or ""
+    return value or ""
@@ -0,0 +1,295 @@
+"""
+消息接收层
+负责从协议端获取新消息并放入统一的有界队列（MessageDispatcher），供消息处理worker消费
+
+支持两种模式:
+- poll: 自适应轮询 sync_message，有消息时立即继续拉取，无消息时指数退避
+- push: 启动HTTP回调服务，接收 wx849_callback_daemon 等推送的消息
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from aiohttp import web
+from loguru import logger
+
+
+class MessageIntake:
+    """消息接收层基类
+
+    Args:
+        queue: 消息队列，需要提供 ``async put(message)``，如 asyncio.Queue 或 MessageDispatcher。
+            队列满时接收端会等待，形成背压
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.received = 0
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def put(self, message: Dict[str, Any]):
+        """将消息放入队列，队列满时等待"""
+        await self.queue.put(message)
+        self.received += 1
+
+    async def start(self):
+        """启动消息接收"""
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止消息接收"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        raise NotImplementedError
+
+
+class PollingIntake(MessageIntake):
+    """自适应轮询接收
+
+    上一次同步返回了消息时不等待直接再次同步；返回为空时等待时间从
+    ``min_interval`` 开始按 ``backoff_factor`` 倍增，最多 ``max_interval``。
+
+    Args:
+        bot: WechatAPI客户端
+        queue: 消息队列
+        min_interval (float): 空闲时的首次等待时间(秒)
+        max_interval (float): 空闲时的最大等待时间(秒)
+        backoff_factor (float): 空闲等待时间的倍增系数
+        error_interval (float): 同步失败后的等待时间(秒)
+        on_result (Callable): 每次同步完成后的回调，参数为 (ok, data)
+        on_error (Callable): 同步抛出异常时的回调，参数为异常对象
+    """
+
+    def __init__(self, bot, queue, min_interval: float = 0.1, max_interval: float = 1.0,
+                 backoff_factor: float = 2.0, error_interval: float = 5.0,
+                 on_result: Callable[[bool, Any], Any] = None,
+                 on_error: Callable[[Exception], Any] = None):
+        super().__init__(queue)
+        self.bot = bot
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff_factor = backoff_factor
+        self.error_interval = error_interval
+        self.on_result = on_result
+        self.on_error = on_error
+        self.interval = 0.0
+        self.sync_count = 0
+        self.empty_count = 0
+
+    def _next_interval(self, got_messages: bool) -> float:
+        if got_messages:
+            return 0.0
+        if self.interval <= 0:
+            return self.min_interval
+        return min(self.interval * self.backoff_factor, self.max_interval)
+
+    async def skip_backlog(self, max_empty: int = 4) -> int:
+        """跳过登录前堆积的消息
+
+        累计 ``max_empty`` 次同步为空时认为堆积消息已处理完毕。有消息时不等待，直接继续同步。
+
+        Returns:
+            int: 跳过的消息数
+        """
+        skipped = 0
+        empty = 0
+        while empty < max_empty:
+            ok, data = await self.bot.sync_message()
+            messages = data.get("AddMsgs") if isinstance(data, dict) else None
+            if not messages:
+                empty += 1
+                continue
+            skipped += len(messages)
+            logger.debug("接受到 {} 条消息", len(messages))
+        return skipped
+
+    async def _run(self):
+        while self._running:
+            try:
+                ok, data = await self.bot.sync_message()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.on_error:
+                    try:
+                        await _maybe_await(self.on_error(e))
+                    except Exception as callback_error:
+                        logger.error(f"处理同步异常失败: {callback_error}")
+                self.interval = 0.0
+                await asyncio.sleep(self.error_interval)
+                continue
+
+            self.sync_count += 1
+            if self.on_result:
+                try:
+                    await _maybe_await(self.on_result(ok, data))
+                except Exception as e:
+                    logger.error(f"处理同步结果失败: {e}")
+
+            messages = data.get("AddMsgs") if isinstance(data, dict) else None
+            if messages:
+                for message in messages:
+                    await self.put(message)
+            else:
+                self.empty_count += 1
+
+            self.interval = self._next_interval(bool(messages))
+            # 有消息时也让出一次事件循环，避免饿死其他任务
+            await asyncio.sleep(self.interval)
+
+
+class PushIntake(MessageIntake):
+    """推送接收
+
+    启动一个HTTP回调服务，接收与 wx849_callback_daemon 相同格式的推送。
+    请求体可以是单条消息、消息数组或 ``{"messages": [...]}``。
+
+    Args:
+        queue: 消息队列
+        host (str): 监听地址
+        port (int): 监听端口
+        path (str): 回调路径
+        key (str): 回调密钥，非空时要求请求头 ``Authorization: Bearer <key>``
+        dedup_size (int): 按消息ID去重的窗口大小
+    """
+
+    def __init__(self, queue, host: str = "127.0.0.1", port: int = 8089,
+                 path: str = "/wx849/callback", key: str = "", dedup_size: int = 2048):
+        super().__init__(queue)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.key = key
+        self.dedup_size = dedup_size
+        self.duplicated = 0
+        self._seen: OrderedDict = OrderedDict()
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self._running = True
+        logger.success(f"消息推送接收已启动: http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        self._running = False
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.key and request.headers.get("Authorization", "") != f"Bearer {self.key}":
+            return web.json_response({"success": False, "message": "unauthorized"}, status=401)
+
+        try:
+            payload = await request.json()
+        except Exception:
+            return web.json_response({"success": False, "message": "invalid json"}, status=400)
+
+        if isinstance(payload, dict) and isinstance(payload.get("messages"), list):
+            messages = payload["messages"]
+        elif isinstance(payload, list):
+            messages = payload
+        else:
+            messages = [payload]
+
+        accepted = 0
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            if self._is_duplicate(message):
+                self.duplicated += 1
+                continue
+            await self.put(normalize_message(message))
+            accepted += 1
+
+        return web.json_response({"success": True, "accepted": accepted})
+
+    def _is_duplicate(self, message: Dict[str, Any]) -> bool:
+        msg_id = message.get("NewMsgId") or message.get("MsgId")
+        if not msg_id:
+            return False
+        if msg_id in self._seen:
+            self._seen.move_to_end(msg_id)
+            return True
+        self._seen[msg_id] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+
+def normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """将推送的消息转换为 sync_message 的 AddMsgs 格式"""
+    for field in ("Content", "FromUserName", "ToUserName"):
+        value = message.get(field)
+        if value is not None and not isinstance(value, dict):
+            message[field] = {"string": str(value)}
+
+    if "FromUserName" not in message and message.get("FromWxid"):
+        message["FromUserName"] = {"string": message["FromWxid"]}
+    if "ToWxid" not in message and "ToUserName" in message:
+        message["ToWxid"] = message["ToUserName"]
+
+    # 群聊文本消息的Content需要带上发送人前缀
+    from_wxid = message.get("FromUserName", {}).get("string", "")
+    sender = message.get("SenderWxid")
+    content = message.get("Content")
+    if (from_wxid.endswith("@chatroom") and sender and isinstance(content, dict)
+            and not content.get("string", "").startswith(f"{sender}:\n")):
+        content["string"] = f"{sender}:\n{content.get('string', '')}"
+
+    return message
+
+
+def create_intake(bot, queue, config: Dict[str, Any],
+                  on_result: Callable[[bool, Any], Any] = None,
+                  on_error: Callable[[Exception], Any] = None) -> MessageIntake:
+    """根据 [MessageIntake] 配置创建消息接收层
+
+    Args:
+        bot: WechatAPI客户端
+        queue: 消息队列
+        config (dict): main_config.toml 中的 [MessageIntake] 配置
+        on_result (Callable): 轮询模式下每次同步完成后的回调
+        on_error (Callable): 轮询模式下同步失败的回调
+
+    Returns:
+        MessageIntake: 消息接收层实例
+    """
+    mode = config.get("mode", "poll")
+    if mode == "push":
+        return PushIntake(queue,
+                          host=config.get("push-host", "127.0.0.1"),
+                          port=config.get("push-port", 8089),
+                          path=config.get("push-path", "/wx849/callback"),
+                          key=config.get("push-key", ""))
+
+    if mode != "poll":
+        logger.warning(f"未知的消息接收模式: {mode}，使用poll模式")
+    return PollingIntake(bot, queue,
+                         min_interval=config.get("poll-min-interval", 0.1),
+                         max_interval=config.get("poll-max-interval", 1.0),
+                         backoff_factor=config.get("poll-backoff-factor", 2.0),
+                         error_interval=config.get("poll-error-interval", 5.0),
+                         on_result=on_result,
+                         on_error=on_error)
+
+
+async def _maybe_await(result):
+    if asyncio.iscoroutine(result):
+        await result
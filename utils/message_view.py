@@ -0,0 +1,86 @@
+"""
+只读消息视图
+EventManager 分发事件时，每条消息只冻结一次，所有处理函数共享冻结后的嵌套内容，
+不再为每个处理函数深拷贝整条消息
+"""
+
+from typing import Any
+
+
+class _ReadOnlyMixin:
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(
+            f"{type(self).__name__} 是只读的。如果处理函数需要修改消息中的嵌套内容，"
+            f"请在事件装饰器中设置 mutable=True，或先 copy.deepcopy 一份")
+
+    def __copy__(self):
+        return thaw(self, deep=False)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+class FrozenDict(_ReadOnlyMixin, dict):
+    """只读字典，仍是 dict 的子类，可以正常 isinstance 判断和 json 序列化"""
+
+    __setitem__ = __delitem__ = _ReadOnlyMixin._readonly
+    clear = pop = popitem = setdefault = update = _ReadOnlyMixin._readonly
+    __ior__ = _ReadOnlyMixin._readonly
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(_ReadOnlyMixin, list):
+    """只读列表，仍是 list 的子类"""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _ReadOnlyMixin._readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _ReadOnlyMixin._readonly
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    """递归冻结容器，字符串、数字等不可变对象原样共享"""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        frozen = FrozenDict()
+        for key, item in value.items():
+            dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, (list, tuple)):
+        items = [freeze(item) for item in value]
+        if isinstance(value, tuple):
+            return tuple(items)
+        frozen = FrozenList()
+        list.extend(frozen, items)
+        return frozen
+    if isinstance(value, set):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any, deep: bool = True) -> Any:
+    """将冻结的容器还原为普通的 dict / list"""
+    if isinstance(value, dict):
+        if not deep:
+            return dict(value)
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if not deep:
+            return list(value)
+        return [thaw(item) for item in value]
+    if isinstance(value, tuple) and deep:
+        return tuple(thaw(item) for item in value)
+    return value
+
+
+def message_view(frozen_message: FrozenDict) -> dict:
+    """为单个处理函数创建消息视图
+
+    顶层是普通 dict 的浅拷贝，处理函数可以增删改顶层字段而不影响其他处理函数；
+    嵌套的 dict / list 是共享的只读对象。
+    """
+    return dict(frozen_message)
@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import List
 
 from loguru import logger
 
@@ -14,6 +15,10 @@ class PluginBase(ABC):
     version: str = "1.0.0"
     is_ai_platform: bool = False  # 标记是否为AI平台插件
 
+    # 启动初始化
+    dependencies: List[str] = []  # 需要先初始化完成的插件类名
+    critical: bool = True  # 为 False 时在机器人就绪后再后台初始化
+
     def __init__(self):
         self.enabled = False
         self._scheduled_jobs = set()
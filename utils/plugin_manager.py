@@ -1,17 +1,20 @@
+import asyncio
 import importlib
 import inspect
-import os
 import sys
+import time
 import tomllib
 import traceback
 import ast
-from typing import Dict, Type, List, Union
+from typing import Dict, Type, List, Union, Optional
 
 from loguru import logger
 
 from WechatAPI import WechatAPIClient
+from .config_service import get_config_service
 from .event_manager import EventManager
 from .plugin_base import PluginBase
+from .plugin_manifest import PluginManifest
 
 
 class PluginManager:
@@ -19,6 +22,17 @@ class PluginManager:
         self.plugins: Dict[str, PluginBase] = {}
         self.plugin_classes: Dict[str, Type[PluginBase]] = {}
         self.plugin_info: Dict[str, dict] = {}  # 新增：存储所有插件信息
+        self.manifest = PluginManifest()  # 插件类所在模块的清单，禁用的插件不导入
+        self._module_stamps: Dict[str, list] = {}  # 模块名 -> 导入时 main.py 的修改时间和大小
+
+        # 启动初始化
+        self.init_timeout: float = 30  # 单个插件 on_enable + async_init 的超时时间(秒)，不大于0时不限制
+        self.init_concurrency: int = 8  # 同时初始化的插件数
+        self.background_plugins: List[str] = []  # 机器人就绪后再初始化的插件，插件类也可以声明 critical = False
+        self._background_classes: List[Type[PluginBase]] = []
+        self._background_task: Optional[asyncio.Task] = None
+        self._profile: Dict[str, dict] = {}  # 插件类名 -> 最近一次加载各阶段的耗时
+        self._startup: Dict[str, Optional[float]] = {"load_ms": None, "background_ms": None}
 
         # 默认将 excluded_plugins 初始化为空列表
         self.excluded_plugins: List[str] = []
@@ -85,42 +99,230 @@ class PluginManager:
         
         
 
+    def configure_startup(self, init_timeout: float = None, init_concurrency: int = None,
+                          background_plugins: List[str] = None):
+        """配置插件启动初始化
+
+        Args:
+            init_timeout: 单个插件 on_enable + async_init 的超时时间(秒)，不大于0时不限制
+            init_concurrency: 同时初始化的插件数
+            background_plugins: 机器人就绪后再在后台初始化的插件类名
+        """
+        if init_timeout is not None:
+            self.init_timeout = init_timeout
+        if init_concurrency is not None:
+            self.init_concurrency = max(1, init_concurrency)
+        if background_plugins is not None:
+            self.background_plugins = [str(name) for name in background_plugins]
+
     async def load_plugin(self, bot: WechatAPIClient, plugin_class: Type[PluginBase],
                           is_disabled: bool = False) -> bool:
         """加载单个插件，接受Type[PluginBase]"""
-        try:
-            plugin_name = plugin_class.__name__
+        plugin_name = plugin_class.__name__
 
-            # 防止重复加载插件
-            if plugin_name in self.plugins:
-                return False
+        # 防止重复加载插件
+        if plugin_name in self.plugins:
+            return False
 
-            # 记录插件信息，即使插件被禁用也会记录
-            self.plugin_info[plugin_name] = {
-                "name": plugin_name,
-                "description": plugin_class.description,
-                "author": plugin_class.author,
-                "version": plugin_class.version,
-                "enabled": False,
-                "class": plugin_class,
-                "is_ai_platform": getattr(plugin_class, 'is_ai_platform', False)  # 检查是否为AI平台插件
-            }
+        # 记录插件信息，即使插件被禁用也会记录
+        self._record_class_info(plugin_class)
 
-            # 如果插件被禁用则不加载
-            if is_disabled:
-                return False
+        # 如果插件被禁用则不加载
+        if is_disabled:
+            return False
+
+        error = await self._wait_dependencies(plugin_class, {}, {})
+        if error:
+            logger.error(f"插件 {plugin_name} 未加载: {error}")
+            self._profile_entry(plugin_name).update(status="failed", error=error)
+            return False
 
+        plugin = await self._start_plugin(bot, plugin_class)
+        if plugin is None:
+            return False
+        self._activate(plugin)
+        return True
+
+    def _record_class_info(self, plugin_class: Type[PluginBase]):
+        self.plugin_info[plugin_class.__name__] = {
+            "name": plugin_class.__name__,
+            "description": plugin_class.description,
+            "author": plugin_class.author,
+            "version": plugin_class.version,
+            "enabled": False,
+            "class": plugin_class,
+            "is_ai_platform": getattr(plugin_class, 'is_ai_platform', False)  # 检查是否为AI平台插件
+        }
+
+    async def _start_plugin(self, bot: WechatAPIClient, plugin_class: Type[PluginBase]) -> Optional[PluginBase]:
+        """创建插件实例并完成 on_enable 和 async_init，失败或超时返回 None，此时还没有绑定事件"""
+        plugin_name = plugin_class.__name__
+        profile = self._profile_entry(plugin_name)
+        profile.update(status="initializing", construct_ms=None, enable_ms=None, init_ms=None, error=None)
+        plugin = None
+        try:
+            start = time.perf_counter()
             plugin = plugin_class()
-            EventManager.bind_instance(plugin)
-            await plugin.on_enable(bot)
-            await plugin.async_init()
-            self.plugins[plugin_name] = plugin
-            self.plugin_classes[plugin_name] = plugin_class
-            self.plugin_info[plugin_name]["enabled"] = True
-            return True
-        except:
+            profile["construct_ms"] = _elapsed_ms(start)
+            start = time.perf_counter()
+            if self.init_timeout and self.init_timeout > 0:
+                await asyncio.wait_for(self._enable_plugin(bot, plugin, profile), self.init_timeout)
+            else:
+                await self._enable_plugin(bot, plugin, profile)
+        except asyncio.TimeoutError:
+            # 超时的阶段记为已等待的时间
+            stage = "init_ms" if profile["enable_ms"] is not None else "enable_ms"
+            profile[stage] = round(_elapsed_ms(start) - (profile["enable_ms"] or 0), 1)
+            profile.update(status="timeout", error=f"初始化超过 {self.init_timeout} 秒")
+            logger.error(f"插件 {plugin_name} 初始化超过 {self.init_timeout} 秒，已放弃加载")
+        except Exception as e:
+            profile.update(status="failed", error=str(e) or type(e).__name__)
             logger.error(f"加载插件时发生错误: {traceback.format_exc()}")
-            return False
+        else:
+            profile["status"] = "ready"
+            return plugin
+
+        if plugin is not None:
+            # 移除 on_enable 中已经添加的定时任务
+            try:
+                await plugin.on_disable()
+            except Exception as e:
+                logger.warning(f"清理插件 {plugin_name} 失败: {e}")
+        return None
+
+    @staticmethod
+    async def _enable_plugin(bot: WechatAPIClient, plugin: PluginBase, profile: dict):
+        start = time.perf_counter()
+        await plugin.on_enable(bot)
+        profile["enable_ms"] = _elapsed_ms(start)
+        start = time.perf_counter()
+        await plugin.async_init()
+        profile["init_ms"] = _elapsed_ms(start)
+
+    def _activate(self, plugin: PluginBase):
+        """初始化完成后再绑定事件，未初始化完的插件不会收到消息"""
+        plugin_name = type(plugin).__name__
+        EventManager.bind_instance(plugin)
+        self.plugins[plugin_name] = plugin
+        self.plugin_classes[plugin_name] = type(plugin)
+        self.plugin_info[plugin_name]["enabled"] = True
+
+    async def _start_plugins(self, bot: WechatAPIClient, plugin_classes: List[Type[PluginBase]],
+                             activate_in_order: bool = True) -> List[str]:
+        """并发初始化一批插件，声明了 dependencies 的插件等依赖初始化完成后再开始
+
+        Args:
+            activate_in_order: 为 True 时全部完成后按列表顺序绑定事件，同优先级处理函数的顺序与逐个加载时相同；
+                为 False 时每个插件初始化完成后立即绑定
+
+        Returns:
+            List[str]: 加载成功的插件类名，按列表顺序
+        """
+        by_name = {cls.__name__: cls for cls in plugin_classes}
+        done = {name: asyncio.Event() for name in by_name}
+        started: Dict[str, Optional[PluginBase]] = {}
+        cyclic = _dependency_cycles(by_name)
+        semaphore = asyncio.Semaphore(self.init_concurrency)
+
+        async def start(name: str):
+            try:
+                error = "存在循环依赖" if name in cyclic else await self._wait_dependencies(by_name[name], done, started)
+                if error:
+                    logger.error(f"插件 {name} 未加载: {error}")
+                    self._profile_entry(name).update(status="failed", error=error)
+                    started[name] = None
+                    return
+                async with semaphore:
+                    started[name] = await self._start_plugin(bot, by_name[name])
+                if started[name] is not None and not activate_in_order:
+                    self._activate(started[name])
+            finally:
+                done[name].set()
+
+        await asyncio.gather(*(start(name) for name in by_name))
+
+        loaded = []
+        for name in by_name:
+            plugin = started.get(name)
+            if plugin is None:
+                continue
+            if activate_in_order:
+                self._activate(plugin)
+            loaded.append(name)
+        return loaded
+
+    async def _wait_dependencies(self, plugin_class: Type[PluginBase], done: Dict[str, asyncio.Event],
+                                 started: Dict[str, Optional[PluginBase]]) -> Optional[str]:
+        for dependency in getattr(plugin_class, "dependencies", None) or []:
+            if dependency in done:
+                await done[dependency].wait()
+                if started.get(dependency) is None:
+                    return f"依赖的插件 {dependency} 加载失败"
+            elif dependency not in self.plugins:
+                return f"依赖的插件 {dependency} 未启用"
+        return None
+
+    def _split_background(self, plugin_classes: List[Type[PluginBase]]) -> tuple[list, list]:
+        """拆分出可以在就绪后初始化的插件，被立即初始化的插件依赖的插件仍然立即初始化"""
+        by_name = {cls.__name__: cls for cls in plugin_classes}
+        background = {name for name, cls in by_name.items()
+                      if not getattr(cls, "critical", True) or name in self.background_plugins}
+        pending = [name for name in by_name if name not in background]
+        while pending:
+            for dependency in getattr(by_name[pending.pop()], "dependencies", None) or []:
+                if dependency in background:
+                    background.discard(dependency)
+                    pending.append(dependency)
+        return ([cls for name, cls in by_name.items() if name not in background],
+                [cls for name, cls in by_name.items() if name in background])
+
+    def start_background_plugins(self, bot: WechatAPIClient) -> Optional[asyncio.Task]:
+        """机器人就绪后在后台初始化非关键插件，每个插件初始化完成后立即开始接收消息"""
+        plugin_classes, self._background_classes = self._background_classes, []
+        if not plugin_classes:
+            return None
+
+        async def run():
+            start = time.perf_counter()
+            loaded = await self._start_plugins(bot, plugin_classes, activate_in_order=False)
+            self._startup["background_ms"] = _elapsed_ms(start)
+            logger.success(f"后台初始化插件完成，耗时 {self._startup['background_ms']:.0f} ms: {loaded}")
+
+        self._background_task = asyncio.create_task(run())
+        return self._background_task
+
+    def _profile_entry(self, plugin_name: str) -> dict:
+        entry = self._profile.get(plugin_name)
+        if entry is None:
+            entry = self._profile[plugin_name] = {
+                "name": plugin_name,
+                "import_ms": None,
+                "construct_ms": None,
+                "enable_ms": None,
+                "init_ms": None,
+                "status": "pending",
+                "background": False,
+                "error": None,
+            }
+        return entry
+
+    def get_startup_profile(self) -> dict:
+        """获取插件最近一次加载的导入、创建实例、on_enable 和 async_init 耗时，按总耗时从高到低排列"""
+        plugins = []
+        for entry in self._profile.values():
+            item = dict(entry)
+            item["total_ms"] = round(sum(entry[key] or 0 for key in ("import_ms", "construct_ms", "enable_ms", "init_ms")), 1)
+            plugins.append(item)
+        plugins.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "load_ms": self._startup["load_ms"],
+            "background_ms": self._startup["background_ms"],
+            "background_pending": sum(1 for item in plugins
+                                      if item["background"] and item["status"] in ("pending", "initializing")),
+            "init_timeout": self.init_timeout,
+            "init_concurrency": self.init_concurrency,
+            "plugins": plugins,
+        }
 
     async def unload_plugin(self, plugin_name: str, add_to_excluded: bool = False) -> bool:
         """卸载单个插件
@@ -159,37 +361,144 @@ class PluginManager:
             logger.error(f"卸载插件 {plugin_name} 时发生错误: {traceback.format_exc()}")
             return False
 
-    async def load_plugins_from_directory(self, bot: WechatAPIClient, load_disabled_plugin: bool = True) -> List[str]:
-        """从plugins目录批量加载插件"""
-        loaded_plugins = []
-        failed_plugins = []
+    async def load_plugins_from_directory(self, bot: WechatAPIClient, load_disabled_plugin: bool = True,
+                                          defer_background: bool = False) -> List[str]:
+        """从plugins目录批量加载插件
 
-        for dirname in os.listdir("plugins"):
-            if os.path.isdir(f"plugins/{dirname}") and os.path.exists(f"plugins/{dirname}/main.py"):
-                try:
-                    module = importlib.import_module(f"plugins.{dirname}.main")
-                    for name, obj in inspect.getmembers(module):
-                        if inspect.isclass(obj) and issubclass(obj, PluginBase) and obj != PluginBase:
-                            is_disabled = False
-                            if not load_disabled_plugin:
-                                is_disabled = obj.__name__ in self.excluded_plugins
-
-                            if await self.load_plugin(bot, obj, is_disabled=is_disabled):
-                                loaded_plugins.append(obj.__name__)
-
-                except Exception as e:
-                    logger.error(f"加载 {dirname} 时发生错误: {traceback.format_exc()}")
-                    failed_plugins.append(dirname)
-                    # 继续加载其他插件而不是返回False
-                    continue
+        Args:
+            bot: 机器人实例
+            load_disabled_plugin: 为 False 时禁用的插件不导入，只记录清单中的信息
+            defer_background: 为 True 时非关键插件留到 start_background_plugins 再初始化
+
+        Returns:
+            List[str]: 已加载的插件类名，不含留到后台初始化的插件
+        """
+        loaded_plugins, failed_plugins = await self._load_from_manifest(bot, load_disabled_plugin, defer_background)
 
         if failed_plugins:
             logger.warning(f"以下插件加载失败: {', '.join(failed_plugins)}，但不影响其他插件的加载")
-            
+
         return loaded_plugins
 
+    async def _load_from_manifest(self, bot: WechatAPIClient, load_disabled_plugin: bool,
+                                  defer_background: bool = False) -> tuple[List[str], List[str]]:
+        start = time.perf_counter()
+        failed_plugins = []
+        plugin_classes = []
+        import_times = {}
+
+        for info in self.manifest.classes():
+            if info["name"] in self.plugins:
+                continue
+            is_disabled = not load_disabled_plugin and info["name"] in self.excluded_plugins
+            if is_disabled:
+                self._record_manifest_info(info)
+                continue
+            try:
+                plugin_class, import_time = self._import_plugin_class(info)
+            except Exception:
+                logger.error(f"加载 {info['dirname']} 时发生错误: {traceback.format_exc()}")
+                failed_plugins.append(info["dirname"])
+                continue
+            if import_time is not None:
+                import_times[info["name"]] = import_time
+            plugin_classes.append(plugin_class)
+
+        # 清单中找不到插件类的目录（语法错误，或基类定义在其他模块）按原来的方式导入后查找
+        for entry in self.manifest.refresh():
+            if entry["classes"]:
+                continue
+            try:
+                module = self._import_module(entry["module"], entry["stamp"])
+                for name, obj in inspect.getmembers(module):
+                    if (inspect.isclass(obj) and issubclass(obj, PluginBase) and obj != PluginBase
+                            and obj.__name__ not in self.plugins):
+                        self._record_class_info(obj)
+                        if load_disabled_plugin or obj.__name__ not in self.excluded_plugins:
+                            plugin_classes.append(obj)
+            except Exception:
+                logger.error(f"加载 {entry['dirname']} 时发生错误: {traceback.format_exc()}")
+                failed_plugins.append(entry["dirname"])
+
+        if import_times:
+            ranked = sorted(import_times.items(), key=lambda item: item[1], reverse=True)
+            logger.info("插件导入耗时 {:.0f} ms: {}", sum(import_times.values()) * 1000,
+                        ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in ranked))
+
+        for plugin_class in plugin_classes:
+            self._record_class_info(plugin_class)
+            import_time = import_times.get(plugin_class.__name__)
+            self._profile_entry(plugin_class.__name__).update(
+                import_ms=round(import_time * 1000, 1) if import_time is not None else None,
+                status="pending", background=False)
+
+        background = []
+        if defer_background:
+            plugin_classes, background = self._split_background(plugin_classes)
+            for plugin_class in background:
+                self._profile_entry(plugin_class.__name__)["background"] = True
+            self._background_classes = background
+
+        loaded_plugins = await self._start_plugins(bot, plugin_classes)
+        self._startup["load_ms"] = _elapsed_ms(start)
+        # failed_plugins 记录导入失败的插件目录，初始化失败的插件类单独记录
+        init_failed = [cls.__name__ for cls in plugin_classes if cls.__name__ not in loaded_plugins]
+        if init_failed:
+            logger.warning(f"以下插件初始化失败: {', '.join(init_failed)}，但不影响其他插件的加载")
+
+        init_times = {cls.__name__: sum(self._profile[cls.__name__][key] or 0
+                                        for key in ("construct_ms", "enable_ms", "init_ms"))
+                      for cls in plugin_classes}
+        slowest = sorted(init_times.items(), key=lambda item: item[1], reverse=True)[:5]
+        logger.info("插件加载耗时 {:.0f} ms，初始化最慢: {}", self._startup["load_ms"],
+                    ", ".join(f"{name} {ms:.0f}ms" for name, ms in slowest) or "无")
+        if background:
+            logger.info(f"以下插件将在机器人就绪后初始化: {[cls.__name__ for cls in background]}")
+        return loaded_plugins, failed_plugins
+
+    def _import_module(self, module_name: str, stamp: list):
+        """导入插件模块，已导入且文件修改过时重新加载"""
+        module = sys.modules.get(module_name)
+        if module is None:
+            module = importlib.import_module(module_name)
+        elif self._module_stamps.get(module_name) != stamp:
+            module = importlib.reload(module)
+        self._module_stamps[module_name] = stamp
+        return module
+
+    def _import_plugin_class(self, info: dict) -> tuple[Type[PluginBase], Optional[float]]:
+        """按清单信息导入插件类
+
+        Returns:
+            (插件类, 导入耗时秒数，模块已导入且未修改时为None)
+        """
+        module_name = info["module"]
+        reused = module_name in sys.modules and self._module_stamps.get(module_name) == info["stamp"]
+        start = time.perf_counter()
+        module = self._import_module(module_name, info["stamp"])
+        import_time = None if reused else time.perf_counter() - start
+
+        plugin_class = getattr(module, info["name"], None)
+        if not (inspect.isclass(plugin_class) and issubclass(plugin_class, PluginBase)):
+            raise ImportError(f"{module_name} 中没有插件类 {info['name']}")
+        return plugin_class, import_time
+
+    def _record_manifest_info(self, info: dict):
+        """记录未导入的插件的信息，供管理后台显示"""
+        if info["name"] in self.plugins:
+            return
+        self.plugin_info[info["name"]] = {
+            "name": info["name"],
+            "description": info["description"],
+            "author": info["author"],
+            "version": info["version"],
+            "enabled": False,
+            "class": None,  # 禁用的插件不导入，启用时再从清单中找到所在模块
+            "is_ai_platform": info["is_ai_platform"],
+        }
+
     async def load_plugin_from_directory(self, bot: WechatAPIClient, plugin_name: str) -> bool:
-        """从plugins目录加载单个插件
+        """从plugins目录加载单个插件，只导入该插件所在的模块
 
         Args:
             bot: 机器人实例
@@ -198,49 +507,39 @@ class PluginManager:
         Returns:
             bool: 是否成功加载插件
         """
-        found = False
-        for dirname in os.listdir("plugins"):
-            try:
-                if os.path.isdir(f"plugins/{dirname}") and os.path.exists(f"plugins/{dirname}/main.py"):
-                    module = importlib.import_module(f"plugins.{dirname}.main")
-                    importlib.reload(module)
-
-                    for name, obj in inspect.getmembers(module):
-                        if (inspect.isclass(obj) and
-                                issubclass(obj, PluginBase) and
-                                obj != PluginBase and
-                                obj.__name__ == plugin_name):
-                            found = True
-
-                            # 检查是否为AI平台插件
-                            is_ai_platform = getattr(obj, 'is_ai_platform', False)
-
-                            # 如果是AI平台插件，先禁用其他所有AI平台插件
-                            if is_ai_platform:
-                                logger.info(f"启用AI平台插件 {plugin_name}，将禁用其他AI平台插件")
-
-                                # 遍历已启用的插件，禁用其他AI平台插件
-                                for plugin in list(self.plugins):
-                                    if getattr(plugin.__class__, 'is_ai_platform', False) and plugin.__class__.__name__ != plugin_name:
-                                        logger.info(f"禁用AI平台插件: {plugin.__class__.__name__}")
-                                        await self.unload_plugin(plugin.__class__.__name__)
-
-                            # 如果插件在禁用列表中，将其移除
-                            if plugin_name in self.excluded_plugins:
-                                self.excluded_plugins.remove(plugin_name)
-                                # 保存禁用插件列表到配置文件
-                                self._save_disabled_plugins_to_config()
-                                logger.info(f"将插件 {plugin_name} 从禁用列表中移除并保存到配置文件")
-
-                            return await self.load_plugin(bot, obj)
-            except:
-                logger.error(f"检查 {dirname} 时发生错误: {traceback.format_exc()}")
-                continue
-
-        if not found:
+        info = self.manifest.find(plugin_name)
+        if info is None:
             logger.warning(f"未找到插件类 {plugin_name}")
             return False
 
+        try:
+            plugin_class, import_time = self._import_plugin_class(info)
+        except Exception:
+            logger.error(f"检查 {info['dirname']} 时发生错误: {traceback.format_exc()}")
+            return False
+        self._profile_entry(plugin_name).update(
+            import_ms=round(import_time * 1000, 1) if import_time is not None else None, background=False)
+        if import_time is not None:
+            logger.info("插件 {} 导入耗时 {:.0f} ms", plugin_name, import_time * 1000)
+
+        # 如果是AI平台插件，先禁用其他所有AI平台插件
+        if getattr(plugin_class, 'is_ai_platform', False):
+            logger.info(f"启用AI平台插件 {plugin_name}，将禁用其他AI平台插件")
+
+            # 遍历已启用的插件，禁用其他AI平台插件
+            for name, plugin in list(self.plugins.items()):
+                if getattr(plugin.__class__, 'is_ai_platform', False) and name != plugin_name:
+                    logger.info(f"禁用AI平台插件: {name}")
+                    await self.unload_plugin(name)
+
+        # 如果插件在禁用列表中，将其移除
+        if plugin_name in self.excluded_plugins:
+            self.excluded_plugins.remove(plugin_name)
+            # 保存禁用插件列表到配置文件
+            self._save_disabled_plugins_to_config()
+            logger.info(f"将插件 {plugin_name} 从禁用列表中移除并保存到配置文件")
+
+        return await self.load_plugin(bot, plugin_class)
 
     async def unload_all_plugins(self) -> tuple[List[str], List[str]]:
         """卸载所有插件"""
@@ -275,6 +574,9 @@ class PluginManager:
             # 重新导入模块
             module = importlib.import_module(module_name)
             importlib.reload(module)
+            info = self.manifest.find(plugin_name)
+            if info is not None and info["module"] == module_name:
+                self._module_stamps[module_name] = info["stamp"]
 
             # 从重新加载的模块中获取插件类
             for name, obj in inspect.getmembers(module):
@@ -315,25 +617,8 @@ class PluginManager:
                 if module_name.startswith('plugins.') and not module_name.endswith('ManagePlugin'):
                     del sys.modules[module_name]
 
-            # 从目录重新加载插件，不加载禁用的插件
-            loaded_plugins = []
-            failed_plugins = []
-            
-            # 从plugins目录批量加载插件
-            for dirname in os.listdir("plugins"):
-                if os.path.isdir(f"plugins/{dirname}") and os.path.exists(f"plugins/{dirname}/main.py"):
-                    try:
-                        module = importlib.import_module(f"plugins.{dirname}.main")
-                        for name, obj in inspect.getmembers(module):
-                            if inspect.isclass(obj) and issubclass(obj, PluginBase) and obj != PluginBase:
-                                is_disabled = obj.__name__ in self.excluded_plugins
-                                
-                                if not is_disabled and await self.load_plugin(bot, obj, is_disabled=is_disabled):
-                                    loaded_plugins.append(obj.__name__)
-                    except Exception as e:
-                        logger.error(f"重载插件 {dirname} 时发生错误: {traceback.format_exc()}")
-                        failed_plugins.append(dirname)
-                        continue
+            # 从目录重新加载插件，不导入禁用的插件
+            loaded_plugins, failed_plugins = await self._load_from_manifest(bot, load_disabled_plugin=False)
 
             if failed_plugins:
                 logger.warning(f"以下插件重载失败: {', '.join(failed_plugins)}，但不影响其他插件的加载")
@@ -389,6 +674,7 @@ class PluginManager:
             # 写回配置文件
             with open("main_config.toml", "wb") as f:
                 tomli_w.dump(config, f)
+            get_config_service().reload(force=True)
 
             logger.info(f"成功将禁用插件列表保存到配置文件: {self.excluded_plugins}")
         except Exception as e:
@@ -414,4 +700,22 @@ class PluginManager:
                 if info.get("is_ai_platform", False)]
 
 
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _dependency_cycles(by_name: Dict[str, Type[PluginBase]]) -> set:
+    """同一批插件中处在循环依赖上（或依赖循环中的插件）的插件类名"""
+    remaining = {name: {dependency for dependency in getattr(cls, "dependencies", None) or [] if dependency in by_name}
+                 for name, cls in by_name.items()}
+    while True:
+        resolved = [name for name, dependencies in remaining.items() if not dependencies]
+        if not resolved:
+            return set(remaining)
+        for name in resolved:
+            del remaining[name]
+        for dependencies in remaining.values():
+            dependencies.difference_update(resolved)
+
+
 plugin_manager = PluginManager()
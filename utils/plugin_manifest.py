@@ -0,0 +1,196 @@
+"""
+插件清单
+不导入插件模块，用 ast 解析 plugins/*/main.py 得到插件类名、模块路径、元数据和声明的事件；
+结果按文件修改时间和大小缓存到 resource/plugin_manifest.json，之后只重新解析有变化的文件
+"""
+
+import ast
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .plugin_base import PluginBase
+
+MANIFEST_VERSION = 1
+METADATA_FIELDS = ("description", "author", "version", "is_ai_platform")
+
+
+class PluginManifest:
+    """插件清单，记录每个插件类所在的模块，启用插件时只导入它自己的模块
+
+    Args:
+        plugins_dir (str): 插件目录
+        cache_path (str): 清单缓存文件
+    """
+
+    def __init__(self, plugins_dir: str = "plugins", cache_path: str = "resource/plugin_manifest.json"):
+        self.plugins_dir = plugins_dir
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None  # 目录名 -> 条目
+
+    def refresh(self) -> List[dict]:
+        """重新检查插件目录，只解析新增或修改过的 main.py
+
+        Returns:
+            List[dict]: 所有插件目录的条目，按目录顺序排列
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load_cache()
+            changed = False
+            entries = {}
+            for dirname in os.listdir(self.plugins_dir):
+                path = os.path.join(self.plugins_dir, dirname, "main.py")
+                if not os.path.isdir(os.path.join(self.plugins_dir, dirname)) or not os.path.exists(path):
+                    continue
+                stamp = _stamp(path)
+                entry = self._entries.get(dirname)
+                if entry is None or entry["stamp"] != stamp:
+                    entry = self._parse(dirname, path, stamp)
+                    changed = True
+                entries[dirname] = entry
+            if changed or entries.keys() != self._entries.keys():
+                self._entries = entries
+                self._save_cache()
+            return list(entries.values())
+
+    def find(self, class_name: str) -> Optional[dict]:
+        """按插件类名查找，返回类信息，其中 module 和 path 为所在模块
+
+        清单中没有或文件已修改时先刷新清单。
+        """
+        info = self._lookup(class_name)
+        if info is None or _stamp(info["path"]) != info["stamp"]:
+            self.refresh()
+            info = self._lookup(class_name)
+        return info
+
+    def classes(self) -> List[dict]:
+        """所有插件类的信息，类名重复时保留目录顺序中的第一个"""
+        result = {}
+        for entry in self.refresh():
+            for info in self._class_infos(entry):
+                if info["name"] in result:
+                    logger.warning("插件类 {} 重复定义，忽略 {}", info["name"], info["path"])
+                    continue
+                result[info["name"]] = info
+        return list(result.values())
+
+    def _lookup(self, class_name: str) -> Optional[dict]:
+        with self._lock:
+            entries = list(self._entries.values()) if self._entries is not None else None
+        if entries is None:
+            entries = self.refresh()
+        for entry in entries:
+            for info in self._class_infos(entry):
+                if info["name"] == class_name:
+                    return info
+        return None
+
+    @staticmethod
+    def _class_infos(entry: dict) -> List[dict]:
+        return [dict(cls, module=entry["module"], path=entry["path"], dirname=entry["dirname"], stamp=entry["stamp"])
+                for cls in entry["classes"]]
+
+    def _parse(self, dirname: str, path: str, stamp: list) -> dict:
+        entry = {
+            "dirname": dirname,
+            "module": f"{os.path.basename(os.path.normpath(self.plugins_dir))}.{dirname}.main",
+            "path": path,
+            "stamp": stamp,
+            "classes": [],
+            "error": None,
+        }
+        try:
+            with open(path, "rb") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError) as e:
+            entry["error"] = str(e)
+            return entry
+        entry["classes"] = _plugin_classes(tree)
+        return entry
+
+    def _load_cache(self) -> Dict[str, dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION and data.get("plugins_dir") == self.plugins_dir:
+                return data["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "plugins_dir": self.plugins_dir, "entries": self._entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"保存插件清单失败: {e}")
+
+
+def _stamp(path: str) -> list:
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return [0, -1]
+
+
+def _plugin_classes(tree: ast.Module) -> List[dict]:
+    """模块顶层直接或间接（同一文件内）继承 PluginBase 的类"""
+    class_defs = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    plugin_names = {"PluginBase"}
+    found = []
+    # 同一文件内的中间基类可能定义在插件类之后，重复扫描直到没有新的插件类
+    while True:
+        added = [node for node in class_defs
+                 if node.name not in plugin_names and any(_base_name(base) in plugin_names for base in node.bases)]
+        if not added:
+            break
+        plugin_names.update(node.name for node in added)
+        found.extend(added)
+    found.sort(key=lambda node: node.lineno)
+    return [_class_info(node) for node in found]
+
+
+def _base_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _class_info(node: ast.ClassDef) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"name": node.name}
+    for field in METADATA_FIELDS:
+        info[field] = getattr(PluginBase, field)
+
+    events, scheduled = set(), 0
+    for stmt in node.body:
+        if isinstance(stmt, (ast.Assign, ast.AnnAssign)):
+            targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id in METADATA_FIELDS and stmt.value is not None:
+                    try:
+                        info[target.id] = ast.literal_eval(stmt.value)
+                    except (ValueError, TypeError, SyntaxError):
+                        pass  # 不是常量的元数据在导入后从类上读取
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in stmt.decorator_list:
+                name = _base_name(decorator.func if isinstance(decorator, ast.Call) else decorator)
+                if name == "schedule":
+                    scheduled += 1
+                elif name and name.startswith("on_") and name.endswith("_message"):
+                    events.add(name[3:])
+    info["events"] = sorted(events)
+    info["scheduled"] = scheduled
+    return info
@@ -1,4 +1,3 @@
-import tomllib
 import xml.etree.ElementTree as ET
 from typing import Dict, Any
 import asyncio
@@ -15,8 +14,11 @@ from WechatAPI import WechatAPIClient
 from WechatAPI.Client.protect import protector
 from database.messsagDB import MessageDB
 from database.message_counter import get_instance as get_message_counter  # 导入消息计数器
-from database.contacts_db import update_contact_in_db, get_contact_from_db
+from utils.config_service import get_config_service
+from utils.contact_refresher import ContactRefresher
 from utils.event_manager import EventManager
+from utils.group_roster import init_roster_cache
+from utils.media_downloader import MediaCache, download_chunks
 
 # 获取消息计数器实例
 message_counter = get_message_counter()
@@ -41,21 +43,10 @@ class XYBot:
         import os
         logger.debug(f"当前工作目录: {os.getcwd()}")
 
-        # 检查配置文件是否存在
-        config_path = "main_config.toml"
-        if not os.path.exists(config_path):
-            logger.error(f"配置文件 {config_path} 不存在")
-            main_config = {}
-        else:
-            logger.debug(f"配置文件 {config_path} 存在，大小: {os.path.getsize(config_path)} 字节")
-            try:
-                with open(config_path, "rb") as f:
-                    main_config = tomllib.load(f)
-                    # 打印配置文件的所有键
-                    logger.debug(f"配置文件的所有键: {list(main_config.keys())}")
-            except Exception as e:
-                logger.error(f"加载配置文件失败: {e}")
-                main_config = {}
+        # 主配置只解析一次，之后读取快照；配置文件变化时刷新唤醒词设置
+        config_service = get_config_service()
+        main_config = config_service.snapshot()
+        logger.debug(f"配置文件的所有键: {list(main_config.keys())}")
 
         self.ignore_protection = main_config.get("XYBot", {}).get("ignore-protection", False)
 
@@ -64,6 +55,7 @@ class XYBot:
         self.group_wakeup_words = xybot_config.get("group-wakeup-words", ["bot"])
         self.enable_group_wakeup = xybot_config.get("enable-group-wakeup", True)
         logger.info(f"群聊唤醒词: {self.group_wakeup_words}, 启用状态: {self.enable_group_wakeup}")
+        config_service.subscribe(self._on_xybot_config_changed, sections=["XYBot"])
 
         # 从配置文件中读取消息过滤设置
         try:
@@ -93,6 +85,31 @@ class XYBot:
 
         self.msg_db = MessageDB()
 
+        # 图片按md5缓存在files目录，分段并发下载
+        self.image_cache = MediaCache(os.path.join(os.getcwd(), "files"))
+        self.image_download_concurrency = xybot_config.get("media-download-concurrency", 4)
+
+        # 群成员名单缓存，系统消息增量更新
+        self.roster_cache = init_roster_cache(self._fetch_chatroom_member_list,
+                                              ttl=xybot_config.get("group-roster-ttl", 600))
+
+        # 联系人刷新调度器，合并同一联系人的刷新请求并批量调用接口
+        self.contact_refresher = ContactRefresher(
+            self.bot,
+            stale_after=xybot_config.get("contact-refresh-window", 600),
+            rate=xybot_config.get("contact-refresh-rate", 2.0))
+
+        # 消息分发器，由bot_core在开始接收消息时设置
+        self.dispatcher = None
+
+    def _on_xybot_config_changed(self, main_config, changed):
+        """[XYBot] 配置段变化时刷新可以热更新的设置"""
+        xybot_config = main_config.get("XYBot", {})
+        self.ignore_protection = xybot_config.get("ignore-protection", False)
+        self.group_wakeup_words = xybot_config.get("group-wakeup-words", ["bot"])
+        self.enable_group_wakeup = xybot_config.get("enable-group-wakeup", True)
+        logger.info(f"群聊唤醒词已更新: {self.group_wakeup_words}, 启用状态: {self.enable_group_wakeup}")
+
     def update_profile(self, wxid: str, nickname: str, alias: str, phone: str):
         """更新机器人信息"""
         self.wxid = wxid
@@ -152,11 +169,12 @@ class XYBot:
         """
         return self.wxid is not None
 
-    async def get_chatroom_member_list(self, group_wxid: str):
-        """获取群成员列表
+    async def get_chatroom_member_list(self, group_wxid: str, refresh: bool = False):
+        """获取群成员列表，优先使用群成员名单缓存
 
         Args:
             group_wxid: 群聊的wxid
+            refresh: 忽略缓存，重新从微信API拉取
 
         Returns:
             list: 群成员列表
@@ -165,6 +183,17 @@ class XYBot:
             logger.error(f"无效的群ID: {group_wxid}，只有群聊才能获取成员列表")
             return []
 
+        return await self.roster_cache.get_members(group_wxid, refresh)
+
+    async def _fetch_chatroom_member_list(self, group_wxid: str):
+        """从微信API拉取群成员列表，失败时返回空列表
+
+        Args:
+            group_wxid: 群聊的wxid
+
+        Returns:
+            list: 群成员列表
+        """
         try:
             logger.info(f"开始获取群 {group_wxid} 的成员列表")
 
@@ -189,25 +218,14 @@ class XYBot:
 
                 # 如果没有显式设置，则根据协议版本确定
                 if api_prefix == "":
-                    # 读取协议版本配置
-                    try:
-                        import tomllib
-                        with open("main_config.toml", "rb") as f:
-                            config = tomllib.load(f)
-                            protocol_version = config.get("Protocol", {}).get("version", "849")
-
-                            # 根据协议版本选择前缀
-                            if protocol_version == "849":
-                                api_prefix = "/VXAPI"
-                                logger.info(f"使用849协议前缀: {api_prefix}")
-                            else:  # 855 或 ipad
-                                api_prefix = "/api"
-                                logger.info(f"使用{protocol_version}协议前缀: {api_prefix}")
-                    except Exception as e:
-                        logger.warning(f"读取协议版本失败，使用默认前缀: {e}")
-                        # 默认使用 849 的前缀
+                    protocol_version = str(get_config_service().get("Protocol", "version", "849"))
+                    # 根据协议版本选择前缀
+                    if protocol_version == "849":
                         api_prefix = "/VXAPI"
-                        logger.info(f"使用默认协议前缀: {api_prefix}")
+                        logger.info(f"使用849协议前缀: {api_prefix}")
+                    else:  # 855 或 ipad
+                        api_prefix = "/api"
+                        logger.info(f"使用{protocol_version}协议前缀: {api_prefix}")
 
                 # 获取当前登录的wxid
                 wxid = ""
@@ -217,7 +235,7 @@ class XYBot:
                 logger.info(f"使用API路径: {api_base}{api_prefix}/Group/GetChatRoomMemberDetail")
 
                 # 直接调用API获取群成员
-                async with aiohttp.ClientSession() as session:
+                async with self.bot.http_session() as session:
                     json_param = {"QID": group_wxid, "Wxid": wxid}
                     logger.info(f"发送请求参数: {json.dumps(json_param)}")
 
@@ -299,203 +317,7 @@ class XYBot:
             wxid: 联系人的wxid
         """
         try:
-            # 先检查数据库中是否已有该联系人的信息
-            existing_contact = get_contact_from_db(wxid)
-
-            # 如果数据库中没有该联系人的信息，或者信息不完整，则从 API 获取
-            if not existing_contact or not existing_contact.get('nickname'):
-                # 从 API 获取联系人信息
-                try:
-                    # 如果是群聊，不获取详细信息
-                    if wxid.endswith("@chatroom"):
-                        contact_info = {
-                            'wxid': wxid,
-                            'nickname': wxid,
-                            'type': 'group'
-                        }
-                        # 更新到数据库
-                        update_contact_in_db(contact_info)
-                        logger.debug(f"已在消息处理中更新群聊 {wxid} 的基本信息")
-                    else:
-                        # 获取联系人详细信息
-                        logger.debug(f"开始获取联系人 {wxid} 的详细信息")
-                        try:
-                            detail = await self.bot.get_contract_detail(wxid)
-                            logger.debug(f"获取到联系人 {wxid} 的详细信息: {detail}")
-
-                            if detail:
-                                # 处理返回结果
-                                if isinstance(detail, list) and len(detail) > 0:
-                                    detail_item = detail[0]
-                                    logger.debug(f"联系人 {wxid} 详情项类型: {type(detail_item)}")
-
-                                    if isinstance(detail_item, dict):
-                                        # 记录详细的字段信息，帮助调试
-                                        logger.debug(f"联系人 {wxid} 详情字段: {list(detail_item.keys())}")
-
-                                        # 检查nickname字段的类型和值
-                                        nickname_value = detail_item.get('nickname')
-                                        if nickname_value is None:
-                                            # 尝试其他可能的字段名
-                                            nickname_value = detail_item.get('NickName')
-                                            if nickname_value is None:
-                                                logger.warning(f"联系人 {wxid} 没有找到nickname或NickName字段")
-                                            else:
-                                                logger.debug(f"联系人 {wxid} 使用NickName字段: {nickname_value}")
-                                        else:
-                                            logger.debug(f"联系人 {wxid} 使用nickname字段: {nickname_value}")
-
-                                        # 如果nickname是字典类型，尝试获取其中的string字段
-                                        if isinstance(nickname_value, dict):
-                                            logger.debug(f"联系人 {wxid} 的nickname是字典类型: {nickname_value}")
-                                            nickname_string = nickname_value.get('string')
-                                            if nickname_string:
-                                                nickname_value = nickname_string
-                                                logger.debug(f"从字典中提取nickname.string: {nickname_string}")
-
-                                        # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
-                                        avatar_value = detail_item.get('BigHeadImgUrl', '')
-                                        if not avatar_value:
-                                            avatar_value = detail_item.get('SmallHeadImgUrl', '')
-                                        if not avatar_value:
-                                            # 如果没有直接的URL，尝试使用avatar字段
-                                            avatar_value = detail_item.get('avatar', '')
-                                            if isinstance(avatar_value, dict):
-                                                avatar_value = avatar_value.get('string', '')
-
-                                        logger.debug(f"联系人 {wxid} 的头像地址: {avatar_value}")
-
-                                        # 处理备注字段
-                                        remark_value = detail_item.get('remark', '')
-                                        if remark_value is None or not remark_value:
-                                            remark_value = detail_item.get('Remark', '')
-                                        if isinstance(remark_value, dict):
-                                            remark_value = remark_value.get('string', '')
-
-                                        # 处理微信号字段
-                                        alias_value = detail_item.get('alias', '')
-                                        if alias_value is None or not alias_value:
-                                            alias_value = detail_item.get('Alias', '')
-                                        if isinstance(alias_value, dict):
-                                            alias_value = alias_value.get('string', '')
-
-                                        # 构建联系人信息
-                                        contact_info = {
-                                            'wxid': wxid,
-                                            'nickname': nickname_value if nickname_value else wxid,
-                                            'avatar': avatar_value,
-                                            'remark': remark_value,
-                                            'alias': alias_value
-                                        }
-                                        logger.debug(f"解析联系人 {wxid} 详情成功: {contact_info}")
-                                    else:
-                                        logger.warning(f"联系人 {wxid} 详情格式不是字典: {detail_item}")
-                                        # 创建基本联系人信息
-                                        contact_info = {
-                                            'wxid': wxid,
-                                            'nickname': wxid,
-                                            'type': 'friend'
-                                        }
-                                elif isinstance(detail, dict):
-                                    # 记录详细的字段信息，帮助调试
-                                    logger.debug(f"联系人 {wxid} 详情字段(字典格式): {list(detail.keys())}")
-
-                                    # 检查nickname字段的类型和值
-                                    nickname_value = detail.get('nickname')
-                                    if nickname_value is None:
-                                        # 尝试其他可能的字段名
-                                        nickname_value = detail.get('NickName')
-                                        if nickname_value is None:
-                                            logger.warning(f"联系人 {wxid} 没有找到nickname或NickName字段")
-                                        else:
-                                            logger.debug(f"联系人 {wxid} 使用NickName字段: {nickname_value}")
-                                    else:
-                                        logger.debug(f"联系人 {wxid} 使用nickname字段: {nickname_value}")
-
-                                    # 如果nickname是字典类型，尝试获取其中的string字段
-                                    if isinstance(nickname_value, dict):
-                                        logger.debug(f"联系人 {wxid} 的nickname是字典类型: {nickname_value}")
-                                        nickname_string = nickname_value.get('string')
-                                        if nickname_string:
-                                            nickname_value = nickname_string
-                                            logger.debug(f"从字典中提取nickname.string: {nickname_string}")
-
-                                    # 处理头像字段 - 优先使用BigHeadImgUrl或SmallHeadImgUrl
-                                    avatar_value = detail.get('BigHeadImgUrl', '')
-                                    if not avatar_value:
-                                        avatar_value = detail.get('SmallHeadImgUrl', '')
-                                    if not avatar_value:
-                                        # 如果没有直接的URL，尝试使用avatar字段
-                                        avatar_value = detail.get('avatar', '')
-                                        if isinstance(avatar_value, dict):
-                                            avatar_value = avatar_value.get('string', '')
-
-                                    logger.debug(f"联系人 {wxid} 的头像地址(字典格式): {avatar_value}")
-
-                                    # 处理备注字段
-                                    remark_value = detail.get('remark', '')
-                                    if remark_value is None or not remark_value:
-                                        remark_value = detail.get('Remark', '')
-                                    if isinstance(remark_value, dict):
-                                        remark_value = remark_value.get('string', '')
-
-                                    # 处理微信号字段
-                                    alias_value = detail.get('alias', '')
-                                    if alias_value is None or not alias_value:
-                                        alias_value = detail.get('Alias', '')
-                                    if isinstance(alias_value, dict):
-                                        alias_value = alias_value.get('string', '')
-
-                                    # 构建联系人信息
-                                    contact_info = {
-                                        'wxid': wxid,
-                                        'nickname': nickname_value if nickname_value else wxid,
-                                        'avatar': avatar_value,
-                                        'remark': remark_value,
-                                        'alias': alias_value
-                                    }
-                                    logger.debug(f"解析联系人 {wxid} 详情成功(字典格式): {contact_info}")
-                                else:
-                                    logger.warning(f"联系人 {wxid} 详情格式不支持: {type(detail)}")
-                                    # 创建基本联系人信息
-                                    contact_info = {
-                                        'wxid': wxid,
-                                        'nickname': wxid,
-                                        'type': 'friend'
-                                    }
-                            else:
-                                logger.warning(f"无法获取联系人 {wxid} 的详细信息，API返回空数据")
-                                # 创建基本联系人信息
-                                contact_info = {
-                                    'wxid': wxid,
-                                    'nickname': wxid,
-                                    'type': 'friend'
-                                }
-
-                            # 更新到数据库
-                            update_contact_in_db(contact_info)
-                            logger.debug(f"已在消息处理中更新联系人 {wxid} 的信息")
-                        except Exception as e:
-                            logger.error(f"调用API获取联系人 {wxid} 详情失败: {str(e)}")
-                            # 创建基本联系人信息
-                            contact_info = {
-                                'wxid': wxid,
-                                'nickname': wxid,
-                                'type': 'friend'
-                            }
-                            # 仍然更新到数据库，确保至少有基本信息
-                            update_contact_in_db(contact_info)
-                            logger.debug(f"已在消息处理中更新联系人 {wxid} 的基本信息")
-                except Exception as e:
-                    logger.error(f"在消息处理中获取联系人 {wxid} 信息失败: {str(e)}")
-                    # 创建基本联系人信息并保存
-                    contact_info = {
-                        'wxid': wxid,
-                        'nickname': wxid,
-                        'type': 'friend' if not wxid.endswith("@chatroom") else 'group'
-                    }
-                    update_contact_in_db(contact_info)
-                    logger.debug(f"已在消息处理中更新联系人 {wxid} 的基本信息(异常处理)")
+            await self.contact_refresher.refresh([wxid])
         except Exception as e:
             logger.error(f"更新联系人信息时发生异常: {str(e)}")
 
@@ -526,19 +348,6 @@ class XYBot:
             elif not isinstance(Content, str):
                 Content = str(Content)
 
-            # 新增：保存到消息数据库
-            try:
-                await self.msg_db.save_message(
-                    msg_id=message.get("ID", 0),
-                    sender_wxid=SenderWxid or "",
-                    from_wxid=FromWxid or "",
-                    msg_type=Type,
-                    content=Content,
-                    is_group=True if "@chatroom" in (FromWxid or "") else False
-                )
-            except Exception as e:
-                logger.error(f"保存消息到数据库失败: {e}")
-
             msg_type = message.get("MsgType")
 
             # 预处理消息
@@ -562,25 +371,24 @@ class XYBot:
             if message.get("FromWxid") == self.wxid and isinstance(to_wxid, str) and to_wxid.endswith("@chatroom"):
                 message["FromWxid"], message["ToWxid"] = message["ToWxid"], message["FromWxid"]
 
-            # 异步更新发送者联系人信息
+            # 异步更新发送者联系人信息，群聊只更新群聊本身信息
             from_wxid = message.get("FromWxid", "")
             if from_wxid and from_wxid != self.wxid:
-                # 如果是群聊，只更新群聊本身信息
-                if from_wxid.endswith("@chatroom"):
-                    logger.info(f"开始异步更新群聊信息: {from_wxid}")
-                    update_task = asyncio.create_task(self.update_contact_info(from_wxid))
-                    # 添加回调以记录完成状态
-                    update_task.add_done_callback(
-                        lambda t: logger.info(f"完成群聊信息更新: {from_wxid}, 状态: {'success' if not t.exception() else f'error: {t.exception()}'}")
-                    )
-                # 如果是私聊，更新发送者信息
-                elif not from_wxid.endswith("@chatroom"):
-                    logger.info(f"开始异步更新发送者联系人信息: {from_wxid}")
-                    update_task = asyncio.create_task(self.update_contact_info(from_wxid))
-                    # 添加回调以记录完成状态
-                    update_task.add_done_callback(
-                        lambda t: logger.info(f"完成发送者联系人信息更新: {from_wxid}, 状态: {'success' if not t.exception() else f'error: {t.exception()}'}")
+                self.contact_refresher.request(from_wxid)
+
+            # 文本、图片等消息在各自的处理函数中解析后保存，其他类型在这里保存
+            if msg_type not in (1, 3, 34, 43, 47, 49):
+                try:
+                    await self.msg_db.save_message(
+                        msg_id=int(message.get("MsgId", 0)),
+                        sender_wxid=SenderWxid or "",
+                        from_wxid=message["FromWxid"],
+                        msg_type=msg_type or 0,
+                        content=Content,
+                        is_group=message["FromWxid"].endswith("@chatroom")
                     )
+                except Exception as e:
+                    logger.error(f"保存消息到数据库失败: {e}")
 
             # 根据消息类型触发不同的事件
             if msg_type == 1:  # 文本消息
@@ -762,93 +570,29 @@ class XYBot:
             logger.error("解析图片消息失败: {}, 内容: {}", e, message["Content"])
             return
 
-        # 尝试使用新的get_msg_image方法分段下载图片
+        # 同一张图片（md5相同）已经下载过时直接使用 files 目录中的文件
+        image_data = None
         try:
-            if length and length.isdigit():
-                img_length = int(length)
-                logger.debug(f"尝试使用get_msg_image下载图片: MsgId={message.get('MsgId')}, length={img_length}")
-
-                # 分段下载图片
-                chunk_size = 64 * 1024  # 64KB
-                chunks = (img_length + chunk_size - 1) // chunk_size  # 向上取整
-                full_image_data = bytearray()
-
-                logger.info(f"开始分段下载图片，总大小: {img_length} 字节，分 {chunks} 段下载")
-
-                download_success = True
-                for i in range(chunks):
-                    try:
-                        # 下载当前段
-                        start_pos = i * chunk_size
-                        chunk_data = await self.bot.get_msg_image(message.get('MsgId'), message["FromWxid"], img_length, start_pos=start_pos)
-                        if chunk_data and len(chunk_data) > 0:
-                            full_image_data.extend(chunk_data)
-                            logger.debug(f"第 {i+1}/{chunks} 段下载成功，大小: {len(chunk_data)} 字节")
-                        else:
-                            logger.error(f"第 {i+1}/{chunks} 段下载失败，数据为空")
-                            download_success = False
-                            break
-                    except Exception as e:
-                        logger.error(f"下载第 {i+1}/{chunks} 段时出错: {e}")
-                        download_success = False
-                        break
-
-                if download_success and len(full_image_data) > 0:
-                    # 验证图片数据
-                    try:
-                        import base64
-                        from PIL import Image, ImageFile
-                        ImageFile.LOAD_TRUNCATED_IMAGES = True  # 允许加载截断的图片
-
-                        image_data = bytes(full_image_data)
-                        # 验证图片数据
-                        Image.open(io.BytesIO(image_data))
-                        message["Content"] = base64.b64encode(image_data).decode('utf-8')
-                        logger.info(f"分段下载图片成功，总大小: {len(image_data)} 字节")
-                    except Exception as img_error:
-                        logger.error(f"验证分段下载的图片数据失败: {img_error}")
-                        # 如果验证失败，尝试使用download_image
-                        if aeskey and cdnmidimgurl:
-                            logger.warning("尝试使用download_image下载图片")
-                            message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
-                else:
-                    logger.warning(f"分段下载图片失败，已下载: {len(full_image_data)}/{img_length} 字节")
-                    # 如果分段下载失败，尝试使用download_image
-                    if aeskey and cdnmidimgurl:
-                        logger.warning("尝试使用download_image下载图片")
-                        message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
-            elif aeskey and cdnmidimgurl:
-                logger.debug("使用download_image下载图片")
-                message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
+            image_data, cached_path = await self.image_cache.get_or_download(
+                md5, lambda: self._download_image(message, aeskey, cdnmidimgurl, length))
+            if cached_path:
+                message["ImagePath"] = cached_path
+                logger.info(f"使用已缓存的图片: {cached_path}")
         except Exception as e:
             logger.error(f"下载图片失败: {e}")
-            if aeskey and cdnmidimgurl:
-                try:
-                    message["Content"] = await self.bot.download_image(aeskey, cdnmidimgurl)
-                except Exception as e2:
-                    logger.error(f"备用方法下载图片也失败: {e2}")
+
+        if image_data:
+            message["Content"] = base64.b64encode(image_data).decode('utf-8')
 
         # 如果成功获取图片数据且有MD5值，保存到files目录
-        image_data = None
-        if message["Content"] and isinstance(message["Content"], str) and message["ImageMD5"]:
+        if image_data and md5 and "ImagePath" not in message:
             try:
-                # 解码base64获取图片数据
-                import base64
-                image_data = base64.b64decode(message["Content"])
-
-                # 确保files目录存在
-                files_dir = os.path.join(os.getcwd(), "files")
-                os.makedirs(files_dir, exist_ok=True)
-
-                # 根据MD5值生成文件名
-                file_extension = self._get_image_extension(image_data)
-                file_name = f"{message['ImageMD5']}.{file_extension}"
-                file_path = os.path.join(files_dir, file_name)
-
-                # 保存图片文件
-                with open(file_path, "wb") as f:
-                    f.write(image_data)
-                logger.info(f"图片已保存到: {file_path}")
+                # 根据MD5值生成文件名，同时下载同一张图片的其他消息可能已经保存过
+                file_path = self.image_cache.find(md5)
+                if not file_path:
+                    file_extension = self._get_image_extension(image_data)
+                    file_path = self.image_cache.save(md5, image_data, file_extension)
+                    logger.info(f"图片已保存到: {file_path}")
 
                 # 将文件路径添加到消息中，方便后续使用
                 message["ImagePath"] = file_path
@@ -861,6 +605,35 @@ class XYBot:
             else:
                 logger.warning("风控保护: 新设备登录后4小时内请挂机")
 
+    async def _download_image(self, message: Dict[str, Any], aeskey, cdnmidimgurl, length) -> bytes:
+        """下载图片，优先并发分段下载，失败时使用 download_image"""
+        if length and length.isdigit():
+            img_length = int(length)
+            logger.info(f"开始分段下载图片，总大小: {img_length} 字节，并发数: {self.image_download_concurrency}")
+            try:
+                image_data = await download_chunks(
+                    lambda start, size: self.bot.get_msg_image(message.get('MsgId'), message["FromWxid"],
+                                                               img_length, start_pos=start),
+                    img_length, concurrency=self.image_download_concurrency)
+
+                # 验证图片数据
+                from PIL import Image, ImageFile
+                ImageFile.LOAD_TRUNCATED_IMAGES = True  # 允许加载截断的图片
+                Image.open(io.BytesIO(image_data))
+                logger.info(f"分段下载图片成功，总大小: {len(image_data)} 字节")
+                return image_data
+            except Exception as e:
+                logger.warning(f"分段下载图片失败: {e}")
+
+        if aeskey and cdnmidimgurl:
+            logger.warning("尝试使用download_image下载图片")
+            content = await self.bot.download_image(aeskey, cdnmidimgurl)
+            if isinstance(content, str) and content:
+                return base64.b64decode(content)
+            if isinstance(content, (bytes, bytearray)) and content:
+                return bytes(content)
+        return None
+
     def _get_image_extension(self, image_data):
         """根据图片数据判断文件扩展名"""
         try:
@@ -1306,6 +1079,12 @@ class XYBot:
             logger.error("解析系统消息失败: {}, 内容: {}", e, message["Content"])
             return
 
+        if message["IsGroup"]:
+            try:
+                await self.roster_cache.apply_system_message(message["FromWxid"], root)
+            except Exception as e:
+                logger.error(f"根据系统消息更新群成员名单失败: {e}")
+
         if msg_type == "pat":
             await self.process_pat_message(message)
         elif msg_type == "ClientCheckGetExtInfo":
@@ -1380,17 +1159,8 @@ class XYBot:
         # 检查消息是否包含Ats字段，并且机器人的wxid在Ats列表中
         if "Ats" in message and self.wxid in message["Ats"]:
             # 尝试从消息内容中移除@部分
-            # 从main_config.toml中读取机器人名称列表
-            robot_names = []
-            try:
-                # 读取main_config.toml中的配置
-                import tomllib
-                with open("main_config.toml", "rb") as f:
-                    main_config = tomllib.load(f)
-                    robot_names = main_config.get("XYBot", {}).get("robot-names", [])
-                    logger.debug(f"从main_config.toml中读取到机器人名称列表: {robot_names}")
-            except Exception as e:
-                logger.error(f"读取main_config.toml中的机器人名称失败: {e}")
+            # 从主配置快照中读取机器人名称列表
+            robot_names = list(get_config_service().get("XYBot", "robot-names", []))
 
             # 如果配置文件中没有设置或读取失败，使用默认值
             if not robot_names:
@@ -1401,16 +1171,16 @@ class XYBot:
             if self.nickname and self.nickname not in robot_names:
                 robot_names.append(self.nickname)
 
-            # 尝试从群成员列表中获取机器人的群昵称
+            # 尝试从群成员名单缓存中获取机器人的群昵称
             if message["FromWxid"].endswith("@chatroom"):
                 try:
-                    # 异步获取群成员列表
-                    members = await self.get_chatroom_member_list(message["FromWxid"])
-                    for member in members:
-                        if member.get("wxid") == self.wxid and member.get("nickname"):
-                            robot_names.append(member["nickname"])
-                            logger.debug(f"从群成员列表中获取到机器人的群昵称: {member['nickname']}")
-                            break
+                    member = await self.roster_cache.get_member(message["FromWxid"], self.wxid)
+                    if member:
+                        for key in ("DisplayName", "display_name", "nickname"):
+                            name = member.get(key)
+                            if name and name not in robot_names:
+                                robot_names.append(name)
+                                logger.debug(f"从群成员名单中获取到机器人的群昵称: {name}")
                 except Exception as e:
                     logger.warning(f"获取群成员列表失败: {e}")
 
@@ -15,7 +15,12 @@ import requests
 import threading
 from datetime import datetime
 import glob
+import queue
 import re  # 添加正则表达式模块
+import select
+import struct
+import ctypes
+import ctypes.util
 
 # 配置日志
 log_dir = "logs"
@@ -50,8 +55,33 @@ if os.path.exists(config_file):
         logger.error(f"读取配置文件失败: {e}")
 
 # 消息队列
-message_queue = []
-message_queue_lock = threading.Lock()
+message_queue = queue.Queue()
+
+# 每次请求最多转发的消息数
+FORWARD_BATCH_SIZE = 20
+
+# 预编译的日志解析正则
+NICKNAME_PATTERN = re.compile(r"更新用户昵称缓存: (wxid_\w+) -> (.+)")
+JSON_MESSAGE_PATTERN = re.compile(r'({[^{]*"MsgId"[^}]*}|{[^{]*"msg_id"[^}]*}|{[^{]*"msgid"[^}]*})')
+# 图片消息、链接分享消息: 消息ID:1687893408 来自:wxid_xxx 发送人:wxid_xxx XML:<?xml...
+XML_MESSAGE_PATTERN = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?XML:(.*?)(?=$|\n)')
+QUOTE_MESSAGE_PATTERN = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?内容:(.*?)引用:(.*?)(?=$|\n)')
+AT_MESSAGE_PATTERN = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?@:(\[.*?\]).*?内容:(.*?)(?=$|\n)')
+TEXT_MESSAGE_PATTERN = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?内容:(.*?)(?=$|\n)')
+NEW_FORMAT_PATTERN = re.compile(r'收到文本消息: chat_id=(.*?), content=(.*?),')
+PUSH_CONTENT_PATTERN = re.compile(r"(.+?)\s*:\s*(.+)")
+XML_DEBUG_PATTERN = re.compile(r'解析到的 XML 类型: 57, 完整内容: (.*?)$')
+REFERMSG_PATTERN = re.compile(r'<refermsg>(.*?)</refermsg>', re.DOTALL)
+REFERMSG_CONTENT_PATTERN = re.compile(r'<refermsg>.*?<content>(.*?)</content>.*?</refermsg>', re.DOTALL)
+SVRID_PATTERN = re.compile(r'<svrid>(.*?)</svrid>')
+FROMUSR_PATTERN = re.compile(r'<fromusr>(.*?)</fromusr>')
+CHATUSR_PATTERN = re.compile(r'<chatusr>(.*?)</chatusr>')
+DISPLAYNAME_PATTERN = re.compile(r'<displayname>(.*?)</displayname>')
+IMG_TAG_PATTERN = re.compile(r'<img\s+(.*?)>', re.DOTALL)
+IMG_ATTR_PATTERNS = {name: re.compile(name + r'="([^"]*)"')
+                     for name in ("aeskey", "cdnthumburl", "cdnmidimgurl", "length", "md5")}
+MESSAGE_KEYWORDS = ("收到文本消息", "收到消息", "收到图片消息", "收到语音消息", "收到被@消息", "收到引用消息", "MsgId",
+                    "收到链接分享消息")
 
 # 用户昵称缓存字典
 user_nickname_cache = {}
@@ -59,6 +89,74 @@ user_nickname_cache = {}
 # 已处理的图片消息ID缓存
 processed_image_msgs = set()
 
+# inotify 事件类型
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class LogWatcher:
+    """等待日志目录中的文件变化
+
+    Linux 下使用 inotify，文件一写入就返回；inotify 不可用时（如 Windows）按 poll_interval 轮询。
+    """
+
+    def __init__(self, directories, poll_interval=0.05):
+        self.poll_interval = poll_interval
+        self._fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+            for directory in directories:
+                if libc.inotify_add_watch(fd, os.fsencode(directory), IN_MODIFY | IN_CREATE | IN_MOVED_TO) < 0:
+                    os.close(fd)
+                    raise OSError(ctypes.get_errno(), f"无法监控目录 {directory}")
+            self._fd = fd
+            logger.info(f"使用 inotify 监控日志目录: {list(directories)}")
+        except Exception as e:
+            logger.info(f"inotify 不可用，改为每 {poll_interval} 秒轮询日志文件: {e}")
+
+    @property
+    def uses_inotify(self):
+        return self._fd is not None
+
+    def wait(self, timeout):
+        """等待文件变化
+
+        Returns:
+            int: 收到的 inotify 事件类型（按位或），超时返回0；轮询模式下等待 poll_interval 后返回 IN_MODIFY
+        """
+        if self._fd is None:
+            time.sleep(self.poll_interval)
+            return IN_MODIFY
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return 0
+        mask = 0
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                _, event_mask, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+                mask |= event_mask
+                offset += _INOTIFY_EVENT.size + name_len
+        return mask
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
 class MessageMonitor:
     def __init__(self):
         self.is_running = True
@@ -81,14 +179,30 @@ class MessageMonitor:
 
         logger.info(f"监控的日志文件: {self.actual_file_paths}")
 
-    def _scan_log_files(self):
-        """扫描并更新日志文件列表"""
+        watch_dirs = {os.path.dirname(pattern) or "." for pattern in self.message_file_paths}
+        for directory in watch_dirs:
+            os.makedirs(directory, exist_ok=True)
+        self.watcher = LogWatcher(sorted(watch_dirs))
+
+        # 复用连接转发消息
+        self.http_session = requests.Session()
+        self.http_session.headers["Content-Type"] = "application/json"
+        if DOW_CALLBACK_KEY:
+            # 只有当有密钥时才添加Authorization头
+            self.http_session.headers["Authorization"] = f"Bearer {DOW_CALLBACK_KEY}"
+
+    def _scan_log_files(self, from_start=False):
+        """扫描并更新日志文件列表
+
+        Args:
+            from_start (bool): 新发现的文件是否从头读取，启动时跳过已有内容
+        """
         for pattern in self.message_file_paths:
             matching_files = glob.glob(pattern)
             for file_path in matching_files:
                 if os.path.exists(file_path) and file_path not in self.actual_file_paths:
                     self.actual_file_paths.append(file_path)
-                    self.file_positions[file_path] = os.path.getsize(file_path)
+                    self.file_positions[file_path] = 0 if from_start else os.path.getsize(file_path)
                     logger.info(f"添加日志文件到监控列表: {file_path}")
 
     def start(self):
@@ -100,11 +214,14 @@ class MessageMonitor:
         processor_thread.daemon = True
         processor_thread.start()
 
-        # 主循环 - 监控消息文件
+        # 主循环 - 日志文件有变化时读取新内容
         try:
             while self.is_running:
                 self.check_message_files()
-                time.sleep(0.5)  # 每0.5秒检查一次
+                mask = self.watcher.wait(timeout=1.0)
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 有新的日志文件（如按日期切分）
+                    self._scan_log_files(from_start=True)
         except KeyboardInterrupt:
             logger.info("收到中断信号，正在停止...")
             self.is_running = False
@@ -112,6 +229,8 @@ class MessageMonitor:
             logger.error(f"监控异常: {e}")
             logger.error(traceback.format_exc())
             self.is_running = False
+        finally:
+            self.watcher.close()
 
     def check_message_files(self):
         """检查消息文件变化"""
@@ -150,18 +269,21 @@ class MessageMonitor:
 
                 # 如果文件有新内容
                 if current_size > self.file_positions[file_path]:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    with open(file_path, 'rb') as f:
                         # 移动到上次读取的位置
                         f.seek(self.file_positions[file_path])
 
-                        # 读取新增内容
+                        # 读取新增内容，只处理完整的行，最后一行还没写完时下次再读
                         new_content = f.read()
+                        complete = new_content.rfind(b'\n') + 1
+                        if not complete:
+                            continue
 
                         # 更新位置
-                        self.file_positions[file_path] = current_size
+                        self.file_positions[file_path] += complete
 
                         # 处理新内容
-                        self.parse_new_content(new_content)
+                        self.parse_new_content(new_content[:complete].decode('utf-8', errors='ignore'))
             except Exception as e:
                 logger.error(f"读取文件 {file_path} 失败: {e}")
 
@@ -176,8 +298,7 @@ class MessageMonitor:
 
             try:
                 # 检查昵称更新行
-                nickname_pattern = r"更新用户昵称缓存: (wxid_\w+) -> (.+)"
-                nickname_match = re.search(nickname_pattern, line)
+                nickname_match = NICKNAME_PATTERN.search(line)
                 if nickname_match:
                     wxid = nickname_match.group(1)
                     nickname = nickname_match.group(2)
@@ -186,14 +307,7 @@ class MessageMonitor:
                     continue
 
                 # 匹配更多可能的消息模式，特别是原始框架特定的格式
-                if ("收到文本消息" in line or
-                    "收到消息" in line or
-                    "收到图片消息" in line or  # 特别关注图片消息
-                    "收到语音消息" in line or
-                    "收到被@消息" in line or  # 添加被@消息类型
-                    "收到引用消息" in line or  # 添加引用消息类型
-                    "MsgId" in line or
-                    "收到链接分享消息" in line):
+                if any(keyword in line for keyword in MESSAGE_KEYWORDS):
 
                     # 特别处理图片消息，确保它们被正确识别
                     if "收到图片消息" in line:
@@ -208,10 +322,8 @@ class MessageMonitor:
                     message_data = self.extract_message_from_line(line)
 
                     if message_data:
-                        # 使用锁保护队列操作
-                        with message_queue_lock:
-                            message_queue.append(message_data)
-                            logger.info(f"添加消息到队列，当前队列长度: {len(message_queue)}")
+                        message_queue.put(message_data)
+                        logger.info(f"添加消息到队列，当前队列长度: {message_queue.qsize()}")
             except Exception as e:
                 logger.error(f"解析行异常: {e}, 行内容: {line[:100]}...")
 
@@ -221,8 +333,7 @@ class MessageMonitor:
             # 尝试提取JSON格式的消息
 
             # 尝试找到包含消息信息的JSON对象
-            json_pattern = re.compile(r'({[^{]*"MsgId"[^}]*}|{[^{]*"msg_id"[^}]*}|{[^{]*"msgid"[^}]*})')
-            json_match = json_pattern.search(line)
+            json_match = JSON_MESSAGE_PATTERN.search(line)
 
             if json_match:
                 json_str = json_match.group(1)
@@ -260,8 +371,7 @@ class MessageMonitor:
             if "收到图片消息" in line:
                 logger.info(f"检测到图片消息: {line}")
                 # 尝试匹配图片消息格式: 消息ID:1687893408 来自:wxid_lnbsshdobq7y22 发送人:wxid_lnbsshdobq7y22 XML:<?xml...
-                img_pattern = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?XML:(.*?)(?=$|\n)')
-                img_match = img_pattern.search(line)
+                img_match = XML_MESSAGE_PATTERN.search(line)
 
                 if img_match:
                     msg_id, from_user, sender, xml_content = img_match.groups()
@@ -306,8 +416,7 @@ class MessageMonitor:
             if "收到引用消息" in line:
                 logger.info(f"检测到引用消息: {line}")
                 # 尝试匹配引用消息格式: 消息ID:1241182122 来自:47325400669@chatroom 发送人:wxid_lnbsshdobq7y22 内容:@小小x 酱爆说了啥 引用:{'MsgType': 1, ...}
-                quote_pattern = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?内容:(.*?)引用:(.*?)(?=$|\n)')
-                quote_match = quote_pattern.search(line)
+                quote_match = QUOTE_MESSAGE_PATTERN.search(line)
 
                 if quote_match:
                     msg_id, from_user, sender, content, quote_content = quote_match.groups()
@@ -327,15 +436,13 @@ class MessageMonitor:
                                 xml_content = None
 
                                 # 查找最近的XML日志
-                                xml_debug_pattern = re.compile(r'解析到的 XML 类型: 57, 完整内容: (.*?)$')
-
                                 # 从日志文件中查找最近的XML内容
                                 try:
                                     # 使用全局变量log_file而不是self.log_file
                                     with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
                                         lines = f.readlines()
                                         for i in range(len(lines) - 1, max(0, len(lines) - 20), -1):
-                                            xml_match = xml_debug_pattern.search(lines[i])
+                                            xml_match = XML_DEBUG_PATTERN.search(lines[i])
                                             if xml_match:
                                                 xml_content = xml_match.group(1)
                                                 logger.info(f"找到XML内容，长度: {len(xml_content)}")
@@ -345,7 +452,7 @@ class MessageMonitor:
 
                                 # 如果找到了XML内容，从中提取refermsg部分
                                 if xml_content:
-                                    refermsg_match = re.search(r'<refermsg>(.*?)</refermsg>', xml_content, re.DOTALL)
+                                    refermsg_match = REFERMSG_PATTERN.search(xml_content)
                                     if refermsg_match:
                                         refermsg_content = refermsg_match.group(1)
                                         logger.info(f"成功提取refermsg部分，长度: {len(refermsg_content)}")
@@ -354,7 +461,7 @@ class MessageMonitor:
                                 else:
                                     # 如果没有找到XML内容，尝试从原始行中提取
                                     logger.info(f"尝试从原始行中提取refermsg部分，原始行长度: {len(line)}")
-                                    refermsg_match = re.search(r'<refermsg>(.*?)</refermsg>', line, re.DOTALL)
+                                    refermsg_match = REFERMSG_PATTERN.search(line)
                                     if refermsg_match:
                                         refermsg_content = refermsg_match.group(1)
                                         logger.info(f"成功从原始行提取refermsg部分，长度: {len(refermsg_content)}")
@@ -363,7 +470,7 @@ class MessageMonitor:
 
                                 # 提取svrid（消息ID）
                                 if 'refermsg_content' in locals():
-                                    svrid_match = re.search(r'<svrid>(.*?)</svrid>', refermsg_content)
+                                    svrid_match = SVRID_PATTERN.search(refermsg_content)
                                     if svrid_match:
                                         quoted_data["svrid"] = svrid_match.group(1)
                                         quoted_data["NewMsgId"] = svrid_match.group(1)
@@ -375,19 +482,19 @@ class MessageMonitor:
 
                                 # 提取fromusr（群ID）
                                 if 'refermsg_content' in locals():
-                                    fromusr_match = re.search(r'<fromusr>(.*?)</fromusr>', refermsg_content)
+                                    fromusr_match = FROMUSR_PATTERN.search(refermsg_content)
                                     if fromusr_match:
                                         quoted_data["fromusr"] = fromusr_match.group(1)
                                         logger.info(f"成功从引用消息中提取fromusr: {quoted_data['fromusr']}")
 
                                     # 提取chatusr（发送者ID）
-                                    chatusr_match = re.search(r'<chatusr>(.*?)</chatusr>', refermsg_content)
+                                    chatusr_match = CHATUSR_PATTERN.search(refermsg_content)
                                     if chatusr_match:
                                         quoted_data["chatusr"] = chatusr_match.group(1)
                                         logger.info(f"成功从引用消息中提取chatusr: {quoted_data['chatusr']}")
 
                                     # 提取displayname（发送者昵称）
-                                    displayname_match = re.search(r'<displayname>(.*?)</displayname>', refermsg_content)
+                                    displayname_match = DISPLAYNAME_PATTERN.search(refermsg_content)
                                     if displayname_match:
                                         quoted_data["Nickname"] = displayname_match.group(1)
                                         logger.info(f"成功从引用消息中提取displayname: {quoted_data['Nickname']}")
@@ -400,7 +507,7 @@ class MessageMonitor:
                                     logger.info(f"将完整的XML内容添加到引用数据中，长度: {len(xml_content)}")
 
                                     # 优先从完整XML内容中提取
-                                    xml_match = re.search(r'<refermsg>.*?<content>(.*?)</content>.*?</refermsg>', xml_content, re.DOTALL)
+                                    xml_match = REFERMSG_CONTENT_PATTERN.search(xml_content)
                                     if xml_match:
                                         # 获取content内容并解码XML实体
                                         content_xml = xml_match.group(1)
@@ -411,7 +518,7 @@ class MessageMonitor:
 
                                 # 如果从XML内容中没有提取到，尝试从原始行中提取
                                 if not content_xml:
-                                    xml_match = re.search(r'<refermsg>.*?<content>(.*?)</content>.*?</refermsg>', line, re.DOTALL)
+                                    xml_match = REFERMSG_CONTENT_PATTERN.search(line)
                                     if xml_match:
                                         # 获取content内容并解码XML实体
                                         content_xml = xml_match.group(1)
@@ -422,28 +529,16 @@ class MessageMonitor:
 
                                 # 提取图片信息
                                 if content_xml:
-                                    img_match = re.search(r'<img\s+(.*?)>', content_xml, re.DOTALL)
+                                    img_match = IMG_TAG_PATTERN.search(content_xml)
                                     if img_match:
                                         img_attrs = img_match.group(1)
 
                                         # 提取各种属性
-                                        aeskey_match = re.search(r'aeskey="([^"]*)"', img_attrs)
-                                        cdnthumburl_match = re.search(r'cdnthumburl="([^"]*)"', img_attrs)
-                                        cdnmidimgurl_match = re.search(r'cdnmidimgurl="([^"]*)"', img_attrs)
-                                        length_match = re.search(r'length="([^"]*)"', img_attrs)
-                                        md5_match = re.search(r'md5="([^"]*)"', img_attrs)
-
-                                        # 添加到引用数据中
-                                        if aeskey_match:
-                                            quoted_data["aeskey"] = aeskey_match.group(1)
-                                        if cdnthumburl_match:
-                                            quoted_data["cdnthumburl"] = cdnthumburl_match.group(1)
-                                        if cdnmidimgurl_match:
-                                            quoted_data["cdnmidimgurl"] = cdnmidimgurl_match.group(1)
-                                        if length_match:
-                                            quoted_data["length"] = length_match.group(1)
-                                        if md5_match:
-                                            quoted_data["md5"] = md5_match.group(1)
+                                        # 提取各种属性，添加到引用数据中
+                                        for attr_name, attr_pattern in IMG_ATTR_PATTERNS.items():
+                                            attr_match = attr_pattern.search(img_attrs)
+                                            if attr_match:
+                                                quoted_data[attr_name] = attr_match.group(1)
 
                                         # 添加图片内容到引用数据
                                         quoted_data["Content"] = content_xml
@@ -516,8 +611,7 @@ class MessageMonitor:
             # 特殊处理被@消息
             if "收到被@消息" in line:
                 logger.info(f"检测到被@消息: {line}")
-                at_pattern = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?@:(\[.*?\]).*?内容:(.*?)(?=$|\n)')
-                at_match = at_pattern.search(line)
+                at_match = AT_MESSAGE_PATTERN.search(line)
 
                 if at_match:
                     msg_id, from_user, sender, at_list_str, content = at_match.groups()
@@ -558,8 +652,7 @@ class MessageMonitor:
                 # 特殊处理被@消息
             if "收到链接分享消息" in line:
                 logger.info(f"检测到收到链接分享消息: {line}")
-                url_pattern = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?XML:(.*?)(?=$|\n)')
-                url_match = url_pattern.search(line)
+                url_match = XML_MESSAGE_PATTERN.search(line)
 
                 if url_match:
                     msg_id, from_user, sender, xml_content = url_match.groups()
@@ -585,8 +678,7 @@ class MessageMonitor:
                     return msg_data
 
             # 处理普通消息
-            msg_pattern = re.compile(r'消息ID:(\d+).*?来自:(.*?)[\s\:].*?发送人:(.*?)[\s\:].*?内容:(.*?)(?=$|\n)')
-            msg_match = msg_pattern.search(line)
+            msg_match = TEXT_MESSAGE_PATTERN.search(line)
 
             if msg_match:
                 msg_id, from_user, sender, content = msg_match.groups()
@@ -607,7 +699,7 @@ class MessageMonitor:
 
                 # 检查内容中是否包含昵称信息 (格式如: "xxx : 消息内容")
                 if "PushContent" not in msg_data and content:
-                    push_content_match = re.match(r"(.+?)\s*:\s*(.+)", content)
+                    push_content_match = PUSH_CONTENT_PATTERN.match(content)
                     if push_content_match:
                         nickname, real_content = push_content_match.groups()
                         msg_data["PushContent"] = f"{nickname} : {real_content}"
@@ -620,12 +712,11 @@ class MessageMonitor:
                 return msg_data
 
             # 尝试匹配新格式的日志行 (包含更多消息内容)
-            new_pattern = re.compile(r'收到文本消息: chat_id=(.*?), content=(.*?),')
-            new_match = new_pattern.search(line)
+            new_match = NEW_FORMAT_PATTERN.search(line)
             if new_match:
                 chat_id, content = new_match.groups()
                 # 只有在队列为空时才添加，避免重复
-                if not message_queue:
+                if message_queue.empty():
                     msg_data = {
                         "MsgId": int(time.time() * 1000),  # 生成一个临时ID
                         "FromUserName": {"string": chat_id},
@@ -637,7 +728,7 @@ class MessageMonitor:
 
                     # 从内容中提取发送者信息 (格式如: "xxx : 消息内容")
                     if content:
-                        push_content_match = re.match(r"(.+?)\s*:\s*(.+)", content)
+                        push_content_match = PUSH_CONTENT_PATTERN.match(content)
                         if push_content_match:
                             nickname, real_content = push_content_match.groups()
                             msg_data["Content"] = real_content
@@ -654,56 +745,48 @@ class MessageMonitor:
             return None
 
     def process_messages(self):
-        """处理消息队列"""
+        """处理消息队列，有消息时立即转发，积压的消息合并成一个请求"""
         logger.info("启动消息处理线程")
 
         while self.is_running:
             try:
-                # 检查队列是否有消息
-                if message_queue:
-                    # 使用锁保护队列操作
-                    with message_queue_lock:
-                        # 获取最早的消息
-                        if message_queue:
-                            message = message_queue.pop(0)
-                            logger.debug(f"从队列取出消息，剩余: {len(message_queue)}")
-                        else:
-                            message = None
-
-                    # 处理消息
-                    if message:
-                        self.send_to_dow(message)
-
-                # 短暂休眠避免CPU过载
-                time.sleep(0.1)
+                try:
+                    message = message_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                batch = [message]
+                while len(batch) < FORWARD_BATCH_SIZE:
+                    try:
+                        batch.append(message_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                logger.debug(f"从队列取出 {len(batch)} 条消息，剩余: {message_queue.qsize()}")
+
+                self.send_to_dow(batch)
             except Exception as e:
                 logger.error(f"处理消息异常: {e}")
                 logger.error(traceback.format_exc())
 
-    def send_to_dow(self, message_data):
-        """将消息发送给DOW框架"""
-        try:
-            headers = {
-                "Content-Type": "application/json"
-            }
+    def send_to_dow(self, messages):
+        """将消息发送给DOW框架
 
-            # 只有当有密钥时才添加Authorization头
-            if DOW_CALLBACK_KEY:
-                headers["Authorization"] = f"Bearer {DOW_CALLBACK_KEY}"
+        Args:
+            messages (list): 要转发的消息，只有一条时按单个对象发送，兼容旧版本的DOW框架
+        """
+        try:
+            payload = messages[0] if len(messages) == 1 else messages
 
             # 发送完整消息数据，不过滤任何字段
-            logger.debug(f"发送完整消息数据: {json.dumps(message_data, ensure_ascii=False)[:200]}...")
+            logger.debug(f"发送完整消息数据: {json.dumps(payload, ensure_ascii=False)[:200]}...")
 
             # 发送POST请求
-            response = requests.post(DOW_CALLBACK_URL,
-                                   json=message_data,
-                                   headers=headers,
-                                   timeout=5)
+            response = self.http_session.post(DOW_CALLBACK_URL, json=payload, timeout=5)
 
             if response.status_code == 200:
                 result = response.json()
                 if result.get("success", False):
-                    logger.info("消息转发成功")
+                    logger.info(f"消息转发成功，共 {len(messages)} 条")
                 else:
                     logger.error(f"DOW框架处理失败: {result.get('message', '未知错误')}")
             else: